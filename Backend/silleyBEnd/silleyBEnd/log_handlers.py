@@ -0,0 +1,147 @@
+"""Logging pieces used by ``settings.LOGGING``.
+
+Records are put on a queue by ``QueueListenerHandler`` and written by a
+background thread, so formatting and disk writes stay off the request
+path. ``SamplingFilter`` drops a share of low-level records per logger
+and ``JsonFormatter`` writes one size-capped JSON object per line.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import reprlib
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class QueueListenerHandler(QueueHandler):
+    """Queue records and hand them to ``handlers`` on a listener thread.
+
+    ``handlers`` come from dictConfig, e.g. ``['cfg://handlers.spotify_file']``.
+    The message is rendered, with ``ArgumentCaps`` limits, before queueing,
+    because logged game states keep changing after the call returns; the
+    target handler's formatting and writes happen on the listener thread.
+    """
+
+    def __init__(self, handlers, maxsize: int = 10000, max_arg_length: int = 500,
+                 max_message_length: int = 4000):
+        super().__init__(queue.Queue(maxsize))
+        self.caps = ArgumentCaps(max_arg_length, max_message_length)
+        self.targets = handlers
+        self.listener: Optional[QueueListener] = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.listener is None:
+                # Resolved on first use: dictConfig configures handlers in name
+                # order and only replaces cfg:// targets once they all exist
+                targets = [self.targets[i] for i in range(len(self.targets))]
+                self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+                self.listener.start()
+
+    def stop(self) -> None:
+        """Write out queued records and stop the listener thread."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Other handlers may still see the original record
+        record = copy.copy(record)
+        record.msg = self.caps.message(record)
+        record.args = None
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                setattr(record, key, self.caps.cap(value))
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.listener is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Drop rather than block the request when the writer falls behind
+            pass
+
+
+class SamplingFilter(logging.Filter):
+    """Keep ``rate`` of the records below ``max_level``; keep all others."""
+
+    def __init__(self, rate: float = 1.0, max_level: str = 'INFO'):
+        super().__init__()
+        self.rate = rate
+        self.max_level = logging.getLevelName(max_level)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > self.max_level or self.rate >= 1 or random.random() < self.rate
+
+
+class ArgumentCaps:
+    """Renders record messages with large arguments and messages capped.
+
+    Container and string arguments are rendered with ``reprlib`` so logging
+    a whole game state costs at most ``max_arg_length`` characters.
+    """
+
+    def __init__(self, max_arg_length: int = 500, max_message_length: int = 4000):
+        self.max_message_length = max_message_length
+        self.repr = reprlib.Repr()
+        self.repr.maxstring = self.repr.maxother = max_arg_length
+        self.repr.maxlevel = 3
+        self.repr.maxdict = self.repr.maxlist = self.repr.maxtuple = self.repr.maxset = 20
+
+    def cap(self, value):
+        if isinstance(value, (dict, list, tuple, set, frozenset)):
+            return self.repr.repr(value)
+        if isinstance(value, str) and len(value) > self.repr.maxstring:
+            return value[:self.repr.maxstring] + '...'
+        return value
+
+    def message(self, record: logging.LogRecord) -> str:
+        msg = str(record.msg)
+        if record.args:
+            args = record.args
+            if isinstance(args, dict):
+                args = {key: self.cap(value) for key, value in args.items()}
+            else:
+                args = tuple(self.cap(arg) for arg in args)
+            try:
+                msg = msg % args
+            except (TypeError, ValueError):
+                msg = f"{msg} {args}"
+        if len(msg) > self.max_message_length:
+            msg = f"{msg[:self.max_message_length]}... [{len(msg)} chars]"
+        return msg
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with large arguments and messages capped by ``ArgumentCaps``."""
+
+    def __init__(self, max_arg_length: int = 500, max_message_length: int = 4000, **kwargs):
+        super().__init__(**kwargs)
+        self.caps = ArgumentCaps(max_arg_length, max_message_length)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': self.caps.message(record),
+        }
+        entry.update({
+            key: self.caps.cap(value) for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        })
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -40,6 +40,110 @@ CACHES = {
 
 GAME_CACHE_TIMEOUT = 3600  # 1 hour
 
+# Upper bound on concurrent work per provider during user data ingestion
+INGESTION_CONCURRENCY = {
+    'tracks': 10,   # tracks enriched at the same time
+    'genius': 4,
+}
+# Number of enriched rows written per bulk upsert
+INGESTION_WRITE_BATCH_SIZE = 10
+
+# Catalog artists older than this are re-enriched from MusicBrainz/Discogs/Wikipedia
+ARTIST_CATALOG_MAX_AGE = timedelta(days=30)
+
+# How long a Genius "not found" result is trusted before the track is searched again
+LYRICS_NOT_FOUND_TTL = timedelta(days=7)
+
+# Processes that parse Genius pages (spotify.lyrics_extraction); 0 uses a thread
+LYRICS_EXTRACTION_WORKERS = 2
+
+# Ready-to-serve AI game content kept per user (spotify_games.services.pregeneration)
+PREGENERATION = {
+    'buffer_size': 2,           # games of each kind kept ready
+    'workers': 2,               # background generation threads per process; 0 generates inline
+    'max_age': 7 * 24 * 3600,   # seconds before unused content is discarded
+}
+
+# Seconds a game waits for concurrent AI generation before using basic content
+AI_GENERATION_DEADLINE = 20
+
+# Generated game content reused across users (spotify_games.services.content_cache),
+# keyed by a hash of the lyrics/artist data, prompt version and model
+CONTENT_CACHE = {
+    'ttl': 30 * 24 * 3600,      # seconds before an entry is generated again
+    'max_uses_per_user': 1,     # times one user is served the same entry
+}
+CONTENT_CACHE_REDIS_URL = CACHES['default']['LOCATION']
+CONTENT_CACHE_MAX_BYTES = 64 * 2**20  # least recently used entries are evicted past this
+
+# Durable ingestion queue processed by `manage.py ingestion_worker`
+INGESTION_WORKER = {
+    'concurrency': 2,         # jobs run at the same time per worker process
+    'poll_interval': 2,       # seconds between queue polls when idle
+    'max_attempts': 3,
+    'retry_delay': 30,        # seconds, doubled on every failed attempt
+    'lease_timeout': 1800,    # running jobs not renewed for this long are reclaimed
+    'heartbeat_interval': 60, # seconds between lease renewals of a running job
+    'drain_timeout': 120,     # seconds to let running jobs finish on shutdown
+}
+
+# Seconds between job checks for each open /processing-stream/ connection
+PROGRESS_STREAM_INTERVAL = 1
+# Seconds a /processing-stream/ticket/ ticket can be used to open the stream
+PROGRESS_STREAM_TICKET_AGE = 60
+
+# Token buckets per external provider, shared by every process through Redis
+# (spotify.rate_limit). rate is requests per second, burst the bucket size.
+RATE_LIMITS = {
+    'spotify': {'rate': 10, 'burst': 20},
+    'musicbrainz': {'rate': 1, 'burst': 1},    # MusicBrainz asks for 1 req/s
+    'discogs': {'rate': 1, 'burst': 5},        # 60 req/min when authenticated
+    'genius': {'rate': 5, 'burst': 10},
+    'wikipedia': {'rate': 20, 'burst': 20},
+    'gemini': {'rate': 0.25, 'burst': 2},      # 15 req/min free tier
+}
+RATE_LIMIT_REDIS_URL = CACHES['default']['LOCATION']
+
+# Long-lived pooled HTTP sessions per external provider (spotify.http_clients).
+# 'default' applies to every provider; per-provider entries override it.
+PROVIDER_HTTP_CLIENTS = {
+    'default': {
+        'limit': 20,
+        'limit_per_host': 10,
+        'keepalive_timeout': 30,
+        'total_timeout': 30,
+        'connect_timeout': 10,
+    },
+    'genius': {'limit_per_host': 8},
+    'musicbrainz': {'limit_per_host': 2},
+    'discogs': {'limit_per_host': 4},
+    'wikipedia': {'limit_per_host': 8},
+}
+
+# Cached responses from slow-changing metadata providers (spotify.http_cache).
+# ttl is how many seconds a response is served without a request; after that
+# it is revalidated with ETag/If-Modified-Since when the provider sent one.
+# Providers without an entry are not cached.
+HTTP_CACHE = {
+    'musicbrainz': {'ttl': 7 * 24 * 3600},
+    'discogs': {'ttl': 7 * 24 * 3600},
+    'wikipedia': {'ttl': 24 * 3600},
+}
+HTTP_CACHE_REDIS_URL = CACHES['default']['LOCATION']
+HTTP_CACHE_MAX_BYTES = 256 * 2**20  # least recently used responses are evicted past this
+
+# Spotify API/playback tokens (spotify.token_service): cached per process for
+# local_ttl seconds and shared through Redis; the database is the durable copy.
+TOKEN_SERVICE = {
+    'local_ttl': 30,           # seconds a process trusts its own copy
+    'refresh_margin': 300,     # requests refresh tokens expiring sooner than this
+    'refresh_ahead': 600,      # the background refresher renews tokens expiring sooner than this
+    'refresh_interval': 60,    # seconds between background passes; 0 disables them
+    'active_window': 3600,     # only users seen this recently are refreshed in the background
+    'lock_timeout': 10,        # seconds another worker waits for a refresh in flight
+}
+TOKEN_SERVICE_REDIS_URL = CACHES['default']['LOCATION']
+
 # Session cache settings (optional)
 SESSION_CACHE_ALIAS = "default"
 SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"  # Use cache for better performance
@@ -123,6 +227,13 @@ if 'test' in sys.argv:
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
     }
+    RATE_LIMIT_REDIS_URL = None
+    HTTP_CACHE_REDIS_URL = None
+    TOKEN_SERVICE_REDIS_URL = None
+    CONTENT_CACHE_REDIS_URL = None
+    TOKEN_SERVICE = {**TOKEN_SERVICE, 'refresh_interval': 0}
+    LYRICS_EXTRACTION_WORKERS = 0
+    PREGENERATION = {**PREGENERATION, 'workers': 0}
 
 
 
@@ -199,19 +310,32 @@ EGWU_CLIENT_ID = config("EGWU_CLIENT_ID")
 EGWU_CLIENT_SECRET = config("EGWU_CLIENT_SECRET")
 SPOTIFY_AUTH_HEADER = base64.b64encode(f'{EGWU_CLIENT_ID}:{EGWU_CLIENT_SECRET}'.encode()).decode()
 
+# Records go through a queue (silleyBEnd.log_handlers) and are written as JSON
+# lines by a background thread. LOG_SAMPLE_RATE keeps that share of the
+# DEBUG/INFO records of the app loggers; warnings and errors are always kept.
+LOG_LEVEL = config("LOG_LEVEL", default="DEBUG" if DEBUG else "INFO")
+LOG_SAMPLE_RATE = config("LOG_SAMPLE_RATE", default=1.0, cast=float)
+
 LOGGING = {
     "version": 1,  # Logging configuration version
     "disable_existing_loggers": False,  # Don't disable existing loggers
     "formatters": {
-        "verbose": {
-            "format": "{levelname} {asctime} {module} {message}",
-            "style": "{",
+        "json": {
+            "()": "silleyBEnd.log_handlers.JsonFormatter",
+            "max_arg_length": 500,        # characters of each logged dict/list/str argument
+            "max_message_length": 4000,
         },
         "simple": {
             "format": "{levelname} {message}",
             "style": "{",
         },
     },
+    "filters": {
+        "sample": {
+            "()": "silleyBEnd.log_handlers.SamplingFilter",
+            "rate": LOG_SAMPLE_RATE,
+        },
+    },
     "handlers": {
         "console": {
             "level": "DEBUG",
@@ -224,7 +348,7 @@ LOGGING = {
             "filename": os.path.join(BASE_DIR, "django_warning.log"),
             "maxBytes": 1024 * 1024 * 5,  # 5 MB
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": "json",
         },
         "spotify_file": {
             "level": "DEBUG",
@@ -232,7 +356,7 @@ LOGGING = {
             "filename": os.path.join(BASE_DIR, "spotify.log"),
             "maxBytes": 1024 * 1024 * 5,  # 5 MB
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": "json",
         },
         "spotify_games_file": {
             "level": "DEBUG",
@@ -240,23 +364,37 @@ LOGGING = {
             "filename": os.path.join(BASE_DIR, "spotify_games.log"),
             "maxBytes": 1024 * 1024 * 5,  # 5 MB
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": "json",
+        },
+        "django_queue": {
+            "class": "silleyBEnd.log_handlers.QueueListenerHandler",
+            "handlers": ["cfg://handlers.console", "cfg://handlers.file"],
+        },
+        "spotify_queue": {
+            "class": "silleyBEnd.log_handlers.QueueListenerHandler",
+            "handlers": ["cfg://handlers.spotify_file", "cfg://handlers.file"],
+        },
+        "spotify_games_queue": {
+            "class": "silleyBEnd.log_handlers.QueueListenerHandler",
+            "handlers": ["cfg://handlers.spotify_games_file"],
         },
     },
     "loggers": {
         "django": {
-            "handlers": ["console", "file"],
-            "level": "DEBUG",
+            "handlers": ["django_queue"],
+            "level": LOG_LEVEL,
             "propagate": True,
         },
         "spotify": {  # Custom logger for the spotify app
-            "handlers": ["spotify_file","file"],
-            "level": "DEBUG",
+            "handlers": ["spotify_queue"],
+            "filters": ["sample"],
+            "level": LOG_LEVEL,
             "propagate": False,
         },
         "spotify_games": {  # Custom logger for the spotify_games app
-            "handlers": ["spotify_games_file"],
-            "level": "DEBUG",
+            "handlers": ["spotify_games_queue"],
+            "filters": ["sample"],
+            "level": LOG_LEVEL,
             "propagate": False,
         },
     },
@@ -306,6 +444,13 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
 }
+
+# Users resolved from JWTs (spotify.authentication), cached per process until
+# the token expires or ttl seconds pass; user saves/deletes drop them at once.
+AUTH_PRINCIPAL_CACHE = {
+    'ttl': 300,
+    'max_entries': 10000,
+}
     
 # Session Configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Use database-backed sessions
@@ -329,8 +474,6 @@ if DEBUG:
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'spotify.authentication.JWTAuthentication',
-        'spotify_games.authentication.JWTAuthentication',  
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
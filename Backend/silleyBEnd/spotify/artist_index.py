@@ -0,0 +1,134 @@
+import bz2
+import gzip
+import json
+import logging
+import lzma
+import re
+import unicodedata
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, Optional
+from asgiref.sync import sync_to_async
+from .models import LocalArtistMetadata
+
+logger = logging.getLogger("spotify")
+
+# Discogs disambiguates duplicate names with a numeric suffix: "Drake (2)"
+DISCOGS_SUFFIX = re.compile(r'\s+\(\d+\)$')
+
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+def normalize_name(name: str) -> str:
+    """Case-, accent- and whitespace-insensitive form of an artist name."""
+    name = DISCOGS_SUFFIX.sub('', name or '')
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(name.casefold().split())[:255]
+
+
+def open_dump(path: str, mode: str = 'rb'):
+    """Open a dump file, decompressing .gz, .bz2 and .xz transparently."""
+    for suffix, opener in OPENERS.items():
+        if path.endswith(suffix):
+            return opener(path, mode)
+    return open(path, mode)
+
+
+def _year(value: Optional[str]) -> Optional[int]:
+    try:
+        year = int((value or '')[:4])
+    except ValueError:
+        return None
+    return year or None
+
+
+def parse_musicbrainz_artists(path: str) -> Iterator[Dict]:
+    """Rows from the MusicBrainz JSON dump (one artist object per line).
+
+    Ratings, tags and aliases stand in for popularity when names collide.
+    """
+    with open_dump(path, 'rt') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            artist = json.loads(line)
+            score = (
+                (artist.get('rating') or {}).get('votes-count') or 0
+            ) + len(artist.get('tags') or []) + len(artist.get('aliases') or [])
+            yield {
+                'source': LocalArtistMetadata.MUSICBRAINZ,
+                'source_id': artist['id'],
+                'name': artist['name'][:255],
+                'normalized_name': normalize_name(artist['name']),
+                'artist_type': artist.get('type'),
+                'country': artist.get('country'),
+                'gender': artist.get('gender'),
+                'begin_date': ((artist.get('life-span') or {}).get('begin') or '')[:10] or None,
+                'score': score,
+            }
+
+
+def parse_discogs_debut_years(path: str) -> Dict[str, int]:
+    """Earliest master release year per Discogs artist id, from the masters dump."""
+    debut_years: Dict[str, int] = {}
+    with open_dump(path) as f:
+        for _, master in ET.iterparse(f, events=('end',)):
+            if master.tag != 'master':
+                continue
+            year = _year(master.findtext('year'))
+            if year:
+                for artist_id in master.iterfind('artists/artist/id'):
+                    key = (artist_id.text or '').strip()
+                    if key and year < debut_years.get(key, 10000):
+                        debut_years[key] = year
+            master.clear()
+    return debut_years
+
+
+def parse_discogs_artists(path: str, debut_years: Optional[Dict[str, int]] = None) -> Iterator[Dict]:
+    """Rows from the Discogs artists XML dump.
+
+    Name variations and links stand in for popularity when names collide.
+    """
+    debut_years = debut_years or {}
+    with open_dump(path) as f:
+        for _, artist in ET.iterparse(f, events=('end',)):
+            if artist.tag != 'artist' or artist.find('id') is None:
+                continue
+            artist_id = artist.findtext('id').strip()
+            name = artist.findtext('name') or ''
+            members = artist.findall('members/name')
+            row = {
+                'source': LocalArtistMetadata.DISCOGS,
+                'source_id': artist_id,
+                'name': name[:255],
+                'normalized_name': normalize_name(name),
+                'artist_type': 'Group' if members else None,
+                'members_count': len(members),
+                'debut_year': debut_years.get(artist_id),
+                'score': len(artist.findall('namevariations/name')) + len(artist.findall('urls/url')),
+            }
+            artist.clear()
+            if name:
+                yield row
+
+
+def local_artist(name: str, source: str) -> Optional[LocalArtistMetadata]:
+    """Best imported match for ``name`` from ``source``, or None.
+
+    A tie between the two best-scored namesakes counts as a miss so the
+    network lookup can disambiguate.
+    """
+    candidates = list(
+        LocalArtistMetadata.objects.filter(source=source, normalized_name=normalize_name(name))
+        .order_by('-score')[:2]
+    )
+    if not candidates:
+        return None
+    if len(candidates) == 2 and candidates[0].score == candidates[1].score:
+        logger.debug(f"Ambiguous local {source} match for {name}, falling back to the API")
+        return None
+    return candidates[0]
+
+
+find_local_artist = sync_to_async(local_artist)
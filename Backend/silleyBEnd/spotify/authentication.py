@@ -1,28 +1,132 @@
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework import exceptions
+import copy
+import hashlib
 import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Set, Tuple
+import statsd
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication as SimpleJWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 
 logger = logging.getLogger('spotify')
-    
-class JWTAuthentication(JWTAuthentication):
+
+DEFAULT_OPTIONS = {
+    'ttl': 300,
+    'max_entries': 10000,
+}
+
+
+def principal_cache_options() -> Dict:
+    return {**DEFAULT_OPTIONS, **getattr(settings, 'AUTH_PRINCIPAL_CACHE', {})}
+
+
+class PrincipalCache:
+    """Users resolved from access tokens, kept until the token expires.
+
+    Entries are also capped at ``ttl`` seconds so user changes made by other
+    processes show up; saves and deletes in this process drop them at once.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Tuple[object, object, float]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+        self.statsd = statsd.StatsClient('localhost', 8125, prefix='auth')
+
+    def get(self, key: str) -> Optional[Tuple[object, object]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, token, expires_at = entry
+            if expires_at <= time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+        return user, token
+
+    def set(self, key: str, user, token) -> None:
+        options = principal_cache_options()
+        expires_at = min(token['exp'], time.time() + options['ttl'])
+        with self._lock:
+            self._entries[key] = (user, token, expires_at)
+            self._by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > options['max_entries']:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        user, _, _ = self._entries.pop(key)
+        keys = self._by_user.get(user.pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user.pk]
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._drop(key)
+
+    def record(self, outcome: str, started: float) -> None:
+        """Count a ``hit``, ``miss`` or ``invalid`` authentication and time it."""
+        self.stats[outcome] += 1
+        self.statsd.timing(f"jwt.{outcome}", (time.perf_counter() - started) * 1000)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+        self.stats.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_principal(sender, instance, **kwargs):
+    principal_cache.invalidate_user(instance.pk)
+
+
+post_save.connect(invalidate_principal, sender=settings.AUTH_USER_MODEL)
+post_delete.connect(invalidate_principal, sender=settings.AUTH_USER_MODEL)
+
+
+class JWTAuthentication(SimpleJWTAuthentication):
+    """The project's only JWT backend.
+
+    Each token is validated once; the user it resolves to is then served
+    from ``principal_cache`` without a query. Outcomes and timings go to
+    statsd under ``auth.jwt``.
+    """
+
     def authenticate(self, request):
-        logger.debug("Attempting authentication")
         header = self.get_header(request)
         if header is None:
-            logger.debug("No header found")
             return None
-            
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
 
-        logger.debug(f"Header: {header}")
-        try:
-            prefix = self.get_raw_token(header)
-            if prefix is None:
-                logger.debug("No prefix found")
-                return None
+        started = time.perf_counter()
+        key = hashlib.sha256(raw_token).hexdigest()
+        cached = principal_cache.get(key)
+        if cached is not None:
+            user, validated_token = cached
+            principal_cache.record('hit', started)
+            # Views may modify request.user, so never hand out the cached instance
+            return copy.copy(user), validated_token
 
-            validated_token = self.get_validated_token(prefix)
-            logger.debug(f"Successfully authenticated user {validated_token.user.id}, {validated_token}")
+        try:
+            validated_token = self.get_validated_token(raw_token)
             user = self.get_user(validated_token)
-            return (user, validated_token)
-        except Exception:
-            return None
\ No newline at end of file
+        except (InvalidToken, AuthenticationFailed):
+            principal_cache.record('invalid', started)
+            raise
+
+        principal_cache.set(key, user, validated_token)
+        principal_cache.record('miss', started)
+        return copy.copy(user), validated_token
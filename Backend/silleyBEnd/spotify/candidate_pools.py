@@ -0,0 +1,102 @@
+import logging
+import random
+from typing import Dict, List, Optional, Union
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from .models import Artist, GameCandidate, MostListenedSongs, User
+
+logger = logging.getLogger("spotify")
+
+# Minimum lyric words a song needs for each lyrics-based game mode
+MIN_LYRICS_WORDS = {
+    'crossword': 1,
+    'lyrics_text': 20,
+    'lyrics_voice': 20,
+}
+ARTIST_MODES = ('guess_artist', 'trivia')
+GAME_MODES = tuple(MIN_LYRICS_WORDS) + ARTIST_MODES
+
+# Placeholders stored when no lyrics/biography was found
+MISSING_LYRICS = {'', 'No lyrics available'}
+MISSING_BIOGRAPHIES = {'', 'No biography available', 'NULL'}
+
+
+def lyrics_word_count(lyrics: Optional[str]) -> int:
+    if not lyrics or lyrics.strip() in MISSING_LYRICS:
+        return 0
+    return len(lyrics.split())
+
+
+def has_biography(biography: Optional[str]) -> bool:
+    return bool(biography) and biography.strip() not in MISSING_BIOGRAPHIES
+
+
+def eligible(user: User, game_mode: str) -> QuerySet:
+    """Songs or artists of ``user`` that can be used in ``game_mode``."""
+    if game_mode in MIN_LYRICS_WORDS:
+        return MostListenedSongs.objects.filter(
+            user=user, has_lyrics=True, lyrics_word_count__gte=MIN_LYRICS_WORDS[game_mode],
+        ).exclude(track_uri__isnull=True).exclude(track_uri='')
+    if game_mode == 'trivia':
+        return Artist.objects.filter(listeners__user=user, has_biography=True)
+    if game_mode == 'guess_artist':
+        return Artist.objects.filter(listeners__user=user, enriched_at__isnull=False)
+    raise ValueError(f"Unknown game mode {game_mode}")
+
+
+def rebuild_pool(user: User, game_mode: str) -> int:
+    """Replace the user's pool for ``game_mode``, keeping when items were last served."""
+    field = 'song' if game_mode in MIN_LYRICS_WORDS else 'artist'
+    item_ids = list(eligible(user, game_mode).values_list('id', flat=True))
+    with transaction.atomic():
+        pool = GameCandidate.objects.filter(user=user, game_mode=game_mode)
+        served = dict(pool.exclude(last_served_at=None).values_list(f'{field}_id', 'last_served_at'))
+        pool.delete()
+        GameCandidate.objects.bulk_create([
+            GameCandidate(user=user, game_mode=game_mode, last_served_at=served.get(item_id),
+                          **{f'{field}_id': item_id})
+            for item_id in item_ids
+        ])
+    return len(item_ids)
+
+
+def rebuild_candidate_pools(user: User) -> Dict[str, int]:
+    """Rebuild every game mode's pool for ``user``; called after ingestion."""
+    sizes = {game_mode: rebuild_pool(user, game_mode) for game_mode in GAME_MODES}
+    logger.info(f"Candidate pools for user {user.id}: {sizes}")
+    return sizes
+
+
+def sample_candidates(user: User, game_mode: str, count: int = 1) -> List[Union[MostListenedSongs, Artist]]:
+    """Pick up to ``count`` random items from the user's pool for ``game_mode``.
+
+    Items never served are drawn first, then the least recently served
+    half of the pool, so consecutive games do not repeat items while the
+    pool is large enough.
+    A pool smaller than ``count`` is rebuilt first, which covers games
+    started while ingestion is still writing.
+    """
+    pool = GameCandidate.objects.filter(user=user, game_mode=game_mode)
+    candidate_ids = list(
+        pool.order_by(F('last_served_at').asc(nulls_first=True)).values_list('id', flat=True)
+    )
+    if len(candidate_ids) < count:
+        rebuild_pool(user, game_mode)
+        candidate_ids = list(
+            pool.order_by(F('last_served_at').asc(nulls_first=True)).values_list('id', flat=True)
+        )
+
+    # Items never served come first; once all have been, draw from the oldest half
+    unserved = pool.filter(last_served_at=None).count()
+    window = unserved if unserved >= count else max(count, len(candidate_ids) // 2)
+    fresh = candidate_ids[:window]
+    picked = random.sample(fresh, min(count, len(fresh)))
+    pool.filter(id__in=picked).update(last_served_at=timezone.now())
+
+    by_id = pool.select_related('song', 'artist').in_bulk(picked)
+    return [by_id[candidate_id].item for candidate_id in picked]
+
+
+rebuild_pools = sync_to_async(rebuild_candidate_pools)
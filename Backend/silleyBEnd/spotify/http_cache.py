@@ -0,0 +1,235 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+import redis
+import statsd
+from django.conf import settings
+
+logger = logging.getLogger("spotify")
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+# Response headers kept with a cached body
+CACHED_HEADERS = {'content-type', 'etag', 'last-modified', 'cache-control'}
+
+# Store an entry, then evict least recently used entries until the cache
+# fits in ARGV[5] bytes. KEYS: entry hash, LRU sorted set, byte counter.
+STORE_SCRIPT = """
+local previous = tonumber(redis.call('HGET', KEYS[1], 'size') or '0')
+redis.call('HSET', KEYS[1], 'meta', ARGV[1], 'body', ARGV[2], 'size', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[4], KEYS[1])
+local total = redis.call('INCRBY', KEYS[3], tonumber(ARGV[3]) - previous)
+local max_bytes = tonumber(ARGV[5])
+while total > max_bytes do
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+    if not oldest then break end
+    local size = tonumber(redis.call('HGET', oldest, 'size') or '0')
+    redis.call('DEL', oldest)
+    redis.call('ZREM', KEYS[2], oldest)
+    total = redis.call('DECRBY', KEYS[3], size)
+end
+return total
+"""
+
+
+@dataclass
+class CachedResponse:
+    """A stored provider response and when it was last confirmed current."""
+    status: int
+    url: str
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float = field(default_factory=time.time)
+
+    def header(self, name: str) -> Optional[str]:
+        return next((v for k, v in self.headers.items() if k.lower() == name), None)
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.stored_at < ttl
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this response."""
+        headers = {}
+        if self.header('etag'):
+            headers['If-None-Match'] = self.header('etag')
+        if self.header('last-modified'):
+            headers['If-Modified-Since'] = self.header('last-modified')
+        return headers
+
+    def encode(self) -> Tuple[str, bytes]:
+        meta = {'status': self.status, 'url': self.url, 'headers': self.headers, 'stored_at': self.stored_at}
+        return json.dumps(meta), self.body
+
+    @classmethod
+    def decode(cls, meta: str, body: bytes) -> 'CachedResponse':
+        return cls(body=body, **json.loads(meta))
+
+
+class LocalResponseStore:
+    """In-process LRU of responses, bounded by total body size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, meta: str, body: bytes) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._bytes -= len(previous[1])
+            self._entries[key] = (meta, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class RedisResponseStore:
+    """Responses shared by every process through Redis, evicted LRU by size.
+
+    Falls back to an in-process store while Redis is unreachable.
+    """
+
+    KEY_PREFIX = 'httpcache'
+    NAME = 'HTTP cache'
+
+    def __init__(self, url: str, max_bytes: int):
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self._store = self.client.register_script(STORE_SCRIPT)
+        self.max_bytes = max_bytes
+        self.fallback = LocalResponseStore(max_bytes)
+        self._last_warning = 0.0
+
+    def _warn(self, error: Exception) -> None:
+        if time.monotonic() - self._last_warning > 60:
+            self._last_warning = time.monotonic()
+            logger.warning(f"Redis {self.NAME} unavailable, using local cache: {error}")
+
+    def _key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                pipe.hmget(self._key(key), 'meta', 'body')
+                pipe.zadd(f"{self.KEY_PREFIX}:lru", {self._key(key): time.time()}, xx=True)
+                (meta, body), _ = pipe.execute()
+        except redis.RedisError as e:
+            self._warn(e)
+            return self.fallback.get(key)
+        if meta is None:
+            return None
+        return meta.decode(), body
+
+    def set(self, key: str, meta: str, body: bytes) -> None:
+        try:
+            self._store(
+                keys=[self._key(key), f"{self.KEY_PREFIX}:lru", f"{self.KEY_PREFIX}:bytes"],
+                args=[meta, body, len(body), time.time(), self.max_bytes],
+            )
+        except redis.RedisError as e:
+            self._warn(e)
+            self.fallback.set(key, meta, body)
+
+    def clear(self) -> None:
+        self.fallback.clear()
+        try:
+            keys = list(self.client.scan_iter(f"{self.KEY_PREFIX}:*"))
+            if keys:
+                self.client.delete(*keys)
+        except redis.RedisError as e:
+            self._warn(e)
+
+
+class HttpCache:
+    """Cache of provider GET responses with conditional revalidation.
+
+    Policies come from ``settings.HTTP_CACHE``; providers without an entry
+    are never cached. A response younger than the provider's ``ttl`` is
+    served without a request. Older ones are revalidated with If-None-Match
+    or If-Modified-Since when the provider sent an ETag or Last-Modified.
+    Entries live in Redis at ``settings.HTTP_CACHE_REDIS_URL`` when it is set.
+    """
+
+    def __init__(self):
+        self._store = None
+        self._store_lock = threading.Lock()
+        self.stats: Counter = Counter()
+        self.statsd = statsd.StatsClient('localhost', 8125, prefix='http_cache')
+
+    @property
+    def store(self):
+        with self._store_lock:
+            if self._store is None:
+                url = getattr(settings, 'HTTP_CACHE_REDIS_URL', None)
+                max_bytes = getattr(settings, 'HTTP_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+                self._store = RedisResponseStore(url, max_bytes) if url else LocalResponseStore(max_bytes)
+            return self._store
+
+    def policy(self, provider: str) -> Optional[Dict]:
+        return getattr(settings, 'HTTP_CACHE', {}).get(provider)
+
+    @staticmethod
+    def key(provider: str, url: str, params: Optional[Dict] = None) -> str:
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        return f"{provider}:{url}?{query}"
+
+    def lookup(self, provider: str, url: str, params: Optional[Dict]) -> Optional[CachedResponse]:
+        if not self.policy(provider):
+            return None
+        entry = self.store.get(self.key(provider, url, params))
+        return CachedResponse.decode(*entry) if entry else None
+
+    def is_fresh(self, provider: str, cached: CachedResponse) -> bool:
+        return cached.is_fresh(self.policy(provider).get('ttl', 0))
+
+    def save(self, provider: str, url: str, params: Optional[Dict], status: int,
+             response_url: str, headers: Mapping[str, str], body: bytes) -> None:
+        """Store a 200 response unless the provider marked it no-store."""
+        if not self.policy(provider) or status != 200:
+            return
+        if 'no-store' in next((v for k, v in headers.items() if k.lower() == 'cache-control'), ''):
+            return
+        cached = CachedResponse(
+            status=status,
+            url=response_url,
+            headers={k: v for k, v in headers.items() if k.lower() in CACHED_HEADERS},
+            body=body,
+        )
+        self.store.set(self.key(provider, url, params), *cached.encode())
+
+    def revalidated(self, provider: str, url: str, params: Optional[Dict], cached: CachedResponse) -> None:
+        """Restart the entry's ttl after the provider answered 304 Not Modified."""
+        cached.stored_at = time.time()
+        self.store.set(self.key(provider, url, params), *cached.encode())
+
+    def record(self, provider: str, outcome: str) -> None:
+        """Count a ``hit``, ``miss`` or ``revalidated`` lookup."""
+        self.stats[f"{provider}.{outcome}"] += 1
+        self.statsd.incr(f"{provider}.{outcome}")
+
+    def clear(self) -> None:
+        self.store.clear()
+        self.stats.clear()
+
+
+http_cache = HttpCache()
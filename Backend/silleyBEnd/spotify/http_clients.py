@@ -0,0 +1,204 @@
+import asyncio
+import atexit
+import json
+import logging
+import ssl
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+import aiohttp
+import certifi
+from django.conf import settings
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+from .http_cache import CachedResponse, http_cache
+from .rate_limit import parse_retry_after, rate_limiter
+
+logger = logging.getLogger("spotify")
+
+# One verified SSL context for every provider connection
+ssl_context = ssl.create_default_context(cafile=certifi.where())
+
+DEFAULT_CLIENT_OPTIONS = {
+    'limit': 20,               # total pooled connections
+    'limit_per_host': 10,
+    'keepalive_timeout': 30,   # seconds an idle connection is kept open
+    'total_timeout': 30,
+    'connect_timeout': 10,
+}
+
+# Times a throttled request is retried after waiting out Retry-After
+MAX_THROTTLE_RETRIES = 3
+
+
+@dataclass
+class ProviderResponse:
+    """Fully-read response from an external provider."""
+    status: int
+    url: str
+    headers: Mapping[str, str] = field(default_factory=dict)
+    body: bytes = b''
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace')
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            url = URL(self.url)
+            raise aiohttp.ClientResponseError(
+                request_info=aiohttp.RequestInfo(url, 'GET', CIMultiDictProxy(CIMultiDict()), url),
+                history=(),
+                status=self.status,
+                message=f"{self.status} error for {self.url}",
+                headers=self.headers,
+            )
+
+
+class ProviderClientRegistry:
+    """Process-wide registry of long-lived, pooled HTTP sessions per provider.
+
+    aiohttp sessions are bound to the event loop that created them, so
+    sessions are kept per loop and reused by every call on that loop.
+    Limits and timeouts come from ``settings.PROVIDER_HTTP_CLIENTS``.
+    """
+
+    def __init__(self):
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, aiohttp.ClientSession]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._transport: Optional[Callable[..., Awaitable[ProviderResponse]]] = None
+
+    @contextmanager
+    def use_transport(self, transport: Callable[..., Awaitable[ProviderResponse]]):
+        """Send requests through ``transport`` instead of the network.
+
+        Used by the replay benchmark; rate limiting and throttle retries
+        still apply.
+        """
+        previous, self._transport = self._transport, transport
+        try:
+            yield transport
+        finally:
+            self._transport = previous
+
+    def _options(self, provider: str) -> Dict[str, Any]:
+        configured = getattr(settings, 'PROVIDER_HTTP_CLIENTS', {})
+        return {
+            **DEFAULT_CLIENT_OPTIONS,
+            **configured.get('default', {}),
+            **configured.get(provider, {}),
+        }
+
+    def _create_session(self, provider: str) -> aiohttp.ClientSession:
+        options = self._options(provider)
+        connector = aiohttp.TCPConnector(
+            ssl=ssl_context,
+            limit=options['limit'],
+            limit_per_host=options['limit_per_host'],
+            keepalive_timeout=options['keepalive_timeout'],
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=options['total_timeout'],
+            connect=options['connect_timeout'],
+        )
+        logger.debug(f"Opening pooled HTTP session for {provider}")
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def session(self, provider: str) -> aiohttp.ClientSession:
+        """Return the pooled session for ``provider`` on the running loop."""
+        loop = asyncio.get_running_loop()
+        sessions = self._sessions.setdefault(loop, {})
+        session = sessions.get(provider)
+        if session is None or session.closed:
+            session = sessions[provider] = self._create_session(provider)
+        return session
+
+    async def get(self, provider: str, url: str, *, params: Optional[Dict] = None,
+                  headers: Optional[Dict] = None) -> ProviderResponse:
+        """Issue a GET through the provider's pooled session and read the body.
+
+        Providers configured in ``settings.HTTP_CACHE`` are answered from the
+        response cache while fresh, and revalidated conditionally after that.
+        Every request waits for the provider's rate limiter. A 429 (or a 503
+        with Retry-After) pauses the provider for all workers and is retried.
+        The cache store may be Redis, so it is only used from a worker thread
+        to keep the event loop free.
+        """
+        cacheable = http_cache.policy(provider) is not None
+        cached = await asyncio.to_thread(http_cache.lookup, provider, url, params) if cacheable else None
+        if cached and http_cache.is_fresh(provider, cached):
+            http_cache.record(provider, 'hit')
+            return self._from_cache(cached)
+
+        request_headers = headers
+        if cached and cached.validators():
+            request_headers = {**(headers or {}), **cached.validators()}
+
+        result = await self._send(provider, url, params, request_headers)
+        if cached and result.status == 304:
+            http_cache.record(provider, 'revalidated')
+            await asyncio.to_thread(http_cache.revalidated, provider, url, params, cached)
+            return self._from_cache(cached)
+
+        if cacheable:
+            http_cache.record(provider, 'miss')
+            await asyncio.to_thread(
+                http_cache.save, provider, url, params, result.status, result.url, result.headers, result.body
+            )
+        return result
+
+    async def _send(self, provider: str, url: str, params: Optional[Dict],
+                    headers: Optional[Dict]) -> ProviderResponse:
+        send = self._transport or self.fetch
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            await rate_limiter.acquire(provider)
+            result = await send(provider, url, params=params, headers=headers)
+            throttled = result.status == 429 or (
+                result.status == 503 and any(k.lower() == 'retry-after' for k in result.headers)
+            )
+            if not throttled or attempt == MAX_THROTTLE_RETRIES:
+                return result
+            rate_limiter.defer(provider, parse_retry_after(result.headers))
+        return result
+
+    @staticmethod
+    def _from_cache(cached: CachedResponse) -> ProviderResponse:
+        return ProviderResponse(status=cached.status, url=cached.url, headers=dict(cached.headers), body=cached.body)
+
+    async def fetch(self, provider: str, url: str, *, params: Optional[Dict] = None,
+                    headers: Optional[Dict] = None) -> ProviderResponse:
+        """Send a single GET over the network, without rate limiting."""
+        async with self.session(provider).get(url, params=params, headers=headers) as response:
+            return ProviderResponse(
+                status=response.status,
+                url=str(response.url),
+                headers=dict(response.headers),
+                body=await response.read(),
+            )
+
+    async def close(self) -> None:
+        """Close every session owned by the running loop."""
+        sessions = self._sessions.pop(asyncio.get_running_loop(), {})
+        for provider, session in sessions.items():
+            if not session.closed:
+                await session.close()
+                logger.debug(f"Closed pooled HTTP session for {provider}")
+
+    def close_all(self) -> None:
+        """Close sessions on loops that are no longer running (process exit)."""
+        for loop, sessions in list(self._sessions.items()):
+            if loop.is_closed() or loop.is_running():
+                continue
+            for session in sessions.values():
+                if not session.closed:
+                    loop.run_until_complete(session.close())
+        self._sessions.clear()
+
+
+provider_clients = ProviderClientRegistry()
+atexit.register(provider_clients.close_all)
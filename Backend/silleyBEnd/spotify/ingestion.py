@@ -0,0 +1,374 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+from .candidate_pools import rebuild_pools
+from .models import IngestionJob, SpotifyToken, User
+from .planner import SpotifyCallPlanner
+from .progress import IngestionProgress, ready_game_modes
+from .rate_limit import owner
+from .spotify_client import AsyncSpotify
+from .token_service import token_service
+from .utils import process_top_artists, process_top_tracks
+
+logger = logging.getLogger("spotify")
+
+# Sent with ``user`` once a user's data has been (re)ingested
+ingestion_completed = Signal()
+
+DEFAULT_WORKER_OPTIONS = {
+    'concurrency': 2,
+    'poll_interval': 2,
+    'max_attempts': 3,
+    'retry_delay': 30,
+    'lease_timeout': 1800,
+    'heartbeat_interval': 60,
+    'drain_timeout': 120,
+}
+
+DASHBOARD_URL = 'http://localhost:5173/games/dashboard'
+
+
+def worker_options() -> Dict:
+    return {**DEFAULT_WORKER_OPTIONS, **getattr(settings, 'INGESTION_WORKER', {})}
+
+
+def ingestion_key(user: User) -> str:
+    return f"ingestion:{user.id}"
+
+
+def enqueue_ingestion(user: User) -> IngestionJob:
+    """Queue an ingestion for ``user`` unless one is already queued or running.
+
+    Repeated logins return the active job instead of starting a second one.
+    """
+    key = ingestion_key(user)
+    active = IngestionJob.objects.filter(
+        idempotency_key=key, status__in=IngestionJob.ACTIVE_STATUSES
+    ).first()
+    if active:
+        logger.info(f"Ingestion already {active.status} for user {user.id} (job {active.id})")
+        return active
+
+    try:
+        with transaction.atomic():
+            job = IngestionJob.objects.create(
+                user=user,
+                idempotency_key=key,
+                max_attempts=worker_options()['max_attempts'],
+            )
+    except IntegrityError:
+        # Another request queued it between our check and insert
+        return IngestionJob.objects.get(
+            idempotency_key=key, status__in=IngestionJob.ACTIVE_STATUSES
+        )
+
+    logger.info(f"Queued ingestion job {job.id} for user {user.id}")
+    return job
+
+
+def claim_next_job(worker_id: str) -> Optional[IngestionJob]:
+    """Lock and mark running the oldest due job, or return None.
+
+    Jobs left running by a worker that died are reclaimed once their lease
+    has expired; running workers keep theirs alive with ``renew_lease``.
+    A lost job that has used up its attempts is marked failed instead.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=worker_options()['lease_timeout'])
+
+    with transaction.atomic():
+        while True:
+            job = (
+                IngestionJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=IngestionJob.QUEUED, run_after__lte=now) |
+                    Q(status=IngestionJob.RUNNING, locked_at__lt=lease_expired)
+                )
+                .order_by('run_after', 'created_at')
+                .first()
+            )
+            if not job:
+                return None
+            if job.status == IngestionJob.QUEUED or job.attempts < job.max_attempts:
+                break
+
+            # Its worker died on every attempt; retrying would likely crash another one
+            job.status = IngestionJob.FAILED
+            job.finished_at = now
+            job.last_error = f"Worker lost the job after {job.attempts} attempts"
+            job.locked_by = ''
+            job.locked_at = None
+            job.save(update_fields=['status', 'finished_at', 'last_error', 'locked_by', 'locked_at', 'updated_at'])
+            logger.error(f"Ingestion job {job.id} failed: {job.last_error}")
+
+        job.status = IngestionJob.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at', 'updated_at'])
+
+    logger.info(f"Worker {worker_id} claimed ingestion job {job.id} (attempt {job.attempts})")
+    return job
+
+
+def renew_lease(job: IngestionJob, worker_id: str) -> bool:
+    """Push back the job's lease expiry; False if the worker no longer holds it."""
+    return IngestionJob.objects.filter(
+        id=job.id, status=IngestionJob.RUNNING, locked_by=worker_id
+    ).update(locked_at=timezone.now()) > 0
+
+
+def _update_if_owned(job: IngestionJob, owner: str, **fields) -> bool:
+    """Write ``fields`` unless the job was reclaimed by another worker meanwhile."""
+    return IngestionJob.objects.filter(pk=job.pk, locked_by=owner).update(
+        **fields, updated_at=timezone.now()
+    ) > 0
+
+
+def complete_job(job: IngestionJob) -> bool:
+    """Mark the job complete; False if this worker no longer holds it."""
+    owner = job.locked_by
+    job.status = IngestionJob.COMPLETE
+    job.finished_at = timezone.now()
+    job.last_error = ''
+    if not _update_if_owned(job, owner, status=job.status, finished_at=job.finished_at, last_error=''):
+        logger.warning(f"Ingestion job {job.id} was reclaimed from {owner}, not marking it complete")
+        return False
+    logger.info(f"Ingestion job {job.id} complete")
+    return True
+
+
+def fail_job(job: IngestionJob, error: Exception) -> bool:
+    """Schedule a retry with exponential delay, or mark the job failed.
+
+    Returns False, writing nothing, if another worker has reclaimed the job.
+    """
+    owner = job.locked_by
+    job.last_error = str(error)
+    job.locked_by = ''
+    job.locked_at = None
+
+    if job.attempts < job.max_attempts:
+        delay = worker_options()['retry_delay'] * 2 ** (job.attempts - 1)
+        job.status = IngestionJob.QUEUED
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+        message = f"Ingestion job {job.id} failed, retrying in {delay}s: {error}"
+    else:
+        job.status = IngestionJob.FAILED
+        job.finished_at = timezone.now()
+        message = f"Ingestion job {job.id} failed after {job.attempts} attempts: {error}"
+
+    if not _update_if_owned(
+        job, owner, status=job.status, run_after=job.run_after, last_error=job.last_error,
+        locked_by='', locked_at=None, finished_at=job.finished_at,
+    ):
+        logger.warning(f"Ingestion job {job.id} was reclaimed from {owner}, not recording: {error}")
+        return False
+    if job.status == IngestionJob.QUEUED:
+        logger.warning(message)
+    else:
+        logger.error(message)
+    return True
+
+
+def job_status(user: User) -> Dict:
+    """Processing status for the loading screen, read from the user's latest job."""
+    return latest_job_status(user.id)
+
+
+def latest_job_status(user_id: int) -> Dict:
+    job = (
+        IngestionJob.objects.filter(user_id=user_id)
+        .order_by('-created_at')
+        .values('id', 'status', 'progress', 'last_error', 'attempts')
+        .first()
+    )
+    if job is None:
+        user = User.objects.filter(id=user_id, is_data_processed=True).first()
+        if user:
+            return {'status': 'complete', 'redirect_url': DASHBOARD_URL, 'modes': ready_game_modes(user)}
+        return {'status': 'processing', 'modes': []}
+
+    return status_payload(job['id'], job['status'], job['progress'], job['last_error'], job['attempts'])
+
+
+def status_payload(job_id: int, status: str, progress: Dict, last_error: str = '',
+                   attempts: int = 0) -> Dict:
+    """Status shape shared by ProcessingStatusView and the progress stream.
+
+    ``modes`` lists the game modes that can already be played, so the
+    client can offer them before the whole ingestion has finished.
+    """
+    payload = {
+        'job_id': job_id,
+        'progress': progress,
+        'modes': (progress or {}).get('modes', []),
+        'readiness': (progress or {}).get('readiness', {}),
+    }
+    if status in IngestionJob.ACTIVE_STATUSES:
+        return {**payload, 'status': 'processing', 'attempts': attempts}
+    if status == IngestionJob.COMPLETE:
+        return {**payload, 'status': 'complete', 'redirect_url': DASHBOARD_URL}
+    return {**payload, 'status': 'error', 'error': last_error}
+
+
+def spotify_access_token(user: User) -> str:
+    """Current access token for ``user``, refreshed if it is about to expire."""
+    access_token = token_service.access_token(user.id)
+    if access_token is None:
+        raise SpotifyToken.DoesNotExist(f"User {user.id} has no Spotify token")
+    return access_token
+
+
+async def process_user_data(user: User, progress: Optional[IngestionProgress] = None,
+                            sp: Optional[AsyncSpotify] = None) -> None:
+    """Run the full Spotify ingestion for ``user``.
+
+    ``sp`` defaults to an ``AsyncSpotify`` client built from the user's
+    stored token.
+    """
+    if sp is None:
+        sp = AsyncSpotify(auth=await sync_to_async(spotify_access_token)(user))
+    planner = SpotifyCallPlanner(sp)
+
+    # Share provider rate limits fairly with other users being ingested
+    with owner(f"user:{user.id}"):
+        await asyncio.gather(
+            process_top_tracks(sp, user, planner, progress),
+            process_top_artists(sp, user, planner, progress)
+        )
+
+
+async def run_ingestion(job: IngestionJob) -> None:
+    """Ingest the job's user, skipping users whose data is less than a week old."""
+    user = await sync_to_async(lambda: job.user)()
+    progress = IngestionProgress(job.id)
+
+    last_updated = user.last_updated
+    if last_updated and not timezone.is_aware(last_updated):
+        last_updated = timezone.make_aware(last_updated)
+
+    if user.is_data_processed and last_updated and last_updated > timezone.now() - timedelta(weeks=1):
+        logger.info(f"User {user.id} data is fresh, skipping processing.")
+        await progress.set_stage('complete', user)
+        return
+
+    logger.info(f"User {user.id} data is old or missing, starting processing...")
+    await progress.set_stage('enriching')
+    await process_user_data(user, progress)
+    await rebuild_pools(user)
+
+    user.is_data_processed = True
+    user.last_updated = timezone.now()
+    await sync_to_async(user.save)()
+    await ingestion_completed.asend(sender=User, user=user)
+    await progress.set_stage('complete', user)
+    logger.info(f"Data processing completed for user {user.id}")
+
+
+class IngestionWorker:
+    """Bounded pool that claims queued ingestion jobs and runs them.
+
+    ``stop()`` stops claiming new jobs; jobs already running get up to
+    ``drain_timeout`` seconds to finish before they are cancelled and
+    returned to the queue.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, poll_interval: Optional[float] = None,
+                 handler: Callable[[IngestionJob], Awaitable[None]] = run_ingestion):
+        options = worker_options()
+        self.concurrency = concurrency or options['concurrency']
+        self.poll_interval = poll_interval if poll_interval is not None else options['poll_interval']
+        self.drain_timeout = options['drain_timeout']
+        self.heartbeat_interval = options['heartbeat_interval']
+        self.handler = handler
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        if not self._stopping.is_set():
+            logger.info(f"Worker {self.worker_id} stopping, draining {len(self._running)} jobs")
+            self._stopping.set()
+
+    async def _heartbeat(self, job: IngestionJob, handler: asyncio.Task) -> None:
+        """Renew the job's lease while it runs; cancel ``handler`` once the lease is lost."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await sync_to_async(renew_lease)(job, self.worker_id):
+                logger.warning(f"Worker {self.worker_id} lost the lease on ingestion job {job.id}, stopping it")
+                handler.cancel()
+                return
+
+    async def _execute(self, job: IngestionJob) -> None:
+        handler = asyncio.create_task(self.handler(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, handler))
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                # Lease lost: the job now belongs to another worker
+                return
+            await sync_to_async(fail_job)(job, Exception("Worker shut down before the job finished"))
+            raise
+        except Exception as e:
+            logger.error(f"Error running ingestion job {job.id}: {e}", exc_info=True)
+            await sync_to_async(fail_job)(job, e)
+        else:
+            await sync_to_async(complete_job)(job)
+        finally:
+            heartbeat.cancel()
+
+    async def run(self, burst: bool = False) -> None:
+        """Process jobs until stopped, or until the queue is empty if ``burst``."""
+        logger.info(f"Ingestion worker {self.worker_id} started with concurrency {self.concurrency}")
+        try:
+            while not self._stopping.is_set():
+                job = None
+                if len(self._running) < self.concurrency:
+                    job = await sync_to_async(claim_next_job)(self.worker_id)
+
+                if job:
+                    task = asyncio.create_task(self._execute(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+                    continue
+
+                if burst and not self._running:
+                    break
+
+                if len(self._running) >= self.concurrency:
+                    # Pool is full: wake up as soon as a slot frees
+                    await asyncio.wait(
+                        self._running, timeout=self.poll_interval,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    continue
+
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._drain()
+        logger.info(f"Ingestion worker {self.worker_id} stopped")
+
+    async def _drain(self) -> None:
+        if not self._running:
+            return
+        done, pending = await asyncio.wait(self._running, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"Cancelled {len(pending)} ingestion jobs that did not drain in time")
@@ -0,0 +1,95 @@
+"""Lyrics extraction from Genius song pages.
+
+Kept free of Django imports so it can run in a spawned worker process.
+"""
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+CONTAINER_TAG = re.compile(r'<div\b[^>]*(?:data-lyrics-container|Lyrics__Container)', re.IGNORECASE)
+SKIPPED_TAGS = {'script', 'style', 'button'}
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'source', 'track', 'wbr',
+}
+
+
+class LyricsContainerParser(HTMLParser):
+    """Collects the text of Genius lyrics container divs in one pass.
+
+    Everything outside the containers is ignored, as are scripts, buttons
+    and blocks marked ``data-exclude-from-selection`` inside them.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.containers: List[str] = []
+        self._parts: List[str] = []
+        self._depth = 0  # open tags inside the current container
+        self._skip = 0   # open tags inside a skipped block
+
+    @staticmethod
+    def _is_container(tag: str, attrs: dict) -> bool:
+        return tag == 'div' and (
+            attrs.get('data-lyrics-container') == 'true' or
+            'Lyrics__Container' in (attrs.get('class') or '')
+        )
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip:
+            if tag not in VOID_TAGS:
+                self._skip += 1
+            return
+
+        if not self._depth:
+            if self._is_container(tag, dict(attrs)):
+                self._depth = 1
+                self._parts = []
+            return
+
+        if tag in SKIPPED_TAGS or dict(attrs).get('data-exclude-from-selection') == 'true':
+            if tag not in VOID_TAGS:
+                self._skip = 1
+            return
+
+        if tag == 'br':
+            self._parts.append('\n')
+        elif tag not in VOID_TAGS:
+            self._depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if self._skip:
+            self._skip -= 1
+            return
+        if self._depth:
+            self._depth -= 1
+            if not self._depth:
+                self.containers.append(''.join(self._parts).strip())
+
+    def handle_data(self, data):
+        if self._depth and not self._skip:
+            self._parts.append(data)
+
+
+def extract_lyrics(html: str) -> Optional[str]:
+    """Return the cleaned lyrics from a Genius page, or None if there are none."""
+    if not html:
+        return None
+
+    # Jump straight to the first container instead of parsing the page head
+    match = CONTAINER_TAG.search(html)
+    if not match:
+        return None
+
+    parser = LyricsContainerParser()
+    parser.feed(html[match.start():])
+    parser.close()
+    if not parser.containers:
+        return None
+
+    full_lyrics = '\n'.join(parser.containers)
+    full_lyrics = re.sub(r'\n{3,}', '\n\n', full_lyrics)
+    full_lyrics = re.sub(r'\[.*?\]', '', full_lyrics)
+    return full_lyrics.strip() or None
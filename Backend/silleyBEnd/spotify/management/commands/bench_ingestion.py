@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import subprocess
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from spotify.http_clients import provider_clients
+from spotify.ingestion import spotify_access_token
+from spotify.models import User
+from spotify.replay import (CallStats, Cassette, Faults, RecordingTransport, ReplayTransport,
+                            benchmark_ingestion)
+
+
+class Command(BaseCommand):
+    help = (
+        "Record provider responses for one user's ingestion, or replay them offline "
+        "to benchmark onboarding time, call counts and peak memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('mode', choices=['record', 'replay'])
+        parser.add_argument('cassette', help="JSON file of recorded provider responses")
+        parser.add_argument('--user', help="Username whose Spotify token is used when recording")
+        parser.add_argument('--users', type=int, default=1, help="Users ingested concurrently on replay")
+        parser.add_argument('--latency', type=float, default=0, help="Injected latency in ms for every provider")
+        parser.add_argument('--provider-latency', action='append', default=[], metavar='PROVIDER=MS',
+                            help="Injected latency for one provider, e.g. genius=300")
+        parser.add_argument('--error-rate', type=float, default=0, help="Fraction of replayed calls that fail")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for injected errors")
+        parser.add_argument('--no-rate-limits', action='store_true', help="Replay without provider rate limits")
+        parser.add_argument('--output', help="JSON lines file the result is appended to")
+        parser.add_argument('--max-regression', type=float,
+                            help="Fail if time or calls grew by more than this percent "
+                                 "over the last matching result in --output")
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'record':
+            self.record(options)
+        else:
+            self.replay(options)
+
+    def record(self, options):
+        if not options['user']:
+            raise CommandError("--user is required when recording")
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']}")
+        access_token = spotify_access_token(user)
+
+        cassette, stats = Cassette(), CallStats()
+        # Bypass the response cache so every request reaches the cassette
+        with override_settings(HTTP_CACHE={}):
+            result = self.run_on_scratch_database(
+                1, RecordingTransport(cassette, stats), stats, access_token
+            )
+        cassette.save(options['cassette'])
+        self.stdout.write(
+            f"Recorded {len(cassette.http)} responses to {options['cassette']} in {result.wall_seconds:.1f}s"
+        )
+
+    def replay(self, options):
+        if not Path(options['cassette']).exists():
+            raise CommandError(f"No cassette at {options['cassette']}")
+        cassette, stats = Cassette.load(options['cassette']), CallStats()
+        faults = Faults(
+            latency=self.parse_latency(options),
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+
+        overrides = {'RATE_LIMIT_REDIS_URL': None, 'HTTP_CACHE_REDIS_URL': None}
+        if options['no_rate_limits']:
+            overrides['RATE_LIMITS'] = {}
+        with override_settings(**overrides):
+            result = self.run_on_scratch_database(
+                options['users'], ReplayTransport(cassette, faults, stats), stats
+            )
+
+        record = {
+            'commit': self.current_commit(),
+            'recorded_at': timezone.now().isoformat(),
+            'scenario': {
+                'cassette': Path(options['cassette']).name,
+                'users': options['users'],
+                'latency': faults.latency,
+                'error_rate': faults.error_rate,
+                'rate_limits': not options['no_rate_limits'],
+            },
+            **result.as_dict(),
+        }
+        self.stdout.write(json.dumps(record, indent=2))
+        if result.misses:
+            self.stderr.write(f"Cassette misses: {result.misses}; re-record to cover them")
+
+        if options['output']:
+            regressions = self.compare(record, options['output'], options['max_regression'])
+            with open(options['output'], 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+            if regressions:
+                raise CommandError("Ingestion benchmark regressed: " + "; ".join(regressions))
+
+    def run_on_scratch_database(self, user_count, transport, stats, access_token='replay'):
+        """Run the benchmark against a fresh test database so the catalog starts cold."""
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            users = [
+                User.objects.create_user(username=f'bench-{i}', email=f'bench-{i}@example.com')
+                for i in range(user_count)
+            ]
+            return asyncio.run(self.run_benchmark(users, transport, stats, access_token))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    async def run_benchmark(self, users, transport, stats, access_token):
+        try:
+            return await benchmark_ingestion(users, transport, stats, access_token)
+        finally:
+            await provider_clients.close()
+
+    @staticmethod
+    def parse_latency(options):
+        latency = {'default': options['latency'] / 1000}
+        for value in options['provider_latency']:
+            provider, _, ms = value.partition('=')
+            try:
+                latency[provider] = float(ms) / 1000
+            except ValueError:
+                raise CommandError(f"Invalid --provider-latency {value!r}, expected PROVIDER=MS")
+        return latency
+
+    @staticmethod
+    def current_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return os.environ.get('GIT_COMMIT', 'unknown')
+
+    @staticmethod
+    def compare(record, path, max_regression):
+        """Regressions against the last result for the same scenario in ``path``."""
+        if max_regression is None or not Path(path).exists():
+            return []
+        previous = None
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get('scenario') == record['scenario']:
+                        previous = entry
+        if previous is None:
+            return []
+
+        regressions = []
+        for metric in ('wall_seconds', 'total_calls', 'peak_memory_per_user_mb'):
+            before, after = previous[metric], record[metric]
+            if before and after > before * (1 + max_regression / 100):
+                regressions.append(f"{metric} {before} -> {after} (since {previous['commit']})")
+        return regressions
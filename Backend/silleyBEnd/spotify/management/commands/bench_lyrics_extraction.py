@@ -0,0 +1,90 @@
+import asyncio
+import re
+import time
+from pathlib import Path
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand, CommandError
+from spotify.lyrics_extraction import extract_lyrics
+from spotify.services import LyricsService
+
+
+def baseline_extract(html):
+    """The previous extraction path: BeautifulSoup tree built on the event loop."""
+    soup = BeautifulSoup(html, 'html.parser')
+    lyrics_containers = soup.select('div[class*="Lyrics__Container"]')
+    if not lyrics_containers:
+        lyrics_containers = soup.find_all("div", attrs={"data-lyrics-container": "true"})
+    if not lyrics_containers:
+        return None
+
+    lyrics = []
+    for container in lyrics_containers:
+        for element in container.find_all(['script', 'button']):
+            element.decompose()
+        lyrics.append(container.get_text(separator='\n').strip())
+
+    full_lyrics = '\n'.join(lyrics)
+    full_lyrics = re.sub(r'\n{3,}', '\n\n', full_lyrics)
+    full_lyrics = re.sub(r'\[.*?\]', '', full_lyrics)
+    return full_lyrics.strip()
+
+
+class Command(BaseCommand):
+    help = "Compare lyrics extraction throughput and event loop stalls over saved Genius pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('pages_dir', help="Directory of saved Genius song pages (*.html)")
+        parser.add_argument('--repeat', type=int, default=5, help="Times each page is extracted")
+
+    def handle(self, *args, **options):
+        pages = [path.read_text(encoding='utf-8', errors='replace')
+                 for path in sorted(Path(options['pages_dir']).glob('*.html'))]
+        if not pages:
+            raise CommandError(f"No .html pages found in {options['pages_dir']}")
+        pages = pages * options['repeat']
+
+        asyncio.run(self.run_benchmarks(pages))
+
+    async def run_benchmarks(self, pages):
+        async def on_loop(html):
+            return baseline_extract(html)
+
+        service = LyricsService()
+        for label, extract in [("BeautifulSoup on loop", on_loop), ("Streaming parser in pool", service.extract_lyrics)]:
+            elapsed, max_stall, total_stall = await self.measure(extract, pages)
+            self.stdout.write(
+                f"{label:<26} {len(pages) / elapsed:8.1f} pages/s  "
+                f"max loop stall {max_stall * 1000:8.1f} ms  "
+                f"total stall {total_stall * 1000:9.1f} ms"
+            )
+
+        matches = sum(
+            self.normalize(baseline_extract(html)) == self.normalize(extract_lyrics(html))
+            for html in pages
+        )
+        self.stdout.write(f"Identical word sequence on {matches}/{len(pages)} pages")
+
+    async def measure(self, extract, pages):
+        """Run every page through ``extract`` while timing event loop lag."""
+        loop = asyncio.get_running_loop()
+        stalls = []
+        done = asyncio.Event()
+
+        async def heartbeat(interval=0.001):
+            while not done.is_set():
+                started = loop.time()
+                await asyncio.sleep(interval)
+                stalls.append(max(loop.time() - started - interval, 0))
+
+        ticker = asyncio.create_task(heartbeat())
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        await asyncio.gather(*(extract(html) for html in pages))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ticker
+        return elapsed, max(stalls, default=0), sum(stalls)
+
+    @staticmethod
+    def normalize(text):
+        return (text or '').split()
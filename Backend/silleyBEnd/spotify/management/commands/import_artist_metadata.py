@@ -0,0 +1,60 @@
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from spotify.artist_index import (parse_discogs_artists, parse_discogs_debut_years,
+                                  parse_musicbrainz_artists)
+from spotify.models import LocalArtistMetadata
+
+UPDATE_FIELDS = [
+    'name', 'normalized_name', 'artist_type', 'country', 'gender',
+    'begin_date', 'members_count', 'debut_year', 'score',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Import MusicBrainz/Discogs artist dumps into the local metadata index "
+        "used before the rate-limited APIs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--musicbrainz', help="MusicBrainz artist JSON dump (JSON lines, may be .gz/.bz2/.xz)")
+        parser.add_argument('--discogs-artists', help="Discogs artists XML dump (may be .gz)")
+        parser.add_argument('--discogs-masters', help="Discogs masters XML dump, for debut years")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows written per upsert")
+
+    def handle(self, *args, **options):
+        if not options['musicbrainz'] and not options['discogs_artists']:
+            raise CommandError("Give --musicbrainz and/or --discogs-artists")
+
+        if options['musicbrainz']:
+            count = self.import_rows(parse_musicbrainz_artists(options['musicbrainz']), options['batch_size'])
+            self.stdout.write(f"Imported {count} MusicBrainz artists")
+
+        if options['discogs_artists']:
+            debut_years = {}
+            if options['discogs_masters']:
+                debut_years = parse_discogs_debut_years(options['discogs_masters'])
+                self.stdout.write(f"Read debut years for {len(debut_years)} Discogs artists")
+            count = self.import_rows(
+                parse_discogs_artists(options['discogs_artists'], debut_years), options['batch_size']
+            )
+            self.stdout.write(f"Imported {count} Discogs artists")
+
+    def import_rows(self, rows, batch_size):
+        """Upsert rows in batches; re-importing a newer dump updates in place."""
+        total = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return total
+            with transaction.atomic():
+                LocalArtistMetadata.objects.bulk_create(
+                    [LocalArtistMetadata(**row) for row in batch],
+                    update_conflicts=True,
+                    unique_fields=['source', 'source_id'],
+                    update_fields=UPDATE_FIELDS,
+                )
+            total += len(batch)
+            if total % (batch_size * 20) == 0:
+                self.stdout.write(f"  {total} rows...")
@@ -0,0 +1,31 @@
+import asyncio
+import signal
+from django.core.management.base import BaseCommand
+from spotify.http_clients import provider_clients
+from spotify.ingestion import IngestionWorker
+
+
+class Command(BaseCommand):
+    help = "Process queued Spotify ingestion jobs until SIGINT/SIGTERM"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help="Jobs run at the same time")
+        parser.add_argument('--poll-interval', type=float, help="Seconds between polls when idle")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run_worker(options))
+
+    async def run_worker(self, options):
+        worker = IngestionWorker(
+            concurrency=options.get('concurrency'),
+            poll_interval=options.get('poll_interval'),
+        )
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+
+        try:
+            await worker.run(burst=options.get('burst', False))
+        finally:
+            await provider_clients.close()
@@ -1,19 +1,21 @@
-from django.utils import timezone
-from .models import SpotifyToken
-from django.utils.decorators import sync_and_async_middleware
 import logging
+import requests
+from .token_service import TokenRefreshError, token_service
 
 logger = logging.getLogger("spotify")
 class SpotifyTokenMiddleware:
+    """Keep the signed-in user's Spotify token fresh.
+
+    Served from the token service's caches, so the common case does no
+    database query; near-expiry tokens are refreshed single-flight.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         if request.user.is_authenticated:
             try:
-                token = SpotifyToken.objects.get(user=request.user)
-                if token.is_expired():
-                    token.refresh()
-            except SpotifyToken.DoesNotExist:
-                pass
-        return self.get_response(request)
\ No newline at end of file
+                token_service.get(request.user.id)
+            except (TokenRefreshError, requests.RequestException) as e:
+                logger.warning(f"Could not refresh Spotify token for user {request.user.id}: {e}")
+        return self.get_response(request)
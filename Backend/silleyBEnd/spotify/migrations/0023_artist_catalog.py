@@ -0,0 +1,108 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CATALOG_FIELDS = [
+    'name', 'popularity', 'genres', 'followers', 'debut_year', 'birth_year',
+    'num_albums', 'members', 'country', 'gender', 'most_popular_song',
+    'most_popular_song_id', 'most_popular_track_uri', 'image_url', 'biography',
+]
+
+
+def copy_artists_to_catalog(apps, schema_editor):
+    Artist = apps.get_model('spotify', 'Artist')
+    MostListenedArtist = apps.get_model('spotify', 'MostListenedArtist')
+
+    for link in MostListenedArtist.objects.order_by('id'):
+        artist, _ = Artist.objects.get_or_create(
+            spotify_id=link.spotify_id,
+            defaults={
+                **{field: getattr(link, field) for field in CATALOG_FIELDS},
+                'enriched_at': link.user.last_updated if link.user_id else None,
+            },
+        )
+        link.artist = artist
+        link.save(update_fields=['artist'])
+
+
+def copy_catalog_to_artists(apps, schema_editor):
+    MostListenedArtist = apps.get_model('spotify', 'MostListenedArtist')
+
+    for link in MostListenedArtist.objects.select_related('artist'):
+        link.spotify_id = link.artist.spotify_id
+        for field in CATALOG_FIELDS:
+            setattr(link, field, getattr(link.artist, field))
+        link.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify', '0022_spotifyplaybacktoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('spotify_id', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('popularity', models.IntegerField(default=0)),
+                ('genres', models.TextField(default=None)),
+                ('followers', models.IntegerField(default=0)),
+                ('debut_year', models.IntegerField(blank=True, null=True)),
+                ('birth_year', models.IntegerField(blank=True, null=True)),
+                ('num_albums', models.IntegerField(blank=True, null=True)),
+                ('members', models.IntegerField(blank=True, null=True)),
+                ('country', models.CharField(blank=True, max_length=255, null=True)),
+                ('gender', models.CharField(blank=True, max_length=255, null=True)),
+                ('most_popular_song', models.CharField(blank=True, max_length=255, null=True)),
+                ('most_popular_song_id', models.CharField(max_length=255, null=True)),
+                ('most_popular_track_uri', models.CharField(blank=True, max_length=255, null=True)),
+                ('image_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('biography', models.TextField(blank=True, null=True)),
+                ('enriched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mostlistenedartist',
+            name='artist',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='listeners', to='spotify.artist'),
+        ),
+        migrations.AddField(
+            model_name='mostlistenedartist',
+            name='rank',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(copy_artists_to_catalog, copy_catalog_to_artists),
+        migrations.AlterField(
+            model_name='mostlistenedartist',
+            name='artist',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listeners', to='spotify.artist'),
+        ),
+        migrations.AlterModelOptions(
+            name='mostlistenedartist',
+            options={'ordering': ['rank']},
+        ),
+        migrations.AlterUniqueTogether(
+            name='mostlistenedartist',
+            unique_together={('user', 'artist')},
+        ),
+        migrations.RemoveField(model_name='mostlistenedartist', name='spotify_id'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='name'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='popularity'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='genres'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='followers'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='debut_year'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='birth_year'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='num_albums'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='members'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='country'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='gender'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='most_popular_song'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='most_popular_song_id'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='most_popular_track_uri'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='image_url'),
+        migrations.RemoveField(model_name='mostlistenedartist', name='biography'),
+    ]
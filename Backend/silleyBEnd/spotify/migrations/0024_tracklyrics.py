@@ -0,0 +1,65 @@
+import hashlib
+import zlib
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def move_lyrics_to_store(apps, schema_editor):
+    MostListenedSongs = apps.get_model('spotify', 'MostListenedSongs')
+    TrackLyrics = apps.get_model('spotify', 'TrackLyrics')
+
+    songs = MostListenedSongs.objects.exclude(lyrics__isnull=True).exclude(lyrics='')
+    for song in songs.iterator():
+        TrackLyrics.objects.update_or_create(
+            spotify_id=song.spotify_id,
+            defaults={
+                'compressed_text': zlib.compress(song.lyrics.encode('utf-8')),
+                'content_hash': hashlib.sha256(song.lyrics.encode('utf-8')).hexdigest(),
+                'found': True,
+            },
+        )
+        song.has_lyrics = True
+        song.save(update_fields=['has_lyrics'])
+
+
+def move_lyrics_back(apps, schema_editor):
+    MostListenedSongs = apps.get_model('spotify', 'MostListenedSongs')
+    TrackLyrics = apps.get_model('spotify', 'TrackLyrics')
+
+    for stored in TrackLyrics.objects.filter(found=True).iterator():
+        MostListenedSongs.objects.filter(spotify_id=stored.spotify_id).update(
+            lyrics=zlib.decompress(bytes(stored.compressed_text)).decode('utf-8')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify', '0023_artist_catalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackLyrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('spotify_id', models.CharField(max_length=255, unique=True)),
+                ('compressed_text', models.BinaryField(blank=True, null=True)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('source_url', models.URLField(blank=True, max_length=500, null=True)),
+                ('found', models.BooleanField(default=False)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mostlistenedsongs',
+            name='has_lyrics',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(move_lyrics_to_store, move_lyrics_back),
+        migrations.RemoveField(
+            model_name='mostlistenedsongs',
+            name='lyrics',
+        ),
+    ]
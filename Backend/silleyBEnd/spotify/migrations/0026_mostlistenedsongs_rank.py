@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify', '0025_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mostlistenedsongs',
+            name='rank',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
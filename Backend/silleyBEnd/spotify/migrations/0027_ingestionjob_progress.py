@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify', '0026_mostlistenedsongs_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
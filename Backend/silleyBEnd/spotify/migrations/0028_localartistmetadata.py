@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify', '0027_ingestionjob_progress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocalArtistMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('musicbrainz', 'MusicBrainz'), ('discogs', 'Discogs')], max_length=20)),
+                ('source_id', models.CharField(max_length=64)),
+                ('name', models.CharField(max_length=255)),
+                ('normalized_name', models.CharField(max_length=255)),
+                ('artist_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('country', models.CharField(blank=True, max_length=10, null=True)),
+                ('gender', models.CharField(blank=True, max_length=50, null=True)),
+                ('begin_date', models.CharField(blank=True, max_length=10, null=True)),
+                ('members_count', models.IntegerField(blank=True, null=True)),
+                ('debut_year', models.IntegerField(blank=True, null=True)),
+                ('score', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'normalized_name'], name='spotify_loc_source_cbe11f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source', 'source_id'), name='unique_local_artist_source_id')],
+            },
+        ),
+    ]
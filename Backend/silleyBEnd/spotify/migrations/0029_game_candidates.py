@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:30
+
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+MISSING_BIOGRAPHIES = ['', 'No biography available', 'NULL']
+
+
+def compute_eligibility(apps, schema_editor):
+    MostListenedSongs = apps.get_model('spotify', 'MostListenedSongs')
+    TrackLyrics = apps.get_model('spotify', 'TrackLyrics')
+    Artist = apps.get_model('spotify', 'Artist')
+
+    for stored in TrackLyrics.objects.filter(found=True).exclude(compressed_text=None).iterator():
+        text = zlib.decompress(bytes(stored.compressed_text)).decode('utf-8')
+        MostListenedSongs.objects.filter(spotify_id=stored.spotify_id).update(
+            lyrics_word_count=len(text.split())
+        )
+    Artist.objects.filter(biography__isnull=False).exclude(
+        biography__in=MISSING_BIOGRAPHIES
+    ).update(has_biography=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify', '0028_localartistmetadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='has_biography',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='mostlistenedsongs',
+            name='lyrics_word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='GameCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_mode', models.CharField(max_length=50)),
+                ('last_served_at', models.DateTimeField(blank=True, null=True)),
+                ('artist', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='spotify.artist')),
+                ('song', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='spotify.mostlistenedsongs')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_candidates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'game_mode', 'last_served_at'], name='spotify_gam_user_id_5215a5_idx')],
+            },
+        ),
+        migrations.RunPython(compute_eligibility, migrations.RunPython.noop),
+    ]
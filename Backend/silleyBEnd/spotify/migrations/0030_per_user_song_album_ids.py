@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify', '0029_game_candidates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mostlistenedalbum',
+            name='spotify_id',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='mostlistenedsongs',
+            name='spotify_id',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='mostlistenedalbum',
+            constraint=models.UniqueConstraint(fields=('user', 'spotify_id'), name='unique_user_album'),
+        ),
+        migrations.AddConstraint(
+            model_name='mostlistenedsongs',
+            constraint=models.UniqueConstraint(fields=('user', 'spotify_id'), name='unique_user_song'),
+        ),
+    ]
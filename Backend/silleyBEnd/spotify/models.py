@@ -2,7 +2,10 @@ from django.db import models
 from django.utils import timezone
 from django.conf import settings
 from datetime import timedelta
+import hashlib
 import logging
+import zlib
+from typing import Optional
 from .constants import SCOPE
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.hashers import make_password
@@ -45,7 +48,7 @@ class User(AbstractUser):
     
 class MostListenedSongs(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    spotify_id =models.CharField(max_length=255,unique=True)
+    spotify_id =models.CharField(max_length=255)
     name = models.CharField(max_length=255)
     genres = models.TextField(max_length=255, blank=True,null=True)
     artist = models.CharField(max_length=255)
@@ -53,18 +56,75 @@ class MostListenedSongs(models.Model):
     release_date = models.DateField(null=True, blank=True)
     duration_seconds = models.FloatField()
     popularity = models.IntegerField(default=0)
-    lyrics = models.TextField(blank=True, null=True)
+    rank = models.PositiveIntegerField(default=0)
+    has_lyrics = models.BooleanField(default=False)
+    lyrics_word_count = models.PositiveIntegerField(default=0)
     image_url = models.URLField(max_length=500, null=True, blank=True)
     track_uri = models.CharField(max_length=500, null=True, blank=True)
     
+    class Meta:
+        # Several users can have the same track in their top list
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'spotify_id'], name='unique_user_song'),
+        ]
     
+    @property
+    def lyrics(self) -> Optional[str]:
+        """Lyrics from the shared TrackLyrics store, loaded on first access."""
+        if not hasattr(self, '_lyrics'):
+            stored = None
+            if self.has_lyrics:
+                stored = TrackLyrics.objects.filter(spotify_id=self.spotify_id, found=True).first()
+            self._lyrics = stored.text if stored else None
+        return self._lyrics
     
     def __str__(self):
         return self.name
     
-class MostListenedArtist(models.Model):
+class TrackLyrics(models.Model):
+    """Genius lyrics shared by every user, keyed by Spotify track id.
+    
+    Text is stored zlib-compressed. Rows with ``found=False`` record a failed
+    lookup so the track is not searched again until the negative entry expires.
+    """
+    spotify_id = models.CharField(max_length=255, unique=True)
+    compressed_text = models.BinaryField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    source_url = models.URLField(max_length=500, null=True, blank=True)
+    found = models.BooleanField(default=False)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    
+    @staticmethod
+    def compress(text: str) -> bytes:
+        return zlib.compress(text.encode('utf-8'))
+    
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    @property
+    def text(self) -> Optional[str]:
+        if not self.compressed_text:
+            return None
+        return zlib.decompress(bytes(self.compressed_text)).decode('utf-8')
+    
+    def is_expired(self, not_found_ttl: timedelta = None) -> bool:
+        """Found lyrics never expire; misses are retried after not_found_ttl."""
+        if self.found:
+            return False
+        not_found_ttl = not_found_ttl or getattr(settings, 'LYRICS_NOT_FOUND_TTL', timedelta(days=7))
+        return self.fetched_at < timezone.now() - not_found_ttl
+    
+    def __str__(self):
+        return f"Lyrics for {self.spotify_id}"
+    
+class Artist(models.Model):
+    """Canonical artist shared by every user who listens to them.
+    
+    Holds the Spotify, MusicBrainz, Discogs and Wikipedia enrichment once per
+    deployment; per-user rankings live in MostListenedArtist.
+    """
     spotify_id = models.CharField(max_length=255, unique=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     popularity = models.IntegerField(default=0)
     genres = models.TextField(default=None)
@@ -80,14 +140,101 @@ class MostListenedArtist(models.Model):
     most_popular_track_uri = models.CharField(max_length=255, null=True, blank=True)
     image_url = models.URLField(max_length=500, null=True, blank=True)
     biography = models.TextField(blank=True, null=True)
+    has_biography = models.BooleanField(default=False)
+    enriched_at = models.DateTimeField(null=True, blank=True)
     
-  
+    def is_stale(self, max_age: timedelta = None) -> bool:
+        """Whether the external enrichment is missing or older than max_age."""
+        max_age = max_age or getattr(settings, 'ARTIST_CATALOG_MAX_AGE', timedelta(days=30))
+        return not self.enriched_at or self.enriched_at < timezone.now() - max_age
     
     def __str__(self) -> str:
         return f"{self.name}"
     
+class LocalArtistMetadata(models.Model):
+    """Artist facts imported from MusicBrainz and Discogs data dumps.
+    
+    Filled by ``manage.py import_artist_metadata`` and consulted before the
+    rate-limited public APIs. Lookups go through ``normalized_name``; when
+    several artists share a name the highest ``score`` wins.
+    """
+    MUSICBRAINZ = 'musicbrainz'
+    DISCOGS = 'discogs'
+    SOURCE_CHOICES = [
+        (MUSICBRAINZ, 'MusicBrainz'),
+        (DISCOGS, 'Discogs'),
+    ]
+    
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.CharField(max_length=64)
+    name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255)
+    artist_type = models.CharField(max_length=50, null=True, blank=True)
+    country = models.CharField(max_length=10, null=True, blank=True)
+    gender = models.CharField(max_length=50, null=True, blank=True)
+    begin_date = models.CharField(max_length=10, null=True, blank=True)
+    members_count = models.IntegerField(null=True, blank=True)
+    debut_year = models.IntegerField(null=True, blank=True)
+    score = models.IntegerField(default=0)
+    
+    class Meta:
+        indexes = [models.Index(fields=['source', 'normalized_name'])]
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'source_id'], name='unique_local_artist_source_id'),
+        ]
+    
+    def as_musicbrainz(self) -> dict:
+        """The fields of a MusicBrainz API artist that enrichment reads."""
+        return {
+            "id": self.source_id,
+            "name": self.name,
+            "type": self.artist_type,
+            "country": self.country,
+            "gender": self.gender,
+            "life-span": {"begin": self.begin_date or ""},
+        }
+    
+    def __str__(self) -> str:
+        return f"{self.name} ({self.source} {self.source_id})"
+    
+class GameCandidate(models.Model):
+    """A song or artist a user can be given in one game mode.
+    
+    Pools are built from eligibility computed at ingestion (see
+    ``spotify.candidate_pools``) so starting a game never scans or sorts the
+    user's whole library. ``last_served_at`` keeps recent picks from repeating.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='game_candidates')
+    game_mode = models.CharField(max_length=50)
+    song = models.ForeignKey(MostListenedSongs, on_delete=models.CASCADE, null=True, blank=True)
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, null=True, blank=True)
+    last_served_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [models.Index(fields=['user', 'game_mode', 'last_served_at'])]
+    
+    @property
+    def item(self):
+        return self.song or self.artist
+    
+    def __str__(self) -> str:
+        return f"{self.game_mode} candidate {self.item} for user {self.user_id}"
+    
+class MostListenedArtist(models.Model):
+    """A user's ranking of a catalog artist."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='listeners')
+    rank = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user', 'artist']
+        ordering = ['rank']
+    
+    def __str__(self) -> str:
+        return f"{self.user} #{self.rank}: {self.artist}"
+    
 class MostListenedAlbum(models.Model):
-    spotify_id = models.CharField(max_length = 255, unique=True)
+    spotify_id = models.CharField(max_length = 255)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=255, default="Unknown Artist")
     artists = models.CharField(max_length=255)
@@ -95,11 +242,65 @@ class MostListenedAlbum(models.Model):
     total_tracks = models.IntegerField(default=0)
     image_url = models.URLField(max_length=500, null=True, blank=True)
     
-   
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'spotify_id'], name='unique_user_album'),
+        ]
     
     def __str__(self) -> str:
         return f"{self.name}"
     
+class IngestionJob(models.Model):
+    """A queued run of the Spotify data ingestion for one user.
+    
+    Jobs live in the database so they survive restarts and are claimed by
+    the ``ingestion_worker`` command. At most one job per idempotency key can
+    be queued or running at a time.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (COMPLETE, 'Complete'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [QUEUED, RUNNING]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ingestion_jobs')
+    idempotency_key = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    progress = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['idempotency_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_ingestion_job',
+            ),
+        ]
+    
+    @property
+    def is_active(self) -> bool:
+        return self.status in self.ACTIVE_STATUSES
+    
+    def __str__(self) -> str:
+        return f"Ingestion {self.id} for {self.user} ({self.status})"
+    
 class SpotifyToken(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -125,32 +326,14 @@ class SpotifyToken(models.Model):
         return is_expired
     
     def refresh(self):
-        """Refresh the Spotify access token using the refresh token."""
-        if not self.refresh_token:
-            logger.error(f"No refresh token available for user {self.user.id}")
-            raise ValueError("No refresh token available")
-            
-        try:
-            sp_oauth = SpotifyOAuth(
-                client_id=settings.SPOTIFY_CLIENT_ID,
-                client_secret=settings.SPOTIFY_CLIENT_SECRET,
-                redirect_uri=settings.SPOTIFY_REDIRECT_URI,
-                scope=SCOPE
-            )
-            
-            token_info = sp_oauth.refresh_access_token(self.refresh_token)
-            
-            if token_info:
-                self.access_token = token_info['access_token']
-                if token_info.get('refresh_token'):
-                    self.refresh_token = token_info['refresh_token']
-                self.expires_at = timezone.now() + timedelta(seconds=token_info['expires_in'])
-                self.save()
-                
-            return self.access_token
-        except Exception as e:
-            logger.error(f"Error refreshing token for user {self.user.id}: {str(e)}")
-            raise
+        """Refresh the Spotify access token through the shared token service."""
+        from .token_service import token_service
+
+        token = token_service.refresh(self.user_id)
+        self.access_token = token.access_token
+        self.refresh_token = token.refresh_token
+        self.expires_at = token.expires_at_datetime
+        return self.access_token
         
     def is_valid(self):
         """Check if the token is valid and not expired."""
@@ -0,0 +1,223 @@
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Set, Type
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Artist, MostListenedAlbum, MostListenedArtist, MostListenedSongs, TrackLyrics
+
+logger = logging.getLogger("spotify")
+
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+
+    def __add__(self, other: 'UpsertResult') -> 'UpsertResult':
+        return UpsertResult(
+            inserted=self.inserted + other.inserted,
+            updated=self.updated + other.updated
+        )
+
+
+def bulk_upsert(model: Type[models.Model], user, rows: Iterable[Dict]) -> UpsertResult:
+    """Insert or update a user's batch of rows keyed by ``(user, spotify_id)``.
+
+    The whole batch is written with a single ``INSERT ... ON CONFLICT DO
+    UPDATE`` inside one transaction instead of one ``update_or_create`` per
+    row. Duplicate ids within the batch are collapsed, last one wins.
+    Pass ``user=None`` for models that are not owned by a user.
+    """
+    by_id: Dict[str, Dict] = {}
+    for row in rows:
+        by_id[row['spotify_id']] = row
+
+    if not by_id:
+        return UpsertResult()
+
+    update_fields = sorted({
+        field for row in by_id.values() for field in row
+        if field != 'spotify_id'
+    })
+
+    # Owned rows are unique per user, so another user's copy is never touched
+    owner = {'user': user} if user is not None else {}
+    unique_fields = [*owner, 'spotify_id']
+
+    with transaction.atomic():
+        existing = set(
+            model.objects.filter(spotify_id__in=list(by_id), **owner)
+            .values_list('spotify_id', flat=True)
+        )
+        model.objects.bulk_create(
+            [model(**owner, **row) for row in by_id.values()],
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+
+    result = UpsertResult(
+        inserted=len(by_id) - len(existing),
+        updated=len(existing)
+    )
+    logger.info(
+        f"Upserted {len(by_id)} {model.__name__} rows"
+        f"{f' for user {user.id}' if user is not None else ''}: "
+        f"{result.inserted} inserted, {result.updated} updated"
+    )
+    return result
+
+
+@sync_to_async
+def bulk_upsert_tracks(user, rows: List[Dict]) -> UpsertResult:
+    return bulk_upsert(MostListenedSongs, user, rows)
+
+
+@sync_to_async
+def bulk_upsert_albums(user, rows: List[Dict]) -> UpsertResult:
+    return bulk_upsert(MostListenedAlbum, user, rows)
+
+
+def bulk_update_existing(model: Type[models.Model], user, rows: Iterable[Dict]) -> UpsertResult:
+    """Update a subset of fields on rows the user already has, keyed by ``spotify_id``.
+
+    Used for refreshes where only volatile fields change, so the stored
+    enrichment is left untouched. Ids the user does not have are ignored.
+    Pass ``user=None`` for models that are not owned by a user.
+    """
+    by_id = {row['spotify_id']: row for row in rows}
+    if not by_id:
+        return UpsertResult()
+
+    fields = sorted({field for row in by_id.values() for field in row if field != 'spotify_id'})
+    queryset = model.objects.filter(spotify_id__in=list(by_id))
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    with transaction.atomic():
+        objects = list(queryset)
+        for obj in objects:
+            for field, value in by_id[obj.spotify_id].items():
+                setattr(obj, field, value)
+        model.objects.bulk_update(objects, fields)
+
+    logger.info(
+        f"Updated {', '.join(fields)} on {len(objects)} {model.__name__} rows"
+        f"{f' for user {user.id}' if user is not None else ''}"
+    )
+    return UpsertResult(updated=len(objects))
+
+
+def user_track_lyrics_flags(user) -> Dict[str, bool]:
+    """Map of the user's stored track ids to whether they have lyrics."""
+    return dict(MostListenedSongs.objects.filter(user=user).values_list('spotify_id', 'has_lyrics'))
+
+
+def delete_rows_except(model: Type[models.Model], user, keep_ids: Iterable[str]) -> int:
+    """Delete the user's rows whose ``spotify_id`` is not in ``keep_ids``."""
+    deleted, _ = model.objects.filter(user=user).exclude(spotify_id__in=list(keep_ids)).delete()
+    if deleted:
+        logger.info(f"Deleted {deleted} {model.__name__} rows no longer in user {user.id}'s top list")
+    return deleted
+
+
+def stale_artist_ids(spotify_ids: Iterable[str], max_age: Optional[timedelta] = None) -> Set[str]:
+    """Return the ids the catalog has never enriched or enriched too long ago."""
+    spotify_ids = set(spotify_ids)
+    max_age = max_age or getattr(settings, 'ARTIST_CATALOG_MAX_AGE', timedelta(days=30))
+    fresh = set(
+        Artist.objects.filter(spotify_id__in=spotify_ids)
+        .exclude(Q(enriched_at__isnull=True) | Q(enriched_at__lt=timezone.now() - max_age))
+        .values_list('spotify_id', flat=True)
+    )
+    return spotify_ids - fresh
+
+
+def artists_missing_biography(spotify_ids: Iterable[str]) -> Set[str]:
+    """Return the catalog ids that have no biography stored yet."""
+    return set(
+        Artist.objects.filter(spotify_id__in=set(spotify_ids), biography__isnull=True)
+        .values_list('spotify_id', flat=True)
+    )
+
+
+def replace_artist_ranking(user, spotify_ids: List[str]) -> UpsertResult:
+    """Point the user's top artists at catalog rows, ranked in list order.
+
+    Artists that dropped out of the user's top list are unlinked; the
+    catalog rows themselves are kept for other listeners.
+    """
+    ranks = {}
+    for spotify_id in spotify_ids:
+        ranks.setdefault(spotify_id, len(ranks) + 1)
+
+    with transaction.atomic():
+        artist_ids = dict(
+            Artist.objects.filter(spotify_id__in=list(ranks))
+            .values_list('spotify_id', 'id')
+        )
+        links = MostListenedArtist.objects.filter(user=user)
+        existing = set(links.filter(artist_id__in=artist_ids.values()).values_list('artist_id', flat=True))
+        links.exclude(artist_id__in=artist_ids.values()).delete()
+        MostListenedArtist.objects.bulk_create(
+            [
+                MostListenedArtist(user=user, artist_id=artist_ids[spotify_id], rank=rank)
+                for spotify_id, rank in ranks.items() if spotify_id in artist_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'artist'],
+            update_fields=['rank'],
+        )
+
+    result = UpsertResult(
+        inserted=len(artist_ids) - len(existing),
+        updated=len(existing)
+    )
+    logger.info(
+        f"Ranked {len(artist_ids)} artists for user {user.id}: "
+        f"{result.inserted} new, {result.updated} kept"
+    )
+    return result
+
+
+@sync_to_async
+def bulk_upsert_artists(rows: List[Dict]) -> UpsertResult:
+    return bulk_upsert(Artist, None, rows)
+
+
+def stored_lyrics(spotify_ids: Iterable[str]) -> Dict[str, TrackLyrics]:
+    """Load stored lyrics entries, hits and misses, for the given tracks."""
+    return {
+        entry.spotify_id: entry
+        for entry in TrackLyrics.objects.filter(spotify_id__in=list(spotify_ids))
+    }
+
+
+def save_lyrics(spotify_id: str, text: Optional[str], source_url: Optional[str] = None) -> TrackLyrics:
+    """Record a lookup result; ``text=None`` stores a "not found" entry."""
+    entry, _ = TrackLyrics.objects.update_or_create(
+        spotify_id=spotify_id,
+        defaults={
+            'compressed_text': TrackLyrics.compress(text) if text else None,
+            'content_hash': TrackLyrics.hash_text(text) if text else '',
+            'source_url': source_url,
+            'found': bool(text),
+            'fetched_at': timezone.now(),
+        },
+    )
+    return entry
+
+
+get_user_tracks = sync_to_async(user_track_lyrics_flags)
+refresh_user_tracks = sync_to_async(partial(bulk_update_existing, MostListenedSongs))
+delete_user_rows_except = sync_to_async(delete_rows_except)
+get_stale_artist_ids = sync_to_async(stale_artist_ids)
+get_artists_missing_biography = sync_to_async(artists_missing_biography)
+update_artists = sync_to_async(partial(bulk_update_existing, Artist, None))
+get_stored_lyrics = sync_to_async(stored_lyrics)
+store_lyrics = sync_to_async(save_lyrics)
+rank_user_artists = sync_to_async(replace_artist_ranking)
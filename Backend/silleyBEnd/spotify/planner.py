@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger("spotify")
+
+
+class SpotifyCallPlanner:
+    """Collects the artist ids an ingestion needs and resolves them in batches.
+
+    Ids are deduplicated across tracks and artists, then fetched with
+    Spotify's multi-id endpoint instead of one request per object. Top
+    tracks already embed their full album, so albums and tracks never
+    need a lookup of their own.
+    """
+
+    # Maximum ids accepted by each multi-id endpoint
+    BATCH_SIZES = {
+        'artists': 50,
+    }
+
+    def __init__(self, sp):
+        self.sp = sp
+        self._wanted: Dict[str, Dict[str, None]] = {kind: {} for kind in self.BATCH_SIZES}
+        self._resolved: Dict[str, Dict[str, Dict]] = {kind: {} for kind in self.BATCH_SIZES}
+        self._lock = asyncio.Lock()
+        self.request_count = 0
+
+    def add_artists(self, artist_ids: Iterable[str]) -> None:
+        self._add('artists', artist_ids)
+
+    def prime(self, kind: str, objects: Iterable[Dict]) -> None:
+        """Register full objects we already hold so they are never fetched."""
+        for obj in objects:
+            if obj and obj.get('id'):
+                self._resolved[kind][obj['id']] = obj
+
+    def _add(self, kind: str, ids: Iterable[str]) -> None:
+        for object_id in ids:
+            if object_id:
+                self._wanted[kind][object_id] = None
+
+    def artist(self, artist_id: str) -> Optional[Dict]:
+        return self._resolved['artists'].get(artist_id)
+
+    async def resolve(self) -> None:
+        """Fetch every wanted id that has not been resolved yet."""
+        # Import here to avoid a circular import with utils
+        from .utils import safe_spotify_request
+
+        async with self._lock:
+            for kind, batch_size in self.BATCH_SIZES.items():
+                missing = [
+                    object_id for object_id in self._wanted[kind]
+                    if object_id not in self._resolved[kind]
+                ]
+                for batch in self._chunks(missing, batch_size):
+                    try:
+                        self.request_count += 1
+                        # sp.artists
+                        response = await safe_spotify_request(getattr(self.sp, kind), batch)
+                    except Exception as e:
+                        logger.warning(f"Error resolving {len(batch)} {kind}: {e}")
+                        continue
+                    self.prime(kind, (response or {}).get(kind, []))
+                self._wanted[kind].clear()
+
+    @staticmethod
+    def _chunks(ids: List[str], size: int) -> Iterable[List[str]]:
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
@@ -0,0 +1,99 @@
+import copy
+import logging
+import time
+from typing import Dict, List, Optional
+from asgiref.sync import sync_to_async
+from .candidate_pools import eligible
+from .models import IngestionJob, User
+
+logger = logging.getLogger("spotify")
+
+
+# Eligible songs or artists each game mode needs before a game can start
+GAME_MODE_REQUIREMENTS = {
+    'guess_artist': 1,
+    'crossword': 1,
+    'lyrics_text': 4,
+    'lyrics_voice': 4,
+    'trivia': 4,
+}
+
+
+def game_mode_readiness(user: User) -> Dict[str, Dict]:
+    """Per game mode: whether it can start, and how much data it has and needs.
+
+    Counts what ``candidate_pools.eligible`` would put in the mode's pool,
+    so a mode reported ready always has candidates to sample.
+    """
+    readiness = {}
+    for mode, need in GAME_MODE_REQUIREMENTS.items():
+        have = eligible(user, mode).count()
+        readiness[mode] = {'ready': have >= need, 'have': min(have, need), 'need': need}
+    return readiness
+
+
+def ready_game_modes(user: User) -> List[str]:
+    """Game modes that have enough of the user's data to start."""
+    return [mode for mode, state in game_mode_readiness(user).items() if state['ready']]
+
+
+class IngestionProgress:
+    """Counters for one ingestion run, saved on its job for the progress stream.
+
+    Writes are throttled to one every ``FLUSH_INTERVAL`` seconds; stage
+    changes are always written.
+    """
+
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, job_id: Optional[int] = None):
+        self.job_id = job_id
+        self.state: Dict = {
+            'stage': 'starting',
+            'tracks': {'done': 0, 'total': 0},
+            'artists': {'done': 0, 'total': 0},
+            'modes': [],
+            'readiness': {},
+        }
+        self._last_flush = 0.0
+
+    async def set_total(self, kind: str, total: int) -> None:
+        self.state[kind]['total'] = total
+        await self.flush()
+
+    async def advance(self, kind: str, count: int = 1) -> None:
+        self.state[kind]['done'] += count
+        await self.flush()
+
+    async def set_stage(self, stage: str, user: Optional[User] = None) -> None:
+        self.state['stage'] = stage
+        if user is not None:
+            await self._update_readiness(user)
+        await self.flush(force=True)
+
+    async def refresh_readiness(self, user: User) -> None:
+        """Recount per-mode readiness after a write; saved at once when a mode opens up."""
+        if self.job_id is None:
+            return
+        before = self.state['modes']
+        await self._update_readiness(user)
+        await self.flush(force=self.state['modes'] != before)
+
+    async def _update_readiness(self, user: User) -> None:
+        readiness = await sync_to_async(game_mode_readiness)(user)
+        self.state['readiness'] = readiness
+        self.state['modes'] = [mode for mode, state in readiness.items() if state['ready']]
+
+    async def flush(self, force: bool = False) -> None:
+        if self.job_id is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        try:
+            await sync_to_async(
+                IngestionJob.objects.filter(id=self.job_id).update
+            )(progress=copy.deepcopy(self.state))
+        except Exception as e:
+            logger.warning(f"Could not save progress for ingestion job {self.job_id}: {e}")
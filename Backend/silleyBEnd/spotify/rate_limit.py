@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Mapping, Optional
+import redis
+from django.conf import settings
+
+logger = logging.getLogger("spotify")
+
+# Who the current request is made for; waiting requests are granted
+# round-robin between owners so one large ingestion cannot starve others.
+rate_limit_owner: ContextVar[Optional[str]] = ContextVar('rate_limit_owner', default=None)
+
+DEFAULT_RETRY_AFTER = 5  # seconds, when a 429 carries no usable Retry-After
+
+# Atomically refill and take one token. Time comes from the Redis server so
+# every process agrees on it. Returns the seconds to wait, "0" on success.
+TAKE_TOKEN_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+
+local blocked_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+# Push the provider's blocked-until time forward, never backward
+BLOCK_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local target = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if target > current then
+    redis.call('SET', KEYS[1], tostring(target), 'PX', math.ceil(tonumber(ARGV[1]) * 1000))
+end
+return tostring(target)
+"""
+
+
+class LocalBucketStore:
+    """In-process token buckets, used when no Redis is configured or reachable."""
+
+    def __init__(self):
+        self._buckets: Dict[str, tuple] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def take(self, provider: str, rate: float, burst: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            blocked = self._blocked_until.get(provider, 0) - now
+            if blocked > 0:
+                return blocked
+
+            tokens, last = self._buckets.get(provider, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[provider] = (tokens, now)
+            return wait
+
+    def block(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._blocked_until[provider] = max(self._blocked_until.get(provider, 0), until)
+
+
+class RedisBucketStore:
+    """Token buckets shared by every process through Redis.
+
+    Falls back to in-process buckets while Redis is unreachable, so an
+    outage degrades to per-process limits instead of failing requests.
+    """
+
+    KEY_PREFIX = 'ratelimit'
+
+    def __init__(self, url: str):
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self._take = self.client.register_script(TAKE_TOKEN_SCRIPT)
+        self._block = self.client.register_script(BLOCK_SCRIPT)
+        self.fallback = LocalBucketStore()
+        self._last_warning = 0.0
+
+    def _warn(self, error: Exception) -> None:
+        if time.monotonic() - self._last_warning > 60:
+            self._last_warning = time.monotonic()
+            logger.warning(f"Redis rate limiter unavailable, using local buckets: {error}")
+
+    def take(self, provider: str, rate: float, burst: float) -> float:
+        keys = [f"{self.KEY_PREFIX}:{provider}", f"{self.KEY_PREFIX}:{provider}:blocked"]
+        try:
+            return float(self._take(keys=keys, args=[rate, burst]))
+        except redis.RedisError as e:
+            self._warn(e)
+            return self.fallback.take(provider, rate, burst)
+
+    def block(self, provider: str, seconds: float) -> None:
+        self.fallback.block(provider, seconds)
+        try:
+            self._block(keys=[f"{self.KEY_PREFIX}:{provider}:blocked"], args=[seconds])
+        except redis.RedisError as e:
+            self._warn(e)
+
+
+class ProviderScheduler:
+    """Grants one provider's tokens to waiting requests, round-robin by owner."""
+
+    def __init__(self, provider: str, limiter: 'RateLimiter'):
+        self.provider = provider
+        self.limiter = limiter
+        self._waiting: "OrderedDict[Optional[str], Deque[asyncio.Future]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def acquire(self, owner: Optional[str]) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(owner, deque()).append(future)
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        while self._waiting:
+            owner, queue = self._waiting.popitem(last=False)
+            while queue and queue[0].done():
+                queue.popleft()
+            if not queue:
+                continue
+            future = queue.popleft()
+            if queue:
+                # Owner goes to the back of the line for its next request
+                self._waiting[owner] = queue
+            return future
+        return None
+
+    def _has_waiters(self) -> bool:
+        return any(not future.done() for queue in self._waiting.values() for future in queue)
+
+    async def _dispatch(self) -> None:
+        try:
+            while self._has_waiters():
+                wait = await asyncio.to_thread(self.limiter.take, self.provider)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                future = self._next_waiter()
+                if future:
+                    future.set_result(None)
+        finally:
+            self._dispatcher = None
+
+
+class RateLimiter:
+    """Per-provider token-bucket scheduler shared across processes.
+
+    Limits come from ``settings.RATE_LIMITS`` (requests per second and
+    burst size); providers without an entry are not limited. Buckets live in
+    Redis at ``settings.RATE_LIMIT_REDIS_URL`` when it is set.
+    """
+
+    def __init__(self):
+        self._store = None
+        self._store_lock = threading.Lock()
+        self._schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ProviderScheduler]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def store(self):
+        with self._store_lock:
+            if self._store is None:
+                url = getattr(settings, 'RATE_LIMIT_REDIS_URL', None)
+                self._store = RedisBucketStore(url) if url else LocalBucketStore()
+            return self._store
+
+    def limits(self, provider: str) -> Optional[Dict]:
+        return getattr(settings, 'RATE_LIMITS', {}).get(provider)
+
+    def take(self, provider: str) -> float:
+        limits = self.limits(provider)
+        return self.store.take(provider, limits['rate'], limits.get('burst', 1))
+
+    async def acquire(self, provider: str) -> None:
+        """Wait for a token for ``provider``, queued fairly between owners."""
+        if not self.limits(provider):
+            return
+        loop = asyncio.get_running_loop()
+        schedulers = self._schedulers.setdefault(loop, {})
+        scheduler = schedulers.get(provider)
+        if scheduler is None:
+            scheduler = schedulers[provider] = ProviderScheduler(provider, self)
+        await scheduler.acquire(rate_limit_owner.get())
+
+    def acquire_sync(self, provider: str) -> None:
+        """Blocking variant for synchronous clients such as the Gemini SDK."""
+        if not self.limits(provider):
+            return
+        while True:
+            wait = self.take(provider)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def defer(self, provider: str, seconds: float) -> None:
+        """Hold every process's requests to ``provider`` for ``seconds``."""
+        logger.warning(f"Rate limited by {provider}, pausing requests for {seconds:.1f}s")
+        self.store.block(provider, seconds)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]], default: float = DEFAULT_RETRY_AFTER) -> float:
+    """Seconds from a Retry-After header given as seconds or an HTTP date."""
+    value = None
+    if headers:
+        value = next((v for k, v in headers.items() if k.lower() == 'retry-after'), None)
+    if not value:
+        return default
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+@contextmanager
+def owner(name: Optional[str]):
+    """Attribute rate-limited requests made inside the block to ``name``."""
+    token = rate_limit_owner.set(name)
+    try:
+        yield
+    finally:
+        rate_limit_owner.reset(token)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+from .http_cache import http_cache
+from .http_clients import ProviderResponse, provider_clients
+from .ingestion import process_user_data
+from .models import User
+from .spotify_client import AsyncSpotify
+
+logger = logging.getLogger("spotify")
+
+# Response headers kept in a cassette; the rest are dropped
+RECORDED_HEADERS = {'content-type', 'retry-after', 'etag', 'last-modified', 'cache-control'}
+
+
+def http_key(provider: str, url: str, params: Optional[Dict] = None) -> str:
+    query = urlencode(sorted((params or {}).items()), doseq=True)
+    return f"{provider} {url}?{query}" if query else f"{provider} {url}"
+
+
+class Cassette:
+    """Recorded provider responses for offline ingestion runs.
+
+    Responses, Spotify's included, are keyed by provider, URL and query
+    parameters; request headers such as the access token are ignored.
+    """
+
+    def __init__(self, http: Optional[Dict] = None):
+        self.http: Dict[str, Dict] = http or {}
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data.get('http'))
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'http': self.http}, f, indent=1, sort_keys=True)
+
+    def record_http(self, provider: str, url: str, params: Optional[Dict], response: ProviderResponse) -> None:
+        self.http[http_key(provider, url, params)] = {
+            'status': response.status,
+            'url': response.url,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() in RECORDED_HEADERS},
+            'body': response.text(),
+        }
+
+    def http_response(self, provider: str, url: str, params: Optional[Dict]) -> Optional[ProviderResponse]:
+        entry = self.http.get(http_key(provider, url, params))
+        if entry is None:
+            return None
+        return ProviderResponse(
+            status=entry['status'],
+            url=entry['url'],
+            headers=dict(entry['headers']),
+            body=entry['body'].encode('utf-8'),
+        )
+
+
+@dataclass
+class Faults:
+    """Latency and errors injected into replayed responses.
+
+    ``latency`` is in seconds per provider, with ``'default'`` covering
+    providers that are not listed.
+    """
+    latency: Dict[str, float] = field(default_factory=dict)
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+    _random: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    def delay(self, provider: str) -> float:
+        return self.latency.get(provider, self.latency.get('default', 0.0))
+
+    def fails(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+class CallStats:
+    """Thread-safe per-provider counts of calls, cassette misses and injected errors."""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, counter: Counter, provider: str) -> None:
+        with self._lock:
+            counter[provider] += 1
+
+
+class RecordingTransport:
+    """Sends requests to the live providers and stores every response."""
+
+    def __init__(self, cassette: Cassette, stats: CallStats):
+        self.cassette = cassette
+        self.stats = stats
+
+    async def __call__(self, provider: str, url: str, *, params: Optional[Dict] = None,
+                       headers: Optional[Dict] = None) -> ProviderResponse:
+        self.stats.count(self.stats.calls, provider)
+        response = await provider_clients.fetch(provider, url, params=params, headers=headers)
+        self.cassette.record_http(provider, url, params, response)
+        return response
+
+
+class ReplayTransport:
+    """Answers provider requests from a cassette.
+
+    Requests missing from the cassette get a 404, as an unknown page would.
+    """
+
+    def __init__(self, cassette: Cassette, faults: Faults, stats: CallStats):
+        self.cassette = cassette
+        self.faults = faults
+        self.stats = stats
+
+    async def __call__(self, provider: str, url: str, *, params: Optional[Dict] = None,
+                       headers: Optional[Dict] = None) -> ProviderResponse:
+        self.stats.count(self.stats.calls, provider)
+        await asyncio.sleep(self.faults.delay(provider))
+        if self.faults.fails():
+            self.stats.count(self.stats.errors, provider)
+            return ProviderResponse(status=503, url=url)
+
+        response = self.cassette.http_response(provider, url, params)
+        if response is None:
+            self.stats.count(self.stats.misses, provider)
+            return ProviderResponse(status=404, url=url)
+        return response
+
+
+@dataclass
+class BenchmarkResult:
+    users: int
+    wall_seconds: float
+    user_seconds: List[float]
+    peak_memory_bytes: int
+    calls: Dict[str, int]
+    misses: Dict[str, int]
+    errors: Dict[str, int]
+    cache: Dict[str, int] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'users': self.users,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'max_user_seconds': round(max(self.user_seconds, default=0), 3),
+            'peak_memory_per_user_mb': round(self.peak_memory_bytes / max(self.users, 1) / 2**20, 2),
+            'calls': dict(sorted(self.calls.items())),
+            'total_calls': sum(self.calls.values()),
+            'misses': dict(sorted(self.misses.items())),
+            'errors': dict(sorted(self.errors.items())),
+            'cache': dict(sorted(self.cache.items())),
+        }
+
+
+async def benchmark_ingestion(users: List[User], transport, stats: CallStats,
+                              access_token: str = 'replay') -> BenchmarkResult:
+    """Ingest ``users`` concurrently with every provider request sent through ``transport``.
+
+    Peak memory is the Python allocation peak traced over the whole run.
+    """
+    async def ingest(user: User) -> float:
+        started = time.perf_counter()
+        try:
+            await process_user_data(user, sp=AsyncSpotify(auth=access_token))
+        except Exception as e:
+            logger.error(f"Benchmark ingestion failed for user {user.id}: {e}")
+        return time.perf_counter() - started
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    cache_before = http_cache.stats.copy()
+    started = time.perf_counter()
+    try:
+        with provider_clients.use_transport(transport):
+            user_seconds = await asyncio.gather(*(ingest(user) for user in users))
+        wall_seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    return BenchmarkResult(
+        users=len(users),
+        wall_seconds=wall_seconds,
+        user_seconds=list(user_seconds),
+        peak_memory_bytes=peak,
+        calls=dict(stats.calls),
+        misses=dict(stats.misses),
+        errors=dict(stats.errors),
+        cache=dict(http_cache.stats - cache_before),
+    )
@@ -1,11 +1,13 @@
+import atexit
+import multiprocessing
 import ssl
 import certifi
 import aiohttp 
 import asyncio
-from bs4 import BeautifulSoup
 import requests
 import time
 from typing import Optional, Dict, List
+from concurrent.futures import ProcessPoolExecutor
 from functools import lru_cache
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -18,10 +20,33 @@ from typing import Tuple, Dict
 from asgiref.sync import sync_to_async
 from django.db import transaction
 from .models import MostListenedArtist
+from .http_clients import provider_clients
+from .lyrics_extraction import extract_lyrics
+from .persistence import get_stored_lyrics, store_lyrics
 import logging
 
 logger = logging.getLogger("spotify")
 
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+
+
+def lyrics_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared process pool for lyrics extraction, or None to use a thread.
+    
+    Sized by ``settings.LYRICS_EXTRACTION_WORKERS``. Workers are spawned
+    rather than forked so they never inherit the running event loop.
+    """
+    global _extraction_pool
+    workers = getattr(settings, 'LYRICS_EXTRACTION_WORKERS', 0)
+    if not workers:
+        return None
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+        )
+        atexit.register(_extraction_pool.shutdown, wait=False, cancel_futures=True)
+    return _extraction_pool
+
 class LyricsService:
     def __init__(self):
         self.genius_token= settings.GENIUS_API_TOKEN
@@ -32,15 +57,37 @@ class LyricsService:
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
             "Accept-Language" : "en-US,en;q=0.5",
         }
-         # Create SSL context with verified certificates
-        self.ssl_context = ssl.create_default_context(cafile=certifi.where())
+        self._stored = {}
+    
+    async def preload(self, track_ids: List[str]) -> None:
+        """Load stored lyrics for a batch of tracks in one query."""
+        self._stored.update(await get_stored_lyrics(track_ids))
+    
+    async def lyrics_for_track(self, track_id: str, song_title: str,
+                               artist_name: Optional[str] = None) -> Optional[str]:
+        """Return lyrics for a track, scraping Genius only on a store miss.
         
-    async def _create_client_session(self) -> aiohttp.ClientSession:
-        """Create a client session with proper SSL configuration."""
-        return aiohttp.ClientSession(
-            headers = self.headers,
-            connector= TCPConnector(ssl=self.ssl_context)
-        )
+        Found lyrics are reused across users; "not found" results are trusted
+        until ``settings.LYRICS_NOT_FOUND_TTL`` passes. A lookup that fails
+        (network error, Genius 5xx or rate limit) stores nothing, so the
+        track is looked up again next time.
+        """
+        if track_id not in self._stored:
+            self._stored.update(await get_stored_lyrics([track_id]))
+        
+        entry = self._stored.get(track_id)
+        if entry and not entry.is_expired():
+            logger.debug(f"Lyrics store hit for {track_id} (found={entry.found})")
+            return entry.text
+        
+        try:
+            url = await self.search_song(song_title, artist_name)
+            lyrics = await self.get_lyrics(url) if url else None
+        except Exception as e:
+            logger.warning(f"Lyrics lookup for {track_id} failed, not storing a result: {e}")
+            return None
+        self._stored[track_id] = await store_lyrics(track_id, lyrics, url)
+        return lyrics
                  
     @retry(stop=stop_after_attempt(3),wait=wait_exponential(multiplier=1, min=4, max=10))
     async def search_song(self, song_title: str, artist_name: Optional[str] = None) -> Optional[str]:
@@ -52,42 +99,46 @@ class LyricsService:
             logger.error(f"Invalid artist_name type: {type(artist_name)} ")
             return None
         params = {"q": song_title}
-        async with await self._create_client_session() as session:
-            try:
-                async with session.get(self.search_url, params=params) as response:
-                    response.raise_for_status()
-                    if response.status != 200:
-                        logger.error(f"Search failed: {response.status}")
-                        return None
-                    
-                    data = await response.json()
-                    hits = data.get("response", {}).get("hits",[])
-                    
-                    for hit in hits:
-                        song = hit.get("result", {})
-                        if not song:
-                            continue
-                        
-                        artist_data = song.get("primary_artist",{})
-                        artist_name_from_api = artist_data.get("name","") if artist_data else ""
-                        
-                        if not artist_name or (
-                            artist_name_from_api and
-                            isinstance(artist_name, str) and 
-                            artist_name.lower() in artist_name_from_api.lower()
-                        ):
-                            return song.get("url")
-                    
-                    logger.warning(f"No matching songs found for {song_title}")
-                    return None
+        try:
+            response = await provider_clients.get(
+                'genius', self.search_url, params=params, headers=self.headers
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            hits = data.get("response", {}).get("hits",[])
+            
+            for hit in hits:
+                song = hit.get("result", {})
+                if not song:
+                    continue
                 
-            except aiohttp.ClientError as e:
-                logger.error(f"Network error searching song: {e}")
-                return None
+                artist_data = song.get("primary_artist",{})
+                artist_name_from_api = artist_data.get("name","") if artist_data else ""
                 
-            except Exception as e:
-                logger.error(f"Error searching song: {e}")
+                if not artist_name or (
+                    artist_name_from_api and
+                    isinstance(artist_name, str) and 
+                    artist_name.lower() in artist_name_from_api.lower()
+                ):
+                    return song.get("url")
+            
+            logger.warning(f"No matching songs found for {song_title}")
+            return None
+        
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
                 return None
+            logger.error(f"Error response searching song: {e}")
+            raise
+            
+        except aiohttp.ClientError as e:
+            logger.error(f"Network error searching song: {e}")
+            raise
+            
+        except Exception as e:
+            logger.error(f"Error searching song: {e}")
+            raise
             
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))        
     async def get_lyrics(self,song_url: str) -> Optional[str]:
@@ -95,57 +146,40 @@ class LyricsService:
             logger.error("Invalid song_url type: must be string")
             return None
         
-        async with await self._create_client_session() as session:
-            try:
-                async with session.get(song_url) as response:
-                    response.raise_for_status()
-                    if response.status != 200:
-                        logger.error(f"Lyrics fetch failed: {response.status}")
-                        return None
-                    
-                    html = await response.text()
-                    if not html:
-                        return None
-                    
-                    soup = BeautifulSoup(html, 'html.parser')
-                    lyrics = await self.extract_lyrics(soup)
-                    
-                    return lyrics
-            
+        try:
+            response = await provider_clients.get('genius', song_url, headers=self.headers)
+            response.raise_for_status()
             
-            except aiohttp.ClientError as e:
-                logger.error(f"Network error fetching lyrics: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"Error fetching lyrics: {e}")
+            html = response.text()
+            if not html:
                 return None
             
-    async def extract_lyrics(self, soup: BeautifulSoup) -> Optional[str]:
-        if not isinstance(soup, BeautifulSoup):
-            logger.error("Invalid soup type: must be BeautifulSoup")
-            return None
+            return await self.extract_lyrics(html)
         
-        try: 
-            lyrics_containers = soup.select('div[class*="Lyrics__Container"]')
-            if not lyrics_containers:
-                lyrics_containers = soup.find_all("div", attrs={"data-lyrics-container": "true"})
-                
-            if not lyrics_containers:
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
+                # The page is gone, which is a real miss
                 return None
+            logger.error(f"Error response fetching lyrics: {e}")
+            raise
+        except aiohttp.ClientError as e:
+            logger.error(f"Network error fetching lyrics: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching lyrics: {e}")
+            raise
             
-            lyrics = []
-            for container in lyrics_containers:
-                for element in container.find_all(['script', 'button']):
-                    element.decompose()
-                text = container.get_text(separator='\n')
-                lyrics.append(text.strip())
-                
-            full_lyrics = '\n'.join(lyrics)
-            full_lyrics = re.sub(r'\n{3,}', '\n\n', full_lyrics)
-            full_lyrics = re.sub(r'\[.*?\]', '', full_lyrics)
-                    
-            return full_lyrics.strip()
+    async def extract_lyrics(self, html: str) -> Optional[str]:
+        """Extract lyrics from a Genius page in the extraction worker pool."""
+        if not isinstance(html, str):
+            logger.error("Invalid html type: must be string")
+            return None
         
+        try:
+            pool = lyrics_extraction_pool()
+            if pool is None:
+                return await asyncio.to_thread(extract_lyrics, html)
+            return await asyncio.get_running_loop().run_in_executor(pool, extract_lyrics, html)
         except Exception as e:
             logger.error(f"Error extracting lyrics: {e}")
             return None
@@ -157,13 +191,6 @@ class ArtistDetailsService:
             "Early life", "Personal life", "Artistry",
             "Filmography", "Discography", "Awards and nominations"
          ]
-        self.ssl_context = ssl.create_default_context(cafile=certifi.where())
-
-    async def _create_session(self) -> aiohttp.ClientSession:
-        return aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30),
-            connector=TCPConnector(ssl=self.ssl_context)
-         )
 
     def _format_section(self, title: str, content: str) -> str:
         """Format a section with proper line breaks and spacing"""
@@ -209,65 +236,102 @@ class ArtistDetailsService:
             formatted = "\n".join(para.strip() for para in paragraphs if para.strip())
             return f"\n{title}\n{'='*len(title)}\n{formatted}\n"
         
+    async def resolve_page_title(self, artist_name: str) -> Optional[str]:
+        """Find the Wikipedia page for an artist with a single search call.
+        
+        Only an exact title or a disambiguated one such as "Drake (musician)"
+        is accepted. The top hit alone is often a song, an album or another
+        artist, so with no such title there is no page.
+        """
+        params = {
+            "action": "query",
+            "list": "search",
+            "srsearch": f"{artist_name} musician",
+            "srlimit": 5,
+            "srprop": "",
+            "format": "json",
+            "formatversion": 2,
+        }
+        response = await provider_clients.get('wikipedia', self.base_url, params=params)
+        response.raise_for_status()
+        hits = [hit["title"] for hit in response.json().get("query", {}).get("search", [])]
+        if not hits:
+            return None
+        
+        name = artist_name.strip().lower()
+        for title in hits:
+            if title.lower() == name or title.lower().startswith(f"{name} ("):
+                return title
+        logger.info(f"No Wikipedia page titled after {artist_name} among {hits}")
+        return None
+    
+    def _build_biography(self, wikitext: str) -> Optional[str]:
+        """Pick the desired sections out of a page's wikitext and format them.
+        
+        CPU-bound, so callers run it in a worker thread.
+        """
+        wanted = {section.lower() for section in self.desired_sections}
+        seen = set()
+        taken = []
+        biography_sections = []
+        
+        wikicode = mwparserfromhell.parse(wikitext)
+        for section in wikicode.get_sections(levels=[2, 3], include_headings=True):
+            title = section.filter_headings()[0].title.strip_code().strip()
+            raw = str(section)
+            # Skip repeats and subsections already included with their parent
+            if title.lower() not in wanted or title.lower() in seen or any(raw in t for t in taken):
+                continue
+            seen.add(title.lower())
+            taken.append(raw)
+            
+            parsed_text = section.strip_code().strip()
+            if parsed_text:
+                biography_sections.append(self._format_section(title, parsed_text))
+        
+        if not biography_sections:
+            return None
+        return "ARTIST BIOGRAPHY\n" + "="*16 + "\n\n" + "\n".join(biography_sections)
+        
     async def get_artist_details(self, artist_name: str) -> str:
+        """Biography built from selected Wikipedia sections.
+        
+        Two requests per artist: a title search and one wikitext fetch for the
+        whole page. Parsing happens off the event loop.
+        """
         if not isinstance(artist_name, str):
             return "No biography available"
 
         try:
-            async with await self._create_session() as session:
-                 # Step 1: Get all sections
-                params = {
-                    "action": "parse",
-                    "page": artist_name.title(),  # Ensure proper capitalization
-                    "format": "json",
-                    "prop": "sections"
-                }
-                
-                async with session.get(self.base_url, params=params) as response:
-                    data = await response.json()    
-                     # Check if page exists
-                    if "error" in data:
-                        print(f"Page not found for {artist_name}")
-                        return "No biography available"
-                    
-                    sections = data.get("parse", {}).get("sections", [])                    
-                     # Step 2: Extract section indices for desired topics
-                    section_indices = {
-                        s["line"]: s["index"] 
-                        for s in sections 
-                        if s["line"].lower() in [section.lower() for section in self.desired_sections]
-                    }
-                    
-                    if not section_indices:
-                        print(f"No matching sections found for {artist_name}")
-                        return "No biography available"
-                    
-                     # Step 3: Fetch content for each section
-                    biography_sections = []
-                    for section_name, index in section_indices.items():
-                        section_params = {
-                            "action": "parse",
-                            "page": artist_name.title(),
-                            "format": "json",
-                            "prop": "wikitext",
-                            "section": index
-                        }
-                        
-                        async with session.get(self.base_url, params=section_params) as section_response:
-                            section_data = await section_response.json()
-                            wikitext = section_data.get("parse", {}).get("wikitext", {}).get("*", "")
-                            if wikitext:
-                                parsed_text = mwparserfromhell.parse(wikitext).strip_code()
-                                if parsed_text:
-                                    formatted_section = self._format_section(section_name, parsed_text)
-                                    biography_sections.append(formatted_section)
-                    
-                    if biography_sections:
-                        full_bio = "ARTIST BIOGRAPHY\n" + "="*16 + "\n\n"
-                        full_bio += "\n".join(biography_sections)
-                        return full_bio
-                    return "No biography available"
+            title = await self.resolve_page_title(artist_name)
+            if not title:
+                logger.info(f"No Wikipedia page found for {artist_name}")
+                return "No biography available"
+            
+            params = {
+                "action": "parse",
+                "page": title,
+                "prop": "wikitext",
+                "redirects": 1,
+                "format": "json",
+                "formatversion": 2,
+            }
+            response = await provider_clients.get('wikipedia', self.base_url, params=params)
+            data = response.json()
+            if "error" in data:
+                logger.info(f"Page {title} not found for {artist_name}")
+                return "No biography available"
+            
+            wikitext = data.get("parse", {}).get("wikitext", "")
+            if not wikitext:
+                return "No biography available"
+            
+            biography = await asyncio.to_thread(self._build_biography, wikitext)
+            if not biography:
+                logger.info(f"No matching sections found for {artist_name} ({title})")
+                return "No biography available"
+            return biography
 
         except Exception as e:
-            print(f"Error fetching artist details for {artist_name}: {e}")
+            logger.error(f"Error fetching artist details for {artist_name}: {e}")
             return "No biography available"
@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Dict, List, Optional
+from spotipy import SpotifyException
+from .http_clients import ProviderResponse, provider_clients
+
+logger = logging.getLogger("spotify")
+
+API_BASE = 'https://api.spotify.com/v1'
+
+
+def _raise_for_status(response: ProviderResponse) -> None:
+    """Raise errors as spotipy does so callers handle both clients alike."""
+    if response.status < 400:
+        return
+    try:
+        error = (response.json() or {}).get('error', {})
+        message = error.get('message', '') if isinstance(error, dict) else str(error)
+    except ValueError:
+        message = response.text()
+    raise SpotifyException(
+        response.status, -1, f"{response.url}:\n {message}",
+        headers=dict(response.headers),
+    )
+
+
+class AsyncSpotify:
+    """Async client for the Spotify Web API endpoints ingestion uses.
+
+    Method names and arguments follow spotipy. Requests go through the
+    pooled ``spotify`` session in ``provider_clients``, so they share its
+    rate limiter and 429 handling instead of taking a thread each.
+    """
+
+    def __init__(self, auth: str):
+        self.auth = auth
+
+    async def _get(self, path: str, **params) -> Any:
+        response = await provider_clients.get(
+            'spotify',
+            f"{API_BASE}/{path}",
+            params={key: value for key, value in params.items() if value is not None},
+            headers={'Authorization': f"Bearer {self.auth}"},
+        )
+        _raise_for_status(response)
+        return response.json()
+
+    async def current_user(self) -> Dict:
+        return await self._get('me')
+
+    async def current_user_top_tracks(self, limit: int = 20, offset: int = 0,
+                                      time_range: str = 'medium_term') -> Dict:
+        return await self._get('me/top/tracks', limit=limit, offset=offset, time_range=time_range)
+
+    async def current_user_top_artists(self, limit: int = 20, offset: int = 0,
+                                       time_range: str = 'medium_term') -> Dict:
+        return await self._get('me/top/artists', limit=limit, offset=offset, time_range=time_range)
+
+    async def artist(self, artist_id: str) -> Dict:
+        return await self._get(f'artists/{artist_id}')
+
+    async def artists(self, artists: List[str]) -> Dict:
+        return await self._get('artists', ids=','.join(artists))
+
+    async def artist_top_tracks(self, artist_id: str, country: str = 'US') -> Dict:
+        return await self._get(f'artists/{artist_id}/top-tracks', market=country)
+
+    async def artist_albums(self, artist_id: str, album_type: Optional[str] = None,
+                            limit: int = 20, offset: int = 0) -> Dict:
+        return await self._get(
+            f'artists/{artist_id}/albums', include_groups=album_type, limit=limit, offset=offset
+        )
+
+    async def search(self, q: str, limit: int = 10, offset: int = 0, type: str = 'track',
+                     market: Optional[str] = None) -> Dict:
+        return await self._get('search', q=q, limit=limit, offset=offset, type=type, market=market)
+
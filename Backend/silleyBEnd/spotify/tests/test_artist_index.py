@@ -0,0 +1,83 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import TestCase
+from spotify.artist_index import local_artist, normalize_name
+from spotify.http_clients import provider_clients
+from spotify.models import LocalArtistMetadata
+from spotify.utils import fetch_musicbrainz_data, get_artist_info
+
+MUSICBRAINZ_DUMP = [
+    {"id": "mb-drake", "name": "Drake", "type": "Person", "gender": "Male", "country": "CA",
+     "life-span": {"begin": "1986-10-24"}, "rating": {"votes-count": 12}, "tags": [], "aliases": []},
+    {"id": "mb-drake-uk", "name": "Drake", "type": "Group", "country": "GB",
+     "life-span": {}, "rating": {"votes-count": 1}},
+    {"id": "mb-bjork", "name": "Björk", "type": "Person", "gender": "Female", "country": "IS",
+     "life-span": {"begin": "1965-11-21"}},
+    {"id": "mb-twin-1", "name": "Twin", "type": "Person"},
+    {"id": "mb-twin-2", "name": "Twin", "type": "Group"},
+]
+
+DISCOGS_ARTISTS = """<artists>
+<artist><id>1</id><name>Wizkid</name><namevariations><name>Wiz Kid</name></namevariations></artist>
+<artist><id>2</id><name>Earth, Wind &amp; Fire</name>
+  <members><name id="10">Maurice White</name><name id="11">Verdine White</name><name id="12">Philip Bailey</name></members>
+</artist>
+<artist><id>3</id><name>Wizkid (2)</name></artist>
+</artists>"""
+
+DISCOGS_MASTERS = """<masters>
+<master id="100"><artists><artist><id>2</id><name>Earth, Wind &amp; Fire</name></artist></artists><year>1975</year></master>
+<master id="101"><artists><artist><id>2</id><name>Earth, Wind &amp; Fire</name></artist></artists><year>1971</year></master>
+<master id="102"><artists><artist><id>1</id><name>Wizkid</name></artist></artists><year>0</year></master>
+</masters>"""
+
+
+async def no_network(provider, url, *, params=None, headers=None):
+    raise AssertionError(f"Unexpected {provider} request to {url}")
+
+
+class ArtistIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with tempfile.TemporaryDirectory() as tmp:
+            musicbrainz = os.path.join(tmp, 'artist.jsonl.gz')
+            with gzip.open(musicbrainz, 'wt') as f:
+                f.write('\n'.join(json.dumps(artist) for artist in MUSICBRAINZ_DUMP))
+            discogs_artists = os.path.join(tmp, 'artists.xml')
+            discogs_masters = os.path.join(tmp, 'masters.xml')
+            with open(discogs_artists, 'w') as f:
+                f.write(DISCOGS_ARTISTS)
+            with open(discogs_masters, 'w') as f:
+                f.write(DISCOGS_MASTERS)
+
+            call_command(
+                'import_artist_metadata', musicbrainz=musicbrainz, discogs_artists=discogs_artists,
+                discogs_masters=discogs_masters, batch_size=2, stdout=StringIO(),
+            )
+
+    def test_import_reads_both_dumps(self):
+        """Every artist is imported with its facts, debut year from the earliest master"""
+        self.assertEqual(LocalArtistMetadata.objects.count(), 8)
+        band = LocalArtistMetadata.objects.get(source=LocalArtistMetadata.DISCOGS, source_id='2')
+        self.assertEqual((band.members_count, band.debut_year, band.artist_type), (3, 1971, 'Group'))
+
+    def test_lookup_normalizes_and_ranks_namesakes(self):
+        """Names match regardless of case and accents; the best-scored namesake wins"""
+        self.assertEqual(normalize_name('  BJÖRK '), 'bjork')
+        self.assertEqual(normalize_name('Wizkid (2)'), 'wizkid')
+        self.assertEqual(local_artist('drake', LocalArtistMetadata.MUSICBRAINZ).source_id, 'mb-drake')
+        self.assertIsNone(local_artist('Twin', LocalArtistMetadata.MUSICBRAINZ))
+
+    def test_enrichment_uses_local_index_without_requests(self):
+        """Indexed artists are resolved without calling MusicBrainz or Discogs"""
+        with provider_clients.use_transport(no_network):
+            musicbrainz = async_to_sync(fetch_musicbrainz_data)('Björk')
+            discogs = async_to_sync(get_artist_info)('Earth, Wind & Fire')
+
+        self.assertEqual((musicbrainz['country'], musicbrainz['life-span']['begin']), ('IS', '1965-11-21'))
+        self.assertEqual(discogs, (3, 1971))
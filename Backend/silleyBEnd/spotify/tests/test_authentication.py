@@ -0,0 +1,46 @@
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+from spotify.authentication import JWTAuthentication, principal_cache
+from spotify.models import User
+
+
+class JWTAuthenticationTests(TestCase):
+    def setUp(self):
+        principal_cache.clear()
+        self.user = User.objects.create_user(username='listener', email='listener@example.com')
+        self.token = str(AccessToken.for_user(self.user))
+        self.backend = JWTAuthentication()
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token or self.token}')
+        return self.backend.authenticate(request)
+
+    def test_repeated_token_needs_no_queries(self):
+        """A token seen before resolves its user from the principal cache"""
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(str(token['user_id']), str(self.user.id))
+        self.assertEqual(principal_cache.stats, {'miss': 1, 'hit': 1})
+
+    def test_user_changes_invalidate_the_principal(self):
+        """Saving the user makes the next request load it again"""
+        self.authenticate()
+        self.user.display_name = 'Renamed'
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        self.assertEqual(user.display_name, 'Renamed')
+
+    def test_invalid_token_is_rejected_once(self):
+        """A bad token fails validation and is counted, not cached"""
+        with self.assertRaises(InvalidToken):
+            self.authenticate(self.token[:-4] + 'abcd')
+
+        self.assertEqual(principal_cache.stats, {'invalid': 1})
@@ -0,0 +1,72 @@
+from django.test import TestCase
+from django.utils import timezone
+from spotify.candidate_pools import rebuild_candidate_pools, sample_candidates
+from spotify.models import Artist, GameCandidate, MostListenedArtist, MostListenedSongs, User
+
+
+class CandidatePoolTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pools',
+            email='pools@example.com',
+            password='testpass123',
+        )
+
+    def add_song(self, index, words=30, **fields):
+        fields.setdefault('track_uri', f'spotify:track:t{index}')
+        return MostListenedSongs.objects.create(
+            user=self.user, spotify_id=f't{index}', name='T', artist='A', album='B',
+            duration_seconds=200, has_lyrics=words > 0, lyrics_word_count=words, **fields,
+        )
+
+    def add_artist(self, index, **fields):
+        artist = Artist.objects.create(spotify_id=f'a{index}', name='A', genres='pop', **fields)
+        MostListenedArtist.objects.create(user=self.user, artist=artist, rank=index)
+        return artist
+
+    def test_pools_only_hold_eligible_items(self):
+        """Each mode's pool keeps only the songs and artists its game can use"""
+        long_song = self.add_song(1)
+        short_song = self.add_song(2, words=5)
+        self.add_song(3, words=0)
+        self.add_song(4, track_uri='')
+        with_bio = self.add_artist(1, biography='Born somewhere', has_biography=True, enriched_at=timezone.now())
+        without_bio = self.add_artist(2, enriched_at=timezone.now())
+        self.add_artist(3)
+
+        sizes = rebuild_candidate_pools(self.user)
+
+        self.assertEqual(sizes, {
+            'crossword': 2, 'lyrics_text': 1, 'lyrics_voice': 1, 'guess_artist': 2, 'trivia': 1,
+        })
+        self.assertEqual(set(sample_candidates(self.user, 'crossword', 5)), {long_song, short_song})
+        self.assertEqual(sample_candidates(self.user, 'lyrics_text', 5), [long_song])
+        self.assertEqual(sample_candidates(self.user, 'trivia', 5), [with_bio])
+        self.assertEqual(set(sample_candidates(self.user, 'guess_artist', 5)), {with_bio, without_bio})
+
+    def test_sampling_skips_recently_served_items(self):
+        """Consecutive draws cycle through the pool before repeating an item"""
+        songs = {self.add_song(index) for index in range(6)}
+        rebuild_candidate_pools(self.user)
+
+        served = [sample_candidates(self.user, 'lyrics_text', 2) for _ in range(3)]
+
+        self.assertEqual({song for draw in served for song in draw}, songs)
+
+    def test_rebuild_keeps_serving_history(self):
+        """Rebuilding a pool after ingestion keeps when items were last served"""
+        self.add_song(1)
+        self.add_song(2)
+        rebuild_candidate_pools(self.user)
+        served, = sample_candidates(self.user, 'crossword', 1)
+
+        rebuild_candidate_pools(self.user)
+
+        candidate = GameCandidate.objects.get(user=self.user, game_mode='crossword', song=served)
+        self.assertIsNotNone(candidate.last_served_at)
+
+    def test_empty_pool_is_built_on_demand(self):
+        """Games started before the pools were built still get candidates"""
+        song = self.add_song(1)
+
+        self.assertEqual(sample_candidates(self.user, 'crossword', 1), [song])
@@ -0,0 +1,99 @@
+import threading
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from spotify.http_cache import LocalResponseStore, http_cache
+from spotify.http_clients import ProviderResponse, provider_clients
+
+URL = 'https://en.wikipedia.org/w/api.php'
+
+
+class FakeProvider:
+    def __init__(self, status=200, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.requests = []
+
+    async def __call__(self, provider, url, *, params=None, headers=None):
+        self.requests.append(headers or {})
+        etag = self.headers.get('ETag')
+        if etag and self.requests[-1].get('If-None-Match') == etag:
+            return ProviderResponse(status=304, url=url)
+        return ProviderResponse(status=self.status, url=url, headers=self.headers, body=b'{"page": 1}')
+
+
+@override_settings(HTTP_CACHE={'wikipedia': {'ttl': 60}}, RATE_LIMITS={})
+class HttpCacheTests(SimpleTestCase):
+    def setUp(self):
+        http_cache.clear()
+
+    def get(self, fake, provider='wikipedia', params=None):
+        with provider_clients.use_transport(fake):
+            return async_to_sync(provider_clients.get)(provider, URL, params=params or {'page': 'Drake'})
+
+    def test_fresh_response_is_served_from_cache(self):
+        """A repeated lookup within the ttl makes no request"""
+        fake = FakeProvider()
+
+        first, second = self.get(fake), self.get(fake)
+
+        self.assertEqual(len(fake.requests), 1)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(http_cache.stats, {'wikipedia.miss': 1, 'wikipedia.hit': 1})
+
+    def test_stale_response_is_revalidated(self):
+        """After the ttl the ETag is sent and a 304 reuses the cached body"""
+        fake = FakeProvider(headers={'ETag': '"v1"'})
+        self.get(fake)
+
+        with override_settings(HTTP_CACHE={'wikipedia': {'ttl': 0}}):
+            response = self.get(fake)
+
+        self.assertEqual(fake.requests[-1]['If-None-Match'], '"v1"')
+        self.assertEqual((response.status, response.json()), (200, {'page': 1}))
+        self.assertEqual(http_cache.stats['wikipedia.revalidated'], 1)
+
+    def test_store_is_not_used_on_the_event_loop(self):
+        """Cache reads and writes, which may go to Redis, run off the event loop thread"""
+        store = http_cache.store
+        fake = FakeProvider()
+        loop_threads, store_threads = [], []
+
+        async def send(*args, **kwargs):
+            loop_threads.append(threading.current_thread())
+            return await fake(*args, **kwargs)
+
+        def tracked(method):
+            def call(*args):
+                store_threads.append(threading.current_thread())
+                return method(*args)
+            return call
+
+        with mock.patch.object(store, 'get', tracked(store.get)), \
+                mock.patch.object(store, 'set', tracked(store.set)):
+            self.get(send)
+
+        self.assertEqual(len(store_threads), 2)
+        self.assertNotIn(loop_threads[0], store_threads)
+
+    def test_uncached_providers_and_errors_are_not_stored(self):
+        """Only configured providers and 200 responses are cached"""
+        genius, failing = FakeProvider(), FakeProvider(status=500)
+
+        self.get(genius, provider='genius')
+        self.get(genius, provider='genius')
+        self.get(failing, params={'page': 'Missing'})
+        self.get(failing, params={'page': 'Missing'})
+
+        self.assertEqual((len(genius.requests), len(failing.requests)), (2, 2))
+
+    def test_store_evicts_least_recently_used(self):
+        """The local store stays within its byte budget, evicting LRU first"""
+        store = LocalResponseStore(max_bytes=10)
+        store.set('a', '{}', b'12345')
+        store.set('b', '{}', b'12345')
+        store.get('a')
+        store.set('c', '{}', b'12345')
+
+        self.assertIsNotNone(store.get('a'))
+        self.assertIsNone(store.get('b'))
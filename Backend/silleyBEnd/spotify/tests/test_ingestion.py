@@ -0,0 +1,325 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+import aiohttp
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.utils import timezone
+from spotify.ingestion import enqueue_ingestion
+from spotify.models import (Artist, IngestionJob, MostListenedAlbum, MostListenedArtist,
+                            MostListenedSongs, TrackLyrics, User)
+from spotify.progress import IngestionProgress
+from spotify.services import LyricsService
+from spotify.utils import process_top_artists, process_top_tracks
+
+
+def make_track(index, artist_ids):
+    return {
+        "id": f"track{index}",
+        "name": f"Song {index}",
+        "popularity": 50 + index,
+        "duration_ms": 200000,
+        "artists": [{"id": artist_id, "name": f"Artist {artist_id}"} for artist_id in artist_ids],
+        "album": {
+            "id": f"album{index % 2}",
+            "name": f"Album {index % 2}",
+            "release_date": "2020",
+            "total_tracks": 10,
+            "artists": [{"name": f"Artist {artist_ids[0]}"}],
+            "images": [{"url": "http://img/0"}, {"url": "http://img/1"}],
+        },
+    }
+
+
+class FakeSpotify:
+    def __init__(self, tracks):
+        self.tracks = tracks
+        self.artist_calls = []
+
+    def current_user_top_tracks(self, limit, time_range):
+        return {"items": self.tracks}
+
+    def artists(self, artist_ids):
+        self.artist_calls.append(list(artist_ids))
+        return {"artists": [
+            {"id": artist_id, "genres": [f"genre-{artist_id}"]}
+            for artist_id in artist_ids
+        ]}
+
+
+class FakeLyricsService(LyricsService):
+    searches = []
+
+    async def search_song(self, song_title, artist_name=None):
+        self.searches.append(song_title)
+        return None if song_title == "Song 2" else f"http://genius/{song_title}"
+
+    async def get_lyrics(self, song_url):
+        return f"lyrics for {song_url}"
+
+
+class ProcessTopTracksTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ingest',
+            email='ingest@example.com',
+            password='testpass123',
+        )
+
+    def run_pipeline(self, sp, user=None):
+        FakeLyricsService.searches = []
+        with mock.patch('spotify.utils.LyricsService', FakeLyricsService):
+            async_to_sync(process_top_tracks)(sp, user or self.user)
+
+    def test_all_tracks_and_albums_stored(self):
+        """Every enriched track and each distinct album is persisted"""
+        sp = FakeSpotify([make_track(i, ["a1", f"b{i}"]) for i in range(4)])
+        self.run_pipeline(sp)
+
+        self.assertEqual(MostListenedSongs.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(MostListenedAlbum.objects.filter(user=self.user).count(), 2)
+
+        song = MostListenedSongs.objects.get(spotify_id="track1")
+        self.assertEqual(song.artist, "Artist a1, Artist b1")
+        self.assertEqual(set(song.genres.split(", ")), {"genre-a1", "genre-b1"})
+        self.assertEqual(song.lyrics, "lyrics for http://genius/Song 1")
+        self.assertEqual(str(song.release_date), "2020-01-01")
+
+    def test_artist_lookups_are_deduplicated_and_batched(self):
+        """Shared artists are fetched once, in batches of at most 50 ids"""
+        sp = FakeSpotify([make_track(i, ["shared", f"solo{i}"]) for i in range(60)])
+        self.run_pipeline(sp)
+
+        self.assertEqual([len(batch) for batch in sp.artist_calls], [50, 11])
+        requested = [artist_id for batch in sp.artist_calls for artist_id in batch]
+        self.assertEqual(len(requested), len(set(requested)))
+
+    def test_missing_lyrics_does_not_block_other_tracks(self):
+        """A track without lyrics is still stored alongside the others"""
+        sp = FakeSpotify([make_track(i, ["a1"]) for i in range(3)])
+        self.run_pipeline(sp)
+
+        self.assertIsNone(MostListenedSongs.objects.get(spotify_id="track2").lyrics)
+        self.assertEqual(MostListenedSongs.objects.filter(user=self.user).count(), 3)
+
+    def test_stored_lyrics_are_reused_and_compressed(self):
+        """Known tracks skip Genius; found and not-found results are both cached"""
+        sp = FakeSpotify([make_track(i, ["a1"]) for i in range(3)])
+        self.run_pipeline(sp)
+        self.assertEqual(len(FakeLyricsService.searches), 3)
+
+        self.run_pipeline(sp)
+        self.assertEqual(FakeLyricsService.searches, [])
+
+        stored = TrackLyrics.objects.get(spotify_id="track1")
+        self.assertEqual(stored.text, "lyrics for http://genius/Song 1")
+        self.assertEqual(stored.content_hash, TrackLyrics.hash_text(stored.text))
+        self.assertFalse(TrackLyrics.objects.get(spotify_id="track2").found)
+        self.assertFalse(MostListenedSongs.objects.get(spotify_id="track2").has_lyrics)
+
+    def test_refresh_only_enriches_new_tracks(self):
+        """A refresh updates kept tracks in place, enriches new ones and drops the rest"""
+        self.run_pipeline(FakeSpotify([make_track(i, [f"a{i}"]) for i in range(3)]))
+
+        refreshed = [make_track(i, [f"a{i}"]) for i in (2, 1, 5)]
+        refreshed[0]["popularity"] = 99
+        sp = FakeSpotify(refreshed)
+        self.run_pipeline(sp)
+
+        self.assertEqual(FakeLyricsService.searches, ["Song 5"])
+        self.assertEqual(sp.artist_calls, [["a5"]])
+        self.assertEqual(
+            list(MostListenedSongs.objects.filter(user=self.user).order_by('rank')
+                 .values_list('spotify_id', 'rank', 'popularity')),
+            [("track2", 1, 99), ("track1", 2, 51), ("track5", 3, 55)],
+        )
+        self.assertEqual(MostListenedSongs.objects.get(spotify_id="track1").lyrics,
+                         "lyrics for http://genius/Song 1")
+
+    def test_expired_not_found_entries_are_retried(self):
+        """A miss older than LYRICS_NOT_FOUND_TTL is searched again"""
+        sp = FakeSpotify([make_track(2, ["a1"])])
+        self.run_pipeline(sp)
+        TrackLyrics.objects.filter(spotify_id="track2").update(
+            fetched_at=timezone.now() - timedelta(days=30)
+        )
+
+        self.run_pipeline(sp)
+
+        self.assertEqual(FakeLyricsService.searches, ["Song 2"])
+
+    def test_kept_tracks_without_lyrics_are_looked_up_concurrently(self):
+        """Expired misses for kept tracks share the bounded concurrent lookups"""
+        sp = FakeSpotify([make_track(i, ["a1"]) for i in range(4)])
+        self.run_pipeline(sp)
+        MostListenedSongs.objects.update(has_lyrics=False)
+        TrackLyrics.objects.all().delete()
+        active, peak = 0, 0
+
+        async def slow_search(service, song_title, artist_name=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return f"http://genius/{song_title}"
+
+        with mock.patch.object(FakeLyricsService, 'search_song', slow_search):
+            self.run_pipeline(sp)
+
+        self.assertGreater(peak, 1)
+        self.assertEqual(MostListenedSongs.objects.filter(user=self.user, has_lyrics=True).count(), 4)
+        self.assertEqual(MostListenedSongs.objects.get(spotify_id="track1").rank, 2)
+
+    def test_lyric_refreshes_are_cancelled_when_ingestion_fails(self):
+        """Kept-track lookups don't keep running after the pipeline raises"""
+        self.run_pipeline(FakeSpotify([make_track(1, ["a1"])]))
+        MostListenedSongs.objects.update(has_lyrics=False)
+        TrackLyrics.objects.all().delete()
+        finished = []
+
+        async def slow_search(service, song_title, artist_name=None):
+            await asyncio.sleep(0.2)
+            finished.append(song_title)
+
+        async def run():
+            with self.assertRaises(RuntimeError):
+                await process_top_tracks(FakeSpotify([make_track(i, ["a1"]) for i in (1, 2)]), self.user)
+            await asyncio.sleep(0.4)
+
+        with mock.patch('spotify.utils.LyricsService', FakeLyricsService), \
+                mock.patch.object(FakeLyricsService, 'search_song', slow_search), \
+                mock.patch('spotify.utils.SpotifyCallPlanner.resolve', side_effect=RuntimeError("rate limited")):
+            async_to_sync(run)()
+
+        self.assertEqual(finished, [])
+
+    def test_failed_lookups_are_not_stored_as_misses(self):
+        """A Genius error leaves no entry, so the next run looks the track up again"""
+        sp = FakeSpotify([make_track(1, ["a1"])])
+        with mock.patch.object(FakeLyricsService, 'get_lyrics', side_effect=aiohttp.ClientResponseError(
+                request_info=mock.Mock(real_url='http://genius/Song 1'), history=(), status=503)):
+            self.run_pipeline(sp)
+
+        self.assertFalse(TrackLyrics.objects.filter(spotify_id="track1").exists())
+        self.assertFalse(MostListenedSongs.objects.get(spotify_id="track1").has_lyrics)
+
+        self.run_pipeline(sp)
+
+        self.assertEqual(FakeLyricsService.searches, ["Song 1"])
+        self.assertTrue(MostListenedSongs.objects.get(spotify_id="track1").has_lyrics)
+
+
+def make_artist(artist_id):
+    return {
+        "id": artist_id,
+        "name": f"Artist {artist_id}",
+        "popularity": 70,
+        "genres": ["pop"],
+        "followers": {"total": 1000},
+        "images": [],
+    }
+
+
+class FakeArtistSpotify:
+    def __init__(self, artists):
+        self.top_artists = artists
+
+    def current_user_top_artists(self, limit, time_range):
+        return {"items": self.top_artists}
+
+
+class ProcessTopArtistsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(
+            username='alice', email='alice@example.com', password='testpass123',
+        )
+        self.bob = User.objects.create_user(
+            username='bob', email='bob@example.com', password='testpass123',
+        )
+        self.enriched = []
+        self.biographies = []
+
+    async def fake_build_artist_row(self, sp, artist):
+        self.enriched.append(artist["id"])
+        return {
+            "spotify_id": artist["id"],
+            "name": artist["name"],
+            "popularity": artist["popularity"],
+            "genres": "pop",
+            "followers": artist["followers"]["total"],
+            "enriched_at": timezone.now(),
+        }
+
+    async def fake_get_artist_bio(self, name):
+        self.biographies.append(name)
+        return f"bio of {name}"
+
+    def run_pipeline(self, user, artist_ids, progress=None):
+        sp = FakeArtistSpotify([make_artist(artist_id) for artist_id in artist_ids])
+        with mock.patch('spotify.utils.build_artist_row', self.fake_build_artist_row), \
+                mock.patch('spotify.utils.get_artist_bio', self.fake_get_artist_bio):
+            return async_to_sync(process_top_artists)(sp, user, progress=progress)
+
+    def test_shared_artists_are_enriched_once(self):
+        """A second listener links to the catalog without new external lookups"""
+        self.run_pipeline(self.alice, ["drake", "sza"])
+        self.run_pipeline(self.bob, ["sza", "drake", "tems"])
+
+        self.assertEqual(self.enriched, ["drake", "sza", "tems"])
+        self.assertEqual(self.biographies, ["Artist drake", "Artist sza", "Artist tems"])
+        self.assertEqual(Artist.objects.count(), 3)
+        self.assertEqual(
+            list(MostListenedArtist.objects.filter(user=self.bob).values_list('artist__spotify_id', 'rank')),
+            [("sza", 1), ("drake", 2), ("tems", 3)],
+        )
+        self.assertEqual(Artist.objects.get(spotify_id="drake").listeners.count(), 2)
+
+    def test_stale_artists_are_re_enriched(self):
+        """Enrichment older than ARTIST_CATALOG_MAX_AGE is refreshed"""
+        self.run_pipeline(self.alice, ["drake"])
+        Artist.objects.filter(spotify_id="drake").update(
+            enriched_at=timezone.now() - timedelta(days=365)
+        )
+
+        self.run_pipeline(self.alice, ["drake"])
+
+        self.assertEqual(self.enriched, ["drake", "drake"])
+
+    def test_fresh_artists_keep_enrichment_and_drop_out_of_ranking(self):
+        """Refreshing Spotify fields keeps the biography; old links are removed"""
+        self.run_pipeline(self.alice, ["drake", "sza"])
+        result = self.run_pipeline(self.alice, ["drake"])
+
+        self.assertEqual((result.inserted, result.updated), (0, 1))
+        self.assertEqual(Artist.objects.get(spotify_id="drake").biography, "bio of Artist drake")
+        self.assertEqual(MostListenedArtist.objects.filter(user=self.alice).count(), 1)
+        self.assertTrue(Artist.objects.filter(spotify_id="sza").exists())
+
+    def test_missing_biography_is_fetched_for_fresh_artists(self):
+        """An enriched artist without a biography only gets the Wikipedia lookup"""
+        self.run_pipeline(self.alice, ["drake"])
+        Artist.objects.filter(spotify_id="drake").update(biography=None)
+
+        self.run_pipeline(self.alice, ["drake"])
+
+        self.assertEqual(self.enriched, ["drake"])
+        self.assertEqual(self.biographies, ["Artist drake", "Artist drake"])
+
+    def test_artist_guess_is_ready_before_biographies(self):
+        """Artist attributes are stored and recorded as ready before any biography lookup"""
+        job = enqueue_ingestion(self.alice)
+        modes_at_first_biography = []
+
+        async def fake_get_artist_bio(name):
+            if not modes_at_first_biography:
+                job_progress = await IngestionJob.objects.aget(id=job.id)
+                modes_at_first_biography.append(job_progress.progress['modes'])
+            return f"bio of {name}"
+
+        with mock.patch.object(self, 'fake_get_artist_bio', fake_get_artist_bio):
+            self.run_pipeline(self.alice, ["drake", "sza", "tems", "rema"], IngestionProgress(job.id))
+
+        self.assertEqual(modes_at_first_biography, [['guess_artist']])
+        job.refresh_from_db()
+        self.assertEqual(job.progress['modes'], ['guess_artist', 'trivia'])
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import timedelta
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from spotify.ingestion import (IngestionWorker, claim_next_job, complete_job, enqueue_ingestion,
+                               fail_job, job_status, renew_lease)
+from spotify.models import IngestionJob, User
+
+
+class IngestionQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='queue',
+            email='queue@example.com',
+            password='testpass123',
+        )
+
+    def test_enqueue_is_idempotent_while_active(self):
+        """A second login reuses the queued job instead of adding another"""
+        first = enqueue_ingestion(self.user)
+        second = enqueue_ingestion(self.user)
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(IngestionJob.objects.count(), 1)
+
+    def test_finished_job_allows_new_enqueue(self):
+        """Once a job is complete the user can be queued again"""
+        first = enqueue_ingestion(self.user)
+        IngestionJob.objects.filter(id=first.id).update(status=IngestionJob.COMPLETE)
+
+        self.assertNotEqual(enqueue_ingestion(self.user).id, first.id)
+
+    def test_claim_marks_job_running(self):
+        """Claiming locks the job and counts the attempt"""
+        enqueue_ingestion(self.user)
+
+        job = claim_next_job('worker-1')
+
+        self.assertEqual((job.status, job.attempts, job.locked_by), (IngestionJob.RUNNING, 1, 'worker-1'))
+        self.assertIsNone(claim_next_job('worker-2'))
+
+    def test_expired_lease_is_reclaimed(self):
+        """A job left running by a dead worker is picked up again"""
+        enqueue_ingestion(self.user)
+        job = claim_next_job('worker-1')
+        IngestionJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(claim_next_job('worker-2').id, job.id)
+        self.assertFalse(renew_lease(job, 'worker-1'))
+
+    def test_renewed_lease_is_not_reclaimed(self):
+        """A long job whose worker keeps renewing its lease only runs once"""
+        enqueue_ingestion(self.user)
+        job = claim_next_job('worker-1')
+        IngestionJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=2))
+
+        self.assertTrue(renew_lease(job, 'worker-1'))
+        self.assertIsNone(claim_next_job('worker-2'))
+
+    def test_lost_job_fails_after_max_attempts(self):
+        """A job whose worker keeps dying is failed instead of reclaimed forever"""
+        enqueue_ingestion(self.user)
+        job = claim_next_job('worker-1')
+        IngestionJob.objects.filter(id=job.id).update(
+            attempts=job.max_attempts, locked_at=timezone.now() - timedelta(hours=2)
+        )
+
+        self.assertIsNone(claim_next_job('worker-2'))
+        self.assertEqual(job_status(self.user)['status'], 'error')
+
+    @override_settings(INGESTION_WORKER={'retry_delay': 10})
+    def test_failures_retry_then_fail(self):
+        """Failed attempts are re-queued with a delay until max_attempts"""
+        enqueue_ingestion(self.user)
+        job = claim_next_job('worker-1')
+        fail_job(job, Exception("boom"))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(job_status(self.user)['status'], 'processing')
+
+        job.attempts = job.max_attempts
+        fail_job(job, Exception("boom again"))
+
+        status = job_status(self.user)
+        self.assertEqual((status['status'], status['job_id'], status['error']), ('error', job.id, 'boom again'))
+
+    def test_stale_worker_cannot_finish_reclaimed_job(self):
+        """Completing or failing a job another worker reclaimed writes nothing"""
+        enqueue_ingestion(self.user)
+        job = claim_next_job('worker-1')
+        IngestionJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=2))
+        claim_next_job('worker-2')
+
+        self.assertFalse(complete_job(job))
+        self.assertFalse(fail_job(job, Exception("late")))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), (IngestionJob.RUNNING, 'worker-2', 2))
+
+    @override_settings(INGESTION_WORKER={'heartbeat_interval': 0.01})
+    def test_lost_lease_stops_the_handler(self):
+        """A worker whose job was reclaimed stops running it"""
+        enqueue_ingestion(self.user)
+        finished = []
+
+        async def handler(job):
+            await sync_to_async(IngestionJob.objects.filter(id=job.id).update)(locked_by='worker-2')
+            await asyncio.sleep(5)
+            finished.append(job.id)
+
+        async_to_sync(IngestionWorker(concurrency=1, poll_interval=0, handler=handler).run)(burst=True)
+
+        self.assertEqual(finished, [])
+        job = IngestionJob.objects.get(user=self.user)
+        self.assertEqual((job.status, job.locked_by), (IngestionJob.RUNNING, 'worker-2'))
+
+    def test_worker_runs_queued_jobs_in_burst_mode(self):
+        """The worker drains the queue and records completion"""
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='testpass123',
+        )
+        enqueue_ingestion(self.user)
+        enqueue_ingestion(other)
+        handled = []
+
+        async def handler(job):
+            handled.append(job.id)
+
+        async_to_sync(IngestionWorker(concurrency=2, poll_interval=0, handler=handler).run)(burst=True)
+
+        self.assertEqual(len(handled), 2)
+        self.assertEqual(job_status(self.user)['status'], 'complete')
+        self.assertFalse(IngestionJob.objects.filter(status__in=IngestionJob.ACTIVE_STATUSES).exists())
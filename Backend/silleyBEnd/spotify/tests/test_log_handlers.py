@@ -0,0 +1,55 @@
+import json
+import logging
+from django.test import SimpleTestCase
+from silleyBEnd.log_handlers import JsonFormatter, QueueListenerHandler, SamplingFilter
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_record(msg, *args, level=logging.DEBUG, **extra):
+    record = logging.LogRecord('spotify_games', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class LogHandlerTests(SimpleTestCase):
+    def test_json_formatter_caps_large_payloads(self):
+        """Logged game states are rendered as bounded JSON lines"""
+        formatter = JsonFormatter(max_arg_length=50, max_message_length=200)
+        state = {'grid': [[cell for cell in range(100)] for _ in range(100)], 'clue': 'x' * 1000}
+
+        entry = json.loads(formatter.format(make_record('Game state: %s', state, session_id=7)))
+
+        self.assertEqual(entry['logger'], 'spotify_games')
+        self.assertEqual(entry['session_id'], 7)
+        self.assertLess(len(entry['message']), 250)
+        self.assertTrue(entry['message'].startswith('Game state: {'))
+
+    def test_sampling_keeps_warnings(self):
+        """Low-level records are sampled away while warnings always pass"""
+        sampler = SamplingFilter(rate=0)
+
+        self.assertFalse(sampler.filter(make_record('noise')))
+        self.assertTrue(sampler.filter(make_record('problem', level=logging.WARNING)))
+
+    def test_queue_handler_snapshots_arguments(self):
+        """Arguments are rendered when logged, so later changes don't reach the listener thread"""
+        target = CollectingHandler()
+        handler = QueueListenerHandler([target], max_arg_length=50)
+        state = ['a', 1]
+        try:
+            handler.handle(make_record('state %s', state, grid=list(range(1000))))
+            state.append('later')
+        finally:
+            handler.stop()
+
+        record, = target.records
+        self.assertEqual((record.getMessage(), record.args), ("state ['a', 1]", None))
+        self.assertLess(len(record.grid), 200)
@@ -0,0 +1,43 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from spotify.lyrics_extraction import extract_lyrics
+from spotify.services import LyricsService
+
+PAGE = """<html><head><script>var lyrics = "Lyrics__Container";</script></head><body>
+<div class="SongHeader">Song Title</div>
+<div data-lyrics-container="true" class="Lyrics__Container-sc-1ynbvzw-1">
+[Verse 1]<br/>First <a href="/a">line</a> here<br>
+<script>tracking()</script><button>Share</button>
+<div data-exclude-from-selection="true"><span>Embed</span></div>
+Second line &amp; more<br/>
+</div>
+<div class="Footer">Not lyrics</div>
+<div data-lyrics-container="true">[Chorus]<br/>Third line</div>
+</body></html>"""
+
+
+class LyricsExtractionTests(SimpleTestCase):
+    def test_collects_every_container(self):
+        """Text from all containers is joined, section headers removed"""
+        lyrics = extract_lyrics(PAGE)
+
+        self.assertEqual(lyrics.split('\n')[0], 'First line here')
+        self.assertIn('Second line & more', lyrics)
+        self.assertTrue(lyrics.endswith('Third line'))
+        self.assertNotIn('[', lyrics)
+
+    def test_skips_non_lyric_elements(self):
+        """Scripts, buttons, excluded blocks and page chrome are ignored"""
+        lyrics = extract_lyrics(PAGE)
+
+        for text in ('tracking', 'Share', 'Embed', 'Song Title', 'Not lyrics'):
+            self.assertNotIn(text, lyrics)
+
+    def test_page_without_containers(self):
+        """Pages with no lyrics containers give None"""
+        self.assertIsNone(extract_lyrics('<html><body><div>Nothing</div></body></html>'))
+        self.assertIsNone(extract_lyrics(''))
+
+    def test_service_extracts_off_the_loop(self):
+        """The service path returns the same text as the parser"""
+        self.assertEqual(async_to_sync(LyricsService().extract_lyrics)(PAGE), extract_lyrics(PAGE))
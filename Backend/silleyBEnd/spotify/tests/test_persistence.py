@@ -0,0 +1,70 @@
+from django.test import TestCase
+from spotify.models import MostListenedAlbum, User
+from spotify.persistence import bulk_upsert
+
+
+def album_row(spotify_id, name):
+    return {
+        "spotify_id": spotify_id,
+        "name": name,
+        "artists": "Artist",
+        "release_date": "2020-01-01",
+        "total_tracks": 10,
+        "image_url": None,
+    }
+
+
+class BulkUpsertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bulk',
+            email='bulk@example.com',
+            password='testpass123',
+        )
+
+    def test_first_ingest_inserts_every_row(self):
+        """A fresh batch reports only inserts"""
+        result = bulk_upsert(MostListenedAlbum, self.user, [
+            album_row("a1", "One"),
+            album_row("a2", "Two"),
+        ])
+
+        self.assertEqual((result.inserted, result.updated), (2, 0))
+        self.assertEqual(MostListenedAlbum.objects.filter(user=self.user).count(), 2)
+
+    def test_reingest_updates_existing_rows(self):
+        """Existing ids are updated in place and counted as updates"""
+        bulk_upsert(MostListenedAlbum, self.user, [album_row("a1", "One")])
+
+        result = bulk_upsert(MostListenedAlbum, self.user, [
+            album_row("a1", "One (Deluxe)"),
+            album_row("a2", "Two"),
+        ])
+
+        self.assertEqual((result.inserted, result.updated), (1, 1))
+        self.assertEqual(MostListenedAlbum.objects.get(spotify_id="a1").name, "One (Deluxe)")
+
+    def test_duplicate_ids_in_batch_are_collapsed(self):
+        """The last row for a repeated id wins"""
+        result = bulk_upsert(MostListenedAlbum, self.user, [
+            album_row("a1", "First"),
+            album_row("a1", "Second"),
+        ])
+
+        self.assertEqual(result.inserted, 1)
+        self.assertEqual(MostListenedAlbum.objects.get(spotify_id="a1").name, "Second")
+
+    def test_users_sharing_an_id_keep_their_own_rows(self):
+        """Another user's upsert of the same id inserts their row and leaves this one alone"""
+        other = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123',
+        )
+        bulk_upsert(MostListenedAlbum, self.user, [album_row("a1", "Mine")])
+
+        result = bulk_upsert(MostListenedAlbum, other, [album_row("a1", "Theirs")])
+
+        self.assertEqual((result.inserted, result.updated), (1, 0))
+        self.assertEqual(MostListenedAlbum.objects.get(user=self.user, spotify_id="a1").name, "Mine")
+        self.assertEqual(MostListenedAlbum.objects.get(user=other, spotify_id="a1").name, "Theirs")
@@ -0,0 +1,135 @@
+import json
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from spotify.ingestion import enqueue_ingestion
+from spotify.models import Artist, IngestionJob, MostListenedArtist, MostListenedSongs, User
+from spotify.progress import IngestionProgress, game_mode_readiness, ready_game_modes
+
+
+class IngestionProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='progress',
+            email='progress@example.com',
+            password='testpass123',
+        )
+        self.job = enqueue_ingestion(self.user)
+
+    def test_progress_is_saved_on_the_job(self):
+        """Counters and stage land in the job's progress field"""
+        progress = IngestionProgress(self.job.id)
+
+        async def run():
+            await progress.set_total('tracks', 3)
+            await progress.advance('tracks', 2)
+            await progress.set_stage('enriching')
+
+        async_to_sync(run)()
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.progress['tracks'], {'done': 2, 'total': 3})
+        self.assertEqual(self.job.progress['stage'], 'enriching')
+
+    def add_song(self, index, words=30):
+        MostListenedSongs.objects.create(
+            user=self.user, spotify_id=f't{index}', name='T', artist='A', album='B',
+            duration_seconds=200, has_lyrics=True, lyrics_word_count=words,
+            track_uri=f'spotify:track:t{index}',
+        )
+
+    def add_artist(self, index, **fields):
+        artist = Artist.objects.create(spotify_id=f'a{index}', name='A', genres='pop', **fields)
+        MostListenedArtist.objects.create(user=self.user, artist=artist, rank=index)
+
+    def test_ready_modes_follow_stored_data(self):
+        """Each mode becomes ready once its candidate pool would have enough items"""
+        self.assertEqual(ready_game_modes(self.user), [])
+
+        self.add_song(1, words=5)
+        self.add_artist(1, biography='No biography available')
+        self.assertEqual(ready_game_modes(self.user), ['crossword'])
+
+        for index in range(2, 5):
+            self.add_song(index)
+            self.add_artist(index, biography='Born somewhere', has_biography=True, enriched_at=timezone.now())
+
+        self.assertEqual(ready_game_modes(self.user), ['guess_artist', 'crossword'])
+        self.assertEqual(game_mode_readiness(self.user)['lyrics_text'], {'ready': False, 'have': 3, 'need': 4})
+
+        self.add_song(5)
+        self.assertEqual(ready_game_modes(self.user), ['guess_artist', 'crossword', 'lyrics_text', 'lyrics_voice'])
+        self.assertEqual(game_mode_readiness(self.user)['trivia'], {'ready': False, 'have': 3, 'need': 4})
+
+
+@override_settings(PROGRESS_STREAM_INTERVAL=0)
+class ProcessingStreamViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='stream',
+            email='stream@example.com',
+            password='testpass123',
+        )
+
+    async def read_events(self, response):
+        return [chunk async for chunk in response.streaming_content]
+
+    def test_stream_requires_ticket(self):
+        """Requests without a valid ticket are rejected, including access tokens in the URL"""
+        token = str(AccessToken.for_user(self.user))
+        self.assertEqual(self.client.get('/processing-stream/?ticket=not-a-ticket').status_code, 401)
+        self.assertEqual(self.client.get(f'/processing-stream/?token={token}').status_code, 401)
+
+    def test_expired_ticket_is_rejected(self):
+        """Tickets only open the stream for PROGRESS_STREAM_TICKET_AGE seconds"""
+        self.client.force_login(self.user)
+        ticket = self.client.post('/processing-stream/ticket/').json()['ticket']
+
+        with self.settings(PROGRESS_STREAM_TICKET_AGE=-1):
+            response = self.client.get(f'/processing-stream/?ticket={ticket}')
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_ends_with_completed_job(self):
+        """A finished job is sent as a single event and the stream closes"""
+        job = enqueue_ingestion(self.user)
+        IngestionJob.objects.filter(id=job.id).update(
+            status=IngestionJob.COMPLETE,
+            progress={'stage': 'complete', 'modes': ['guess_artist']},
+        )
+        self.client.force_login(self.user)
+        ticket = self.client.post('/processing-stream/ticket/').json()['ticket']
+
+        async def fetch():
+            response = await self.async_client.get(f'/processing-stream/?ticket={ticket}')
+            return response, await self.read_events(response)
+
+        response, events = async_to_sync(fetch)()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(len(events), 1)
+        payload = json.loads(events[0].decode().removeprefix('data: '))
+        self.assertEqual(payload['status'], 'complete')
+        self.assertEqual(payload['progress']['modes'], ['guess_artist'])
+
+
+class ProcessingStatusViewTests(TestCase):
+    def test_status_reports_playable_modes_while_processing(self):
+        """Modes that are ready are reported before the job finishes"""
+        user = User.objects.create_user(
+            username='status', email='status@example.com', password='testpass123',
+        )
+        job = enqueue_ingestion(user)
+        IngestionJob.objects.filter(id=job.id).update(progress={
+            'stage': 'enriching',
+            'modes': ['guess_artist'],
+            'readiness': {'guess_artist': {'ready': True, 'have': 1, 'need': 1}},
+        })
+        self.client.force_login(user)
+
+        response = self.client.get('/processing-status/')
+
+        self.assertEqual(response.json()['status'], 'processing')
+        self.assertEqual(response.json()['modes'], ['guess_artist'])
+        self.assertTrue(response.json()['readiness']['guess_artist']['ready'])
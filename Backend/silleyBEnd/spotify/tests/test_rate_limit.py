@@ -0,0 +1,72 @@
+import asyncio
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from spotipy import SpotifyException
+from spotify.rate_limit import LocalBucketStore, RateLimiter, owner, parse_retry_after
+from spotify.utils import safe_spotify_request
+
+
+class LocalBucketStoreTests(SimpleTestCase):
+    def test_burst_then_wait(self):
+        """The bucket allows a burst, then reports how long to wait"""
+        store = LocalBucketStore()
+
+        self.assertEqual([store.take('mb', 1, 2) for _ in range(2)], [0.0, 0.0])
+        self.assertGreater(store.take('mb', 1, 2), 0.9)
+
+    def test_block_holds_provider(self):
+        """A Retry-After block makes every take wait, even with tokens left"""
+        store = LocalBucketStore()
+        store.block('genius', 30)
+
+        self.assertGreater(store.take('genius', 10, 10), 29)
+        self.assertEqual(store.take('discogs', 10, 10), 0.0)
+
+
+class ParseRetryAfterTests(SimpleTestCase):
+    def test_seconds_and_missing_header(self):
+        """Numeric values are used as-is; missing headers fall back to the default"""
+        self.assertEqual(parse_retry_after({'retry-after': '12'}), 12)
+        self.assertEqual(parse_retry_after({}, default=3), 3)
+        self.assertEqual(parse_retry_after(None, default=3), 3)
+
+
+@override_settings(RATE_LIMITS={'test': {'rate': 1000, 'burst': 1}}, RATE_LIMIT_REDIS_URL=None)
+class FairSchedulingTests(SimpleTestCase):
+    def test_waiting_requests_alternate_between_owners(self):
+        """One owner's backlog does not delay another owner's first request"""
+        limiter = RateLimiter()
+        granted = []
+
+        async def request(name, label):
+            with owner(name):
+                await limiter.acquire('test')
+            granted.append(label)
+
+        async def scenario():
+            await asyncio.gather(
+                request('a', 'a1'), request('a', 'a2'), request('a', 'a3'), request('b', 'b1'),
+            )
+
+        async_to_sync(scenario)()
+
+        self.assertEqual(granted, ['a1', 'b1', 'a2', 'a3'])
+
+    def test_unconfigured_provider_is_not_limited(self):
+        """Providers without a RATE_LIMITS entry never wait"""
+        async_to_sync(RateLimiter().acquire)('unknown')
+
+
+class SafeSpotifyRequestTests(SimpleTestCase):
+    def test_throttled_request_is_retried(self):
+        """A 429 pauses Spotify for Retry-After and the call is retried"""
+        calls = []
+
+        def endpoint():
+            calls.append(1)
+            if len(calls) == 1:
+                raise SpotifyException(429, -1, "rate limited", headers={'Retry-After': '0'})
+            return {"ok": True}
+
+        self.assertEqual(async_to_sync(safe_spotify_request)(endpoint), {"ok": True})
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,82 @@
+import json
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from spotify.http_clients import ProviderResponse
+from spotify.models import MostListenedSongs, User
+from spotify.replay import CallStats, Cassette, Faults, ReplayTransport, benchmark_ingestion
+from spotify.spotify_client import API_BASE
+
+
+def top_track(track_id, artist_id):
+    return {
+        "id": track_id,
+        "name": f"Song {track_id}",
+        "popularity": 50,
+        "duration_ms": 180000,
+        "artists": [{"id": artist_id, "name": "Artist"}],
+        "album": {
+            "id": f"album-{track_id}",
+            "name": "Album",
+            "release_date": "2020-01-01",
+            "total_tracks": 10,
+            "artists": [{"id": artist_id, "name": "Artist"}],
+            "images": [],
+        },
+    }
+
+
+class ReplayBenchmarkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bench', email='bench@example.com')
+        self.cassette = Cassette()
+        self.record_spotify('me/top/tracks', {'limit': 50, 'offset': 0, 'time_range': 'medium_term'},
+                            {'items': [top_track('t1', 'a1'), top_track('t2', 'a1')]})
+        self.record_spotify('me/top/artists', {'limit': 50, 'offset': 0, 'time_range': 'medium_term'},
+                            {'items': []})
+        self.record_spotify('artists', {'ids': 'a1'},
+                            {'artists': [{'id': 'a1', 'name': 'Artist', 'genres': ['pop']}]})
+
+    def record_spotify(self, path, params, body):
+        url = f"{API_BASE}/{path}"
+        self.cassette.record_http('spotify', url, params, ProviderResponse(
+            status=200, url=url, headers={'Content-Type': 'application/json'},
+            body=json.dumps(body).encode(),
+        ))
+
+    def test_replay_ingests_from_cassette(self):
+        """Recorded Spotify data is stored and unrecorded requests count as misses"""
+        stats = CallStats()
+        faults = Faults()
+        result = async_to_sync(benchmark_ingestion)(
+            [self.user], ReplayTransport(self.cassette, faults, stats), stats,
+        )
+
+        self.assertEqual(
+            set(MostListenedSongs.objects.filter(user=self.user).values_list('genres', flat=True)),
+            {'pop'},
+        )
+        self.assertEqual(result.calls['spotify'], 3)
+        self.assertEqual(result.misses, {'genius': 2})
+        self.assertGreater(result.as_dict()['peak_memory_per_user_mb'], 0)
+
+    def test_cassette_round_trip(self):
+        """Recorded responses replay with status, headers and body intact"""
+        self.cassette.record_http('genius', 'https://api.genius.com/search', {'q': 'x'}, ProviderResponse(
+            status=200, url='https://api.genius.com/search?q=x',
+            headers={'Content-Type': 'application/json', 'Set-Cookie': 'secret'}, body=b'{"ok": true}',
+        ))
+
+        response = self.cassette.http_response('genius', 'https://api.genius.com/search', {'q': 'x'})
+
+        self.assertEqual(response.json(), {'ok': True})
+        self.assertEqual(response.headers, {'Content-Type': 'application/json'})
+
+    def test_injected_errors_are_reproducible(self):
+        """The same seed fails the same calls"""
+        runs = []
+        for _ in range(2):
+            faults = Faults(error_rate=0.5, seed=7)
+            runs.append([faults.fails() for _ in range(20)])
+        self.assertEqual(runs[0], runs[1])
+        self.assertIn(True, runs[0])
+        self.assertIn(False, runs[0])
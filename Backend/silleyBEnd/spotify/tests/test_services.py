@@ -0,0 +1,68 @@
+import json
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from spotify.http_clients import ProviderResponse
+from spotify.services import ArtistDetailsService
+
+WIKITEXT = """'''Drake''' is a Canadian rapper.
+
+== Early life ==
+Drake was born in [[Toronto]].
+
+== Career ==
+=== 2006–2009 ===
+Mixtapes.
+
+== Personal life ==
+He lives in Toronto.
+
+=== Artistry ===
+Melodic rap.
+"""
+
+
+class FakeWikipedia:
+    def __init__(self, search_titles):
+        self.search_titles = search_titles
+        self.calls = []
+
+    async def get(self, provider, url, *, params=None, headers=None):
+        self.calls.append(params)
+        if params["action"] == "query":
+            payload = {"query": {"search": [{"title": title} for title in self.search_titles]}}
+        else:
+            payload = {"parse": {"title": params["page"], "wikitext": WIKITEXT}}
+        return ProviderResponse(status=200, url=url, body=json.dumps(payload).encode())
+
+
+class ArtistDetailsServiceTests(SimpleTestCase):
+    def fetch(self, fake, name):
+        with mock.patch('spotify.services.provider_clients', fake):
+            return async_to_sync(ArtistDetailsService().get_artist_details)(name)
+
+    def test_biography_uses_two_requests(self):
+        """Title search plus one wikitext fetch, regardless of section count"""
+        fake = FakeWikipedia(["Drake Bell", "Drake (musician)"])
+        biography = self.fetch(fake, "Drake")
+
+        self.assertEqual(len(fake.calls), 2)
+        self.assertEqual(fake.calls[1]["page"], "Drake (musician)")
+        self.assertIn("Drake was born in Toronto.", biography)
+        self.assertEqual(biography.count("Melodic rap."), 1)
+        self.assertNotIn("Mixtapes.", biography)
+        self.assertLess(biography.index("Early life"), biography.index("Personal life"))
+
+    def test_missing_page_returns_placeholder(self):
+        """No search hits means no wikitext request"""
+        fake = FakeWikipedia([])
+
+        self.assertEqual(self.fetch(fake, "Unknown Band"), "No biography available")
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_unrelated_top_hit_is_not_used(self):
+        """Search hits that are not titled after the artist give no biography"""
+        fake = FakeWikipedia(["Hotline Bling", "Drake Bell"])
+
+        self.assertEqual(self.fetch(fake, "Drake"), "No biography available")
+        self.assertEqual(len(fake.calls), 1)
@@ -0,0 +1,58 @@
+import json
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+from spotipy import SpotifyException
+from spotify.http_clients import ProviderResponse, provider_clients
+from spotify.spotify_client import API_BASE, AsyncSpotify
+from spotify.utils import safe_spotify_request
+
+
+class FakeSpotify:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def __call__(self, provider, url, *, params=None, headers=None):
+        self.requests.append((provider, url, params, headers))
+        status, body, response_headers = self.responses.pop(0)
+        return ProviderResponse(status=status, url=url, headers=response_headers,
+                                body=json.dumps(body).encode())
+
+
+@override_settings(RATE_LIMITS={})
+class AsyncSpotifyTests(SimpleTestCase):
+    def call(self, fake, method, *args, **kwargs):
+        sp = AsyncSpotify(auth='token')
+        with provider_clients.use_transport(fake):
+            return async_to_sync(safe_spotify_request)(getattr(sp, method), *args, **kwargs)
+
+    def test_requests_use_spotipy_arguments(self):
+        """Methods map spotipy arguments onto Web API query parameters"""
+        fake = FakeSpotify((200, {'artists': []}, {}), (200, {'items': []}, {}))
+
+        self.call(fake, 'artists', ['a1', 'a2'])
+        self.call(fake, 'artist_albums', 'a1', album_type='album', limit=50)
+
+        self.assertEqual(fake.requests[0][:3], ('spotify', f'{API_BASE}/artists', {'ids': 'a1,a2'}))
+        self.assertEqual(fake.requests[0][3], {'Authorization': 'Bearer token'})
+        self.assertEqual(fake.requests[1][2], {'include_groups': 'album', 'limit': 50, 'offset': 0})
+
+    def test_throttled_request_is_retried(self):
+        """A 429 waits for Retry-After and retries on the same session"""
+        fake = FakeSpotify(
+            (429, {'error': {'status': 429}}, {'Retry-After': '0'}),
+            (200, {'id': 'user'}, {}),
+        )
+
+        self.assertEqual(self.call(fake, 'current_user'), {'id': 'user'})
+        self.assertEqual(len(fake.requests), 2)
+
+    def test_errors_raise_spotify_exception(self):
+        """Client errors surface as SpotifyException with the API message"""
+        fake = FakeSpotify((404, {'error': {'status': 404, 'message': 'Not found'}}, {}))
+
+        with self.assertRaises(SpotifyException) as raised:
+            self.call(fake, 'artist', 'missing')
+
+        self.assertEqual(raised.exception.http_status, 404)
+        self.assertIn('Not found', raised.exception.msg)
@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase
+from django.utils import timezone
+from spotify.models import SpotifyPlaybackToken, SpotifyToken, User
+from spotify.token_service import API, PLAYBACK, CachedToken, TokenService
+
+
+class FakeTokenEndpoint:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.requests = []
+
+    def __call__(self, url, data=None, headers=None, timeout=None):
+        self.requests.append(data)
+        time.sleep(self.delay)
+        return FakeResponse({'access_token': f'fresh-{len(self.requests)}', 'expires_in': 3600})
+
+
+class FakeResponse:
+    status_code = 200
+    text = ''
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeRedis:
+    """Just enough of a shared Redis for several TokenService "processes"."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def register_script(self, script):
+        def release(keys, args):
+            if self.data.get(keys[0]) == args[0]:
+                self.delete(keys[0])
+        return release
+
+
+class TokenServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='listener', email='listener@example.com')
+        SpotifyToken.objects.create(
+            user=self.user, access_token='stored', refresh_token='refresh',
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.service = TokenService()
+        self.endpoint = FakeTokenEndpoint()
+        self.service.session.post = self.endpoint
+
+    def test_cached_token_needs_no_queries(self):
+        """After the first lookup the token is served without touching the database"""
+        self.assertEqual(self.service.access_token(self.user.id), 'stored')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.service.access_token(self.user.id), 'stored')
+        self.assertEqual(self.endpoint.requests, [])
+
+    def test_concurrent_refreshes_are_single_flight(self):
+        """Threads asking for an expiring token share one refresh"""
+        self.endpoint.delay = 0.2
+        self.service._publish(self.service.key(self.user.id), CachedToken('old', time.time() + 60, 'refresh'))
+        results = []
+
+        with patch.object(TokenService, '_persist'):
+            threads = [
+                threading.Thread(target=lambda: results.append(self.service.access_token(self.user.id)))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(self.endpoint.requests), 1)
+        self.assertEqual(results, ['fresh-1'] * 5)
+
+    def test_processes_with_stale_local_copies_refresh_once(self):
+        """A process that takes the shared lock after another refreshed reuses its token"""
+        shared = FakeRedis()
+        services = [self.service, TokenService()]
+        services[1].session.post = self.endpoint
+        key = self.service.key(self.user.id)
+        for service in services:
+            service._redis, service._release = shared, shared.register_script(None)
+            service._publish(key, CachedToken('old', time.time() + 60, 'refresh'))
+
+        with patch.object(TokenService, '_persist'):
+            tokens = [service.access_token(self.user.id) for service in services]
+
+        self.assertEqual(len(self.endpoint.requests), 1)
+        self.assertEqual(tokens, ['fresh-1', 'fresh-1'])
+
+    def test_background_pass_renews_active_tokens(self):
+        """Tokens of recently seen users are refreshed ahead of expiry and persisted"""
+        SpotifyToken.objects.filter(user=self.user).update(expires_at=timezone.now() + timedelta(minutes=8))
+        self.service.get(self.user.id)
+
+        self.assertEqual(self.service.refresh_active(), 1)
+
+        token = SpotifyToken.objects.get(user=self.user)
+        self.assertEqual((token.access_token, token.refresh_token), ('fresh-1', 'refresh'))
+        self.assertEqual(self.service.refresh_active(), 0)
+
+    def test_playback_token_is_stored_once_per_user(self):
+        """Playback tokens are requested with the playback scope and updated in place"""
+        first = self.service.get(self.user.id, PLAYBACK)
+        self.service.refresh(self.user.id, PLAYBACK, margin=7200)
+
+        self.assertEqual(first.access_token, 'fresh-1')
+        self.assertIn('streaming', self.endpoint.requests[0]['scope'])
+        self.assertEqual(
+            list(SpotifyPlaybackToken.objects.filter(user=self.user).values_list('access_token', flat=True)),
+            ['fresh-2'],
+        )
+        self.assertEqual(self.service.access_token(self.user.id, API), 'stored')
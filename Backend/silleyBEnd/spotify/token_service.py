@@ -0,0 +1,400 @@
+import base64
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterator, Optional, Tuple
+import redis
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from .models import SpotifyPlaybackToken, SpotifyToken
+
+logger = logging.getLogger("spotify")
+
+TOKEN_URL = 'https://accounts.spotify.com/api/token'
+PLAYBACK_SCOPE = 'streaming user-read-playback-state user-modify-playback-state'
+
+API = 'api'
+PLAYBACK = 'playback'
+
+DEFAULT_OPTIONS = {
+    'local_ttl': 30,
+    'refresh_margin': 300,
+    'refresh_ahead': 600,
+    'refresh_interval': 60,
+    'active_window': 3600,
+    'lock_timeout': 10,
+}
+
+# Delete the refresh lock only if this process still holds it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def token_options() -> Dict:
+    return {**DEFAULT_OPTIONS, **getattr(settings, 'TOKEN_SERVICE', {})}
+
+
+class TokenRefreshError(Exception):
+    """Spotify refused to refresh a token, or there is nothing to refresh it with."""
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    access_token: str
+    expires_at: float
+    refresh_token: Optional[str] = None
+
+    def expires_within(self, seconds: float) -> bool:
+        return self.expires_at - seconds <= time.time()
+
+    @property
+    def expires_at_datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.expires_at, tz=dt_timezone.utc)
+
+    def encode(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def decode(cls, data) -> 'CachedToken':
+        return cls(**json.loads(data))
+
+
+class TokenService:
+    """Spotify access tokens for API calls and Web Playback, per user.
+
+    Lookups go through a short-lived process-local cache, then Redis at
+    ``settings.TOKEN_SERVICE_REDIS_URL`` (shared by every worker), and only
+    then the SpotifyToken/SpotifyPlaybackToken tables, which stay the
+    durable copy. Refreshes are single-flight: one thread per process and,
+    through a Redis lock, one process per user refreshes while the others
+    wait for its result. A daemon thread renews tokens of recently active
+    users before they expire, so requests rarely refresh inline.
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+        self._local: Dict[str, Tuple[CachedToken, float]] = {}
+        self._active: Dict[Tuple[str, int], float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_url = None
+        self._release = None
+        self._last_warning = 0.0
+        self._refresher: Optional[threading.Thread] = None
+
+    # Cache layers
+
+    @staticmethod
+    def key(user_id: int, kind: str = API) -> str:
+        return f"tokens:{kind}:{user_id}"
+
+    @property
+    def redis(self) -> Optional[redis.Redis]:
+        url = getattr(settings, 'TOKEN_SERVICE_REDIS_URL', None)
+        with self._lock:
+            if url != self._redis_url:
+                self._redis_url = url
+                self._redis = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1) if url else None
+                self._release = self._redis.register_script(RELEASE_SCRIPT) if url else None
+            return self._redis
+
+    def _warn(self, error: Exception) -> None:
+        if time.monotonic() - self._last_warning > 60:
+            self._last_warning = time.monotonic()
+            logger.warning(f"Redis token cache unavailable, using local cache: {error}")
+
+    def _cached(self, key: str) -> Optional[CachedToken]:
+        with self._lock:
+            entry = self._local.get(key)
+        if entry and time.monotonic() - entry[1] < token_options()['local_ttl']:
+            return entry[0]
+
+        client = self.redis
+        if client is None:
+            return None
+        try:
+            data = client.get(key)
+        except redis.RedisError as e:
+            self._warn(e)
+            return None
+        if data is None:
+            return None
+        token = CachedToken.decode(data)
+        self._remember(key, token)
+        return token
+
+    def _remember(self, key: str, token: CachedToken) -> None:
+        with self._lock:
+            self._local[key] = (token, time.monotonic())
+
+    def _publish(self, key: str, token: CachedToken) -> None:
+        self._remember(key, token)
+        client = self.redis
+        if client is None:
+            return
+        try:
+            client.set(key, token.encode(), ex=max(1, int(token.expires_at - time.time())))
+        except redis.RedisError as e:
+            self._warn(e)
+
+    def invalidate(self, user_id: int) -> None:
+        keys = [self.key(user_id, kind) for kind in (API, PLAYBACK)]
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        client = self.redis
+        if client is not None:
+            try:
+                client.delete(*keys)
+            except redis.RedisError as e:
+                self._warn(e)
+
+    # Durable copy
+
+    @staticmethod
+    def _load(user_id: int, kind: str) -> Optional[CachedToken]:
+        if kind == API:
+            row = SpotifyToken.objects.filter(user_id=user_id).values_list(
+                'access_token', 'expires_at', 'refresh_token'
+            ).first()
+        else:
+            row = SpotifyPlaybackToken.objects.filter(user_id=user_id).order_by('-expires_at').values_list(
+                'access_token', 'expires_at'
+            ).first()
+        if row is None:
+            return None
+        return CachedToken(row[0], row[1].timestamp(), *row[2:])
+
+    @staticmethod
+    def _persist(user_id: int, kind: str, token: CachedToken) -> None:
+        if kind == API:
+            SpotifyToken.objects.update_or_create(user_id=user_id, defaults={
+                'access_token': token.access_token,
+                'refresh_token': token.refresh_token,
+                'expires_at': token.expires_at_datetime,
+            })
+            return
+        updated = SpotifyPlaybackToken.objects.filter(user_id=user_id).update(
+            access_token=token.access_token, expires_at=token.expires_at_datetime
+        )
+        if not updated:
+            SpotifyPlaybackToken.objects.create(
+                user_id=user_id, access_token=token.access_token, expires_at=token.expires_at_datetime
+            )
+
+    # Public API
+
+    def get(self, user_id: int, kind: str = API) -> Optional[CachedToken]:
+        """Current token for ``user_id``, refreshed if it is about to expire.
+
+        Returns None when the user never connected Spotify.
+        """
+        key = self.key(user_id, kind)
+        with self._lock:
+            self._active[(kind, user_id)] = time.monotonic()
+        self._ensure_refresher()
+
+        token = self._cached(key)
+        if token is None:
+            token = self._load(user_id, kind)
+            if token is not None:
+                self._publish(key, token)
+        if token is None and kind == API:
+            return None
+        if token is None or token.expires_within(token_options()['refresh_margin']):
+            return self.refresh(user_id, kind)
+        return token
+
+    def access_token(self, user_id: int, kind: str = API) -> Optional[str]:
+        token = self.get(user_id, kind)
+        return token.access_token if token else None
+
+    def store(self, user_id: int, token_info: Dict) -> CachedToken:
+        """Save the token info from an authorization code exchange."""
+        token = CachedToken(
+            access_token=token_info['access_token'],
+            expires_at=time.time() + token_info['expires_in'],
+            refresh_token=token_info.get('refresh_token'),
+        )
+        self._persist(user_id, API, token)
+        self.invalidate(user_id)
+        self._publish(self.key(user_id, API), token)
+        return token
+
+    def refresh(self, user_id: int, kind: str = API, margin: Optional[float] = None) -> CachedToken:
+        """Refresh unless someone else already has, leaving ``margin`` seconds of validity."""
+        margin = token_options()['refresh_margin'] if margin is None else margin
+        key = self.key(user_id, kind)
+        with self._key_lock(key):
+            current = self._cached(key)
+            if current and not current.expires_within(margin):
+                return current
+            with self._shared_lock(key) as acquired:
+                if not acquired:
+                    token = self._wait_for_refresh(key, margin)
+                    if token is not None:
+                        return token
+                else:
+                    # Another process may have refreshed while our local copy was stale
+                    token = self._shared_token(key, margin)
+                    if token is not None:
+                        return token
+                token = self._request_refresh(user_id, kind)
+                self._persist(user_id, kind, token)
+                self._publish(key, token)
+        logger.info(f"Refreshed Spotify {kind} token for user {user_id}")
+        return token
+
+    # Single-flight refresh
+
+    @contextmanager
+    def _key_lock(self, key: str) -> Iterator[None]:
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            yield
+
+    @contextmanager
+    def _shared_lock(self, key: str) -> Iterator[bool]:
+        client = self.redis
+        if client is None:
+            yield True
+            return
+        lock_key, owner = f"{key}:refresh", uuid.uuid4().hex
+        try:
+            acquired = bool(client.set(lock_key, owner, nx=True, px=token_options()['lock_timeout'] * 1000))
+        except redis.RedisError as e:
+            self._warn(e)
+            yield True
+            return
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    self._release(keys=[lock_key], args=[owner])
+                except redis.RedisError as e:
+                    self._warn(e)
+
+    def _shared_token(self, key: str, margin: float) -> Optional[CachedToken]:
+        """The token in Redis, bypassing the local cache, if it is still fresh."""
+        client = self.redis
+        if client is None:
+            return None
+        try:
+            data = client.get(key)
+        except redis.RedisError as e:
+            self._warn(e)
+            return None
+        if data is None:
+            return None
+        token = CachedToken.decode(data)
+        if token.expires_within(margin):
+            return None
+        self._remember(key, token)
+        return token
+
+    def _wait_for_refresh(self, key: str, margin: float) -> Optional[CachedToken]:
+        """Poll Redis for the token another process is refreshing."""
+        deadline = time.monotonic() + token_options()['lock_timeout']
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            try:
+                data = self.redis.get(key)
+            except redis.RedisError as e:
+                self._warn(e)
+                return None
+            if data is not None:
+                token = CachedToken.decode(data)
+                if not token.expires_within(margin):
+                    self._remember(key, token)
+                    return token
+        logger.warning(f"Timed out waiting for another worker to refresh {key}")
+        return None
+
+    def _request_refresh(self, user_id: int, kind: str) -> CachedToken:
+        api_token = self._cached(self.key(user_id, API)) or self._load(user_id, API)
+        refresh_token = api_token.refresh_token if api_token else None
+        if not refresh_token:
+            raise TokenRefreshError(f"No refresh token available for user {user_id}")
+
+        data = {'grant_type': 'refresh_token', 'refresh_token': refresh_token}
+        if kind == PLAYBACK:
+            data['scope'] = PLAYBACK_SCOPE
+            credentials = settings.SPOTIFY_AUTH_HEADER
+        else:
+            credentials = base64.b64encode(
+                f"{settings.SPOTIFY_CLIENT_ID}:{settings.SPOTIFY_CLIENT_SECRET}".encode()
+            ).decode()
+
+        response = self.session.post(
+            TOKEN_URL, data=data, headers={'Authorization': f"Basic {credentials}"}, timeout=10
+        )
+        if response.status_code != 200:
+            logger.error(f"Spotify {kind} token refresh failed for user {user_id}: {response.text}")
+            raise TokenRefreshError(f"Spotify token refresh failed with status {response.status_code}")
+
+        token_info = response.json()
+        return CachedToken(
+            access_token=token_info['access_token'],
+            expires_at=time.time() + token_info['expires_in'],
+            refresh_token=(token_info.get('refresh_token') or refresh_token) if kind == API else None,
+        )
+
+    # Background refresh
+
+    def _ensure_refresher(self) -> None:
+        if not token_options()['refresh_interval']:
+            return
+        with self._lock:
+            if self._refresher is None or not self._refresher.is_alive():
+                self._refresher = threading.Thread(
+                    target=self._refresh_loop, name='spotify-token-refresher', daemon=True
+                )
+                self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            time.sleep(token_options()['refresh_interval'])
+            try:
+                self.refresh_active()
+            except Exception as e:
+                logger.error(f"Background token refresh failed: {e}", exc_info=True)
+            finally:
+                close_old_connections()
+
+    def refresh_active(self) -> int:
+        """Renew tokens of users seen within ``active_window`` that expire soon."""
+        options = token_options()
+        now = time.monotonic()
+        with self._lock:
+            for entry, seen in list(self._active.items()):
+                if now - seen > options['active_window']:
+                    del self._active[entry]
+            active = list(self._active)
+
+        refreshed = 0
+        for kind, user_id in active:
+            token = self._cached(self.key(user_id, kind)) or self._load(user_id, kind)
+            if token is None or not token.expires_within(options['refresh_ahead']):
+                continue
+            try:
+                self.refresh(user_id, kind, margin=options['refresh_ahead'])
+                refreshed += 1
+            except (TokenRefreshError, requests.RequestException) as e:
+                logger.warning(f"Could not refresh {kind} token for user {user_id} ahead of expiry: {e}")
+        return refreshed
+
+
+token_service = TokenService()
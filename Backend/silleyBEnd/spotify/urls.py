@@ -11,6 +11,8 @@ urlpatterns = [
     path('verify/', views.TokenVerifyView.as_view(), name='token-verify'),
     path('token/refresh/', TokenRefreshView.as_view(), name='jwt-token-refresh'),
     path('processing-status/', views.ProcessingStatusView.as_view(), name='processing-status'),
+    path('processing-stream/', views.ProcessingStreamView.as_view(), name='processing-stream'),
+    path('processing-stream/ticket/', views.ProcessingStreamTicketView.as_view(), name='processing-stream-ticket'),
     path('playback-token/',views.PlaybackTokenView.as_view(), name='playback-token'),
     path('user-profile/', views.User_Profile.as_view(), name='user-profile')
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 import asyncio
+import inspect
 from .services import ArtistDetailsService, LyricsService 
 import time
 import logging
@@ -20,9 +21,18 @@ from requests_oauthlib import OAuth1Session
 from spotipy import Spotify, SpotifyException, SpotifyOAuth
 from requests.exceptions import RequestException, Timeout
 from .constants import SCOPE
-from .models import (MostListenedAlbum, MostListenedArtist, MostListenedSongs,
-                      User)
-from .token_manager import TokenManager
+from .http_clients import MAX_THROTTLE_RETRIES, provider_clients
+from .artist_index import find_local_artist
+from .candidate_pools import has_biography, lyrics_word_count
+from .models import (LocalArtistMetadata, MostListenedAlbum, MostListenedArtist,
+                     MostListenedSongs, User)
+from .persistence import (UpsertResult, bulk_upsert_albums, bulk_upsert_artists,
+                          bulk_upsert_tracks, delete_user_rows_except, get_artists_missing_biography,
+                          get_stale_artist_ids, get_user_tracks, rank_user_artists,
+                          refresh_user_tracks, update_artists)
+from .planner import SpotifyCallPlanner
+from .progress import IngestionProgress
+from .rate_limit import parse_retry_after, rate_limiter
 
 from tenacity import retry, stop_after_attempt, wait_exponential
 import ssl
@@ -30,9 +40,7 @@ import certifi
 
 logger = logging.getLogger("spotify")
 
-token_manager = TokenManager()
 
-ssl_context = ssl.create_default_context(cafile=certifi.where())
 class SpotifyBackoffHandler:
     """Handles backoff configuration for spotify API calls"""
     
@@ -50,27 +58,32 @@ class SpotifyBackoffHandler:
         )
         
 async def safe_spotify_request(func: Callable, *args:Any, **kwargs: Any) -> Any:
-    """Safely execute Spotify API requests with proper error handling"""
-    try:
-        return await asyncio.to_thread(func, *args, **kwargs)
-    except SpotifyException as e:
-        if e.http_status == 429:
-            retry_after = int(e.headers.get('Retry-After',5))
-            logger.warning(f"Rate limited by Spotify. Waiting {retry_after} seconds")
-            await asyncio.sleep(retry_after)
-            return await safe_spotify_request(func, *args, **kwargs)
-        elif e.http_status in [500, 502, 503, 504]:
-            logger.error(f"Spotify server error: {e}")
-            raise
-        else:
-            logger.error(f"Spotify API error: {e}")
+    """Safely execute Spotify API requests with proper error handling.
+    
+    ``AsyncSpotify`` methods are awaited directly; they wait for the shared
+    ``spotify`` rate limiter and retry 429s themselves. Blocking spotipy
+    methods run in a thread under the same limiter, and a 429 pauses
+    Spotify calls for every worker for the Retry-After period.
+    """
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        try:
+            if inspect.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            await rate_limiter.acquire('spotify')
+            return await asyncio.to_thread(func, *args, **kwargs)
+        except SpotifyException as e:
+            if e.http_status == 429 and attempt < MAX_THROTTLE_RETRIES and not inspect.iscoroutinefunction(func):
+                rate_limiter.defer('spotify', parse_retry_after(e.headers))
+                continue
+            elif e.http_status in [500, 502, 503, 504]:
+                logger.error(f"Spotify server error: {e}")
+                raise
+            else:
+                logger.error(f"Spotify API error: {e}")
+                raise
+        except ConnectionError as e:
+            logger.error(f"Connection error during Spotify request: {e}")
             raise
-    except ConnectionError as e:
-        logger.error(f"Connection error during Spotify request: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error during  Spotify request: {e}")
-        raise
 
 def authenticate_user(request, code):
     sp_oauth = SpotifyOAuth(
@@ -81,21 +94,11 @@ def authenticate_user(request, code):
     )
 
     try:
-        # Get token from Redis first
-        token_info = token_manager.get_token(request.session.get('user_id'))
-        
-        if token_info and sp_oauth.is_token_expired(token_info):
-            token_info = sp_oauth.refresh_access_token(token_info["refresh_token"])
-            if (token_info):
-                token_manager.store_token(request.session['user_id'], token_info)
-        
-        if not token_info:
-            token_info = sp_oauth.get_access_token(code)
-            if token_info and "access_token" in token_info:
-                # Store in Redis and session
-                user_info = Spotify(auth=token_info["access_token"]).current_user()
-                request.session['user_id'] = user_info['id']
-                token_manager.store_token(user_info['id'], token_info)
+        # The callback stores the result through spotify.token_service
+        token_info = sp_oauth.get_access_token(code)
+        if token_info and "access_token" in token_info:
+            user_info = Spotify(auth=token_info["access_token"]).current_user()
+            request.session['user_id'] = user_info['id']
 
         return token_info
 
@@ -165,102 +168,235 @@ def error_response(message, status=500):
         "timestamp": datetime.now().isoformat()
     }, status=status)
 
+
+class ProviderLimits:
+    """Per-provider semaphores bounding how many enrichment calls run at once."""
+    
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        limits = limits or getattr(settings, 'INGESTION_CONCURRENCY', {})
+        self._semaphores = {
+            provider: asyncio.Semaphore(size)
+            for provider, size in limits.items()
+        }
         
-@sync_to_async
-def bulk_create_albums(album_id,user,album_data):
-    return MostListenedAlbum.objects.update_or_create(
-        spotify_id=album_id,
-        user=user,
-        defaults=album_data,
-         ) 
-
-@sync_to_async
-def create_or_update_track(tracks_data: Dict) -> Tuple[MostListenedSongs, bool]:
-    return MostListenedSongs.objects.update_or_create(
-        spotify_id=tracks_data['spotify_id'],
-        user=tracks_data['user'],
-        defaults=tracks_data['defaults']
-    )
+    def __call__(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(1)
+        return self._semaphores[provider]
+
+def normalize_release_date(release_date: str) -> str:
+    """Pad Spotify's year / year-month release dates to a full date."""
+    if len(release_date) == 4:
+        return release_date + "-01-01"
+    if len(release_date) == 7:
+        return release_date + "-01"
+    return release_date
+
+def _album_image_url(album: Dict) -> Optional[str]:
+    return album.get("images", [{}])[1].get("url") if album.get("images") else None
+
+async def enrich_track(planner: SpotifyCallPlanner, track: Dict,
+                       lyrics_service: LyricsService, limits: ProviderLimits) -> Tuple[Dict, Dict]:
+    """Enrich a single top track with artist genres and lyrics.
+    
+    Artist details come from ``planner``, which must already be resolved.
+    Lyrics go to the shared lyrics store; the track row only keeps a flag.
+    
+    Returns:
+        Tuple containing the track row data and the album row data
+    """
+    async with limits('tracks'):
+        track_id = track["id"]
+        album = track["album"]
+        release_date = normalize_release_date(album["release_date"])
+        
+        artist_names = [artist["name"] for artist in track["artists"]]
+        
+        genres = set()
+        for artist in track["artists"]:
+            artist_info = planner.artist(artist["id"])
+            if artist_info:
+                genres.update(artist_info.get("genres", []))
+            else:
+                logger.warning(f"No artist info resolved for {artist['id']}")
+            
+        async with limits('genius'):
+            lyrics = await lyrics_service.lyrics_for_track(
+                track_id,
+                track["name"],
+                artist_names[0] if artist_names else None
+            )
+        
+        album_data = {
+            "spotify_id": album["id"],
+            "name": album["name"],
+            "artists": ", ".join(artist["name"] for artist in album["artists"]),
+            "release_date": release_date,
+            "total_tracks": album["total_tracks"],
+            "image_url": _album_image_url(album)
+        }
+
+        track_data = {
+            "spotify_id": track_id,
+            "name": track["name"],
+            "artist": ", ".join(artist_names),
+            "album": album["name"],
+            "release_date": release_date,
+            "duration_seconds": convert_ms_to_seconds(track.get("duration_ms", 0)),
+            "popularity": track["popularity"],
+            "genres": ", ".join(genres) if genres else "Unknown",
+            "has_lyrics": bool(lyrics),
+            "lyrics_word_count": lyrics_word_count(lyrics),
+            "image_url": _album_image_url(album),
+            "track_uri": f"spotify:track:{track_id}"
+        }
+        return track_data, album_data
+
+async def refresh_track_lyrics(track: Dict, lyrics_service: LyricsService,
+                               limits: ProviderLimits) -> Tuple[Dict, None]:
+    """Look up lyrics again for a stored track that has none.
+    
+    Returns the refresh row and no album, as the album is already stored.
+    """
+    async with limits('genius'):
+        lyrics = await lyrics_service.lyrics_for_track(
+            track["id"], track["name"], track["artists"][0]["name"] if track["artists"] else None
+        )
+    return {
+        "spotify_id": track["id"],
+        "popularity": track["popularity"],
+        "has_lyrics": bool(lyrics),
+        "lyrics_word_count": lyrics_word_count(lyrics),
+    }, None
+
+async def write_track_batch(user, new_rows: List[Dict], refreshed_rows: List[Dict]) -> UpsertResult:
+    result = UpsertResult()
+    if new_rows:
+        result += await bulk_upsert_tracks(user, new_rows)
+    if refreshed_rows:
+        result += await refresh_user_tracks(user, refreshed_rows)
+    return result
 
 @SpotifyBackoffHandler.get_backoff_decorator()
-async def process_top_tracks(sp, user):
+async def process_top_tracks(sp, user, planner: Optional[SpotifyCallPlanner] = None,
+                             progress: Optional[IngestionProgress] = None) -> UpsertResult:
+    """Enrich the user's top tracks concurrently and store them as they finish.
+    
+    Tracks are enriched in parallel under the per-provider limits in
+    ``settings.INGESTION_CONCURRENCY`` so the total time is bounded by the
+    slowest track rather than the sum of all of them. Artist lookups for
+    every track are deduplicated and batched through ``planner``. Finished
+    tracks are written in bulk batches of ``INGESTION_WRITE_BATCH_SIZE``.
+    
+    The first writes are small so a few songs are playable early.
+    
+    On a refresh only tracks that are new to the user's top list are
+    enriched; tracks already stored just get their popularity and rank
+    updated, and tracks that dropped out are deleted. Stored tracks still
+    without lyrics are looked up again alongside the new ones.
+    """
     try:
         top_tracks = await safe_spotify_request(sp.current_user_top_tracks, limit=50, time_range="medium_term")
         if not top_tracks or "items" not in top_tracks:
             logger.error("No top tracks data received")
-            return
+            return UpsertResult()
+        
+        ranks = {}
+        for track in top_tracks["items"]:
+            ranks.setdefault(track["id"], len(ranks) + 1)
+        
+        stored = await get_user_tracks(user)
+        new_tracks = [track for track in top_tracks["items"] if track["id"] not in stored]
+        kept_tracks = [track for track in top_tracks["items"] if track["id"] in stored]
+        dropped = await delete_user_rows_except(MostListenedSongs, user, ranks)
+        logger.info(
+            f"Top tracks for user {user.id}: {len(new_tracks)} new, "
+            f"{len(kept_tracks)} kept, {dropped} dropped"
+        )
+        if progress:
+            await progress.set_total('tracks', len(top_tracks["items"]))
         
-        unique_albums = {}
         lyrics_service = LyricsService()
+        await lyrics_service.preload([
+            track["id"] for track in top_tracks["items"]
+            if not stored.get(track["id"])
+        ])
+        limits = ProviderLimits()
         
-        for track in top_tracks["items"]:
-            track_id = track["id"]
-            album = track["album"]
-            release_date = album["release_date"]
-            
-            if len(release_date) == 4:
-                release_date += "-01-01"
-            elif len(release_date) == 7:
-                release_date += "-01"
-            
-            album_id = album["id"]
-            genres = set()
-            artist_names = []
-            
-            for artist in track["artists"]:
-                artist_names.append(artist["name"])
+        kept_rows = [
+            {"spotify_id": track["id"], "popularity": track["popularity"], "rank": ranks[track["id"]]}
+            for track in kept_tracks if stored[track["id"]]
+        ]
+        result = await refresh_user_tracks(user, kept_rows)
+        if progress:
+            await progress.advance('tracks', len(kept_rows))
+            await progress.refresh_readiness(user)
+        
+        # Kept tracks without lyrics go through the same concurrent path as
+        # new ones; Genius is only hit once a stored "not found" has expired
+        pending = [
+            asyncio.create_task(refresh_track_lyrics(track, lyrics_service, limits))
+            for track in kept_tracks if not stored[track["id"]]
+        ]
+        
+        # Cancel the lyric refreshes above too if anything below fails
+        try:
+            planner = planner or SpotifyCallPlanner(sp)
+            planner.add_artists(
+                artist["id"]
+                for track in new_tracks
+                for artist in track["artists"]
+            )
+            await planner.resolve()
+        
+            unique_albums = {}
+            finished_tracks = []
+            refreshed_tracks = []
+            batch_size = getattr(settings, 'INGESTION_WRITE_BATCH_SIZE', 10)
+            # Write the first tracks one at a time, doubling up to batch_size, so
+            # the lyrics games become playable as soon as possible
+            batch_limit = 1
+        
+            pending += [
+                asyncio.create_task(enrich_track(planner, track, lyrics_service, limits))
+                for track in new_tracks
+            ]
+        
+            for finished in asyncio.as_completed(pending):
                 try:
-                    artist_info = await asyncio.to_thread(sp.artist, artist["id"])
-                    genres.update(artist_info.get("genres", []))
+                    track_data, album_data = await finished
                 except Exception as e:
-                    logger.warning(f"Error fetching artistk info for {artist['id']}: {e}")
-                    
-            genres_list = ", ".join(genres) if genres else "Unknown"
-            artist_names_list = ", ".join(artist_names)
-            
-            url = await lyrics_service.search_song(track["name"],
-                                                   artist_names[0] if artist_names else None
-                                        )
-            lyrics = await lyrics_service.get_lyrics(url) if url else None
-            
-            if album_id not in unique_albums:
-                unique_albums[album_id] = {
-                    "spotify_id": album_id,
-                    "name": album["name"],
-                    "artists": ", ".join(artist["name"] for artist in album["artists"]),
-                    "release_date": release_date,
-                    "total_tracks": album["total_tracks"],
-                    "image_url": (
-                        album.get("images", [{}])[1].get("url") 
-                        if album.get("images") 
-                        else None
-                    )
-                }
-
-            track_data = {
-                'spotify_id': track_id,
-                'user': user,
-                'defaults': {
-                    "name": track["name"],
-                    "artist": artist_names_list,
-                    "album": album["name"],
-                    "release_date": release_date,
-                    "duration_seconds": convert_ms_to_seconds(track.get("duration_ms", 0)),
-                    "popularity": track["popularity"],
-                    "genres": genres_list,
-                    "lyrics": lyrics,
-                    "image_url": (album.get("images", [{}])[1].get("url") 
-                        if album.get("images") 
-                        else None 
-                    ),
-                    "track_uri": f"spotify:track:{track_id}"
-                }
-            }
-         
-            await create_or_update_track(track_data)
+                    logger.error(f"Error enriching track: {e}")
+                    continue
+                
+                track_data["rank"] = ranks[track_data["spotify_id"]]
+                if album_data is None:
+                    refreshed_tracks.append(track_data)
+                else:
+                    finished_tracks.append(track_data)
+                    unique_albums.setdefault(album_data["spotify_id"], album_data)
+                if progress:
+                    await progress.advance('tracks')
+                
+                if len(finished_tracks) + len(refreshed_tracks) >= batch_limit:
+                    result += await write_track_batch(user, finished_tracks, refreshed_tracks)
+                    finished_tracks, refreshed_tracks = [], []
+                    batch_limit = min(batch_limit * 2, batch_size)
+                    if progress:
+                        await progress.refresh_readiness(user)
+        finally:
+            for task in pending:
+                task.cancel()
 
-        for album_id, album_data in unique_albums.items():
-            await bulk_create_albums(album_id, user, album_data)
+        if finished_tracks or refreshed_tracks:
+            result += await write_track_batch(user, finished_tracks, refreshed_tracks)
+            if progress:
+                await progress.refresh_readiness(user)
+        await bulk_upsert_albums(user, list(unique_albums.values()))
+        await delete_user_rows_except(
+            MostListenedAlbum, user, {track["album"]["id"] for track in top_tracks["items"]}
+        )
+        return result
             
     except Exception as e:
         logger.error(f"Error processing tracks: {e}", exc_info=True)
@@ -272,9 +408,18 @@ async def process_top_tracks(sp, user):
     max_time=30
 )
 async def fetch_musicbrainz_data(artist_name: str) -> dict:
-    """Fetch artist data from MusicBrainz with caching and retries"""
+    """Fetch artist data from MusicBrainz with caching and retries.
+    
+    The local index imported by ``import_artist_metadata`` is tried first;
+    the API is only called when it has no unambiguous match.
+    """
     if not artist_name:
         return None
+    
+    local = await find_local_artist(artist_name, LocalArtistMetadata.MUSICBRAINZ)
+    if local:
+        logger.debug(f"MusicBrainz data for {artist_name} found in the local index")
+        return local.as_musicbrainz()
         
     headers = {
         'User-Agent': 'SilleyApp/1.0 (your@email.com)',
@@ -290,15 +435,10 @@ async def fetch_musicbrainz_data(artist_name: str) -> dict:
     }
     
     try:
-        async with aiohttp.ClientSession(
-            headers=headers,
-            timeout=ClientTimeout(total=30),
-            connector=aiohttp.TCPConnector(ssl=ssl_context)
-        )as session:
-            async with session.get(url, params=params)as response:
-                response.raise_for_status()
-                data = await response.json()
-                return data.get("artists",[{}])[0] if data.get("artists") else None
+        response = await provider_clients.get('musicbrainz', url, params=params, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("artists",[{}])[0] if data.get("artists") else None
             
     except asyncio.TimeoutError as e:
         logger.error(f"MusicBrainz API timeout for {artist_name}: {e}")
@@ -341,27 +481,17 @@ async def fetch_most_popular_song(sp, artist_id: str) -> Optional[Tuple[str, str
 
 
 @SpotifyBackoffHandler.get_backoff_decorator()
-async def get_artist_album_count(sp, artist_name: str) -> int:
-    """Get total album count for artist with caching"""
+async def get_artist_album_count(sp, artist_id: str) -> int:
+    """Get total album count for an artist by Spotify id."""
          
     try:
-        results = await safe_spotify_request(
-            sp.search, q=artist_name, type='artist', limit=1
-        )
-        
-        if not results['artists']['items']:
-            return 0
-            
-        artist_id = results['artists']['items'][0]['id']
-        albums = await asyncio.to_thread(
-            sp.artist_albums, artist_id,album_type='album', limit=1
+        albums = await safe_spotify_request(
+            sp.artist_albums, artist_id, album_type='album', limit=1
         )
-        logger.debug(f"Albums response for {artist_name}: {albums}")
-        count = albums['total']
-        
-        return count
+        logger.debug(f"Albums response for {artist_id}: {albums}")
+        return albums['total']
     except Exception as e:
-        logger.error(f"Error fetching album count for {artist_name}: {e}")
+        logger.error(f"Error fetching album count for {artist_id}: {e}")
         return 0
 
 async def fetch_artist_metadata(
@@ -385,7 +515,7 @@ async def fetch_artist_metadata(
         musicbrainz_task = fetch_musicbrainz_data(artist_name)
         discogs_task = get_artist_info(artist_name)
         popular_song_task = fetch_most_popular_song(sp, artist_id)
-        album_count_task = get_artist_album_count(sp, artist_name)
+        album_count_task = get_artist_album_count(sp, artist_id)
         
         results = await asyncio.gather(
             musicbrainz_task,
@@ -438,20 +568,87 @@ async def process_artist_years(musicbrainz_data):
     
     return birth_year
 
-@sync_to_async
-def create_or_update_artist(artist_data: Dict):
-    """Create or update artist with sync_to_async wrapper."""
-    logger.debug("Entering create_or_update_artist")
-    logger.debug(f"Artist data:{artist_data['spotify_id']}")
-    
-    return MostListenedArtist.objects.update_or_create(
-            spotify_id = artist_data['spotify_id'],
-            user = artist_data['user'],
-            defaults=artist_data['defaults'],
+def spotify_artist_fields(artist: Dict) -> Dict:
+    """Catalog fields that come straight from the Spotify artist object."""
+    return {
+        "spotify_id": artist["id"],
+        "name": artist["name"],
+        "popularity": artist["popularity"],
+        "genres": ", ".join(artist["genres"]),
+        "followers": artist["followers"]["total"],
+        "image_url": (
+            artist.get("images", [{}])[1].get("url") 
+            if artist.get("images") 
+            else None
         )
+    }
+
+async def build_artist_row(sp, artist: Dict) -> Optional[Dict]:
+    """Enrich a single top artist and return its catalog row, or None on failure.
+    
+    The biography is fetched separately, see ``process_top_artists``.
+    """
+    artist_id = artist["id"]
+    logger.debug(f"Processing artist: {artist_id}")
+    
+    metadata = await fetch_artist_metadata(sp, artist["name"], artist_id)
+
+    if not metadata or not isinstance(metadata, tuple) or len(metadata) < 4:
+        logger.error(f"Invalid metadata for artist {artist['name']}: {metadata}")
+        return None
+    logger.debug("fetch_artist_metadata returned: %s", metadata)
+
+    try:
+        musicbrainz_data, discogs_data, song_details, album_count = metadata
+        members_count, debut_year = discogs_data
+        
+        # Unpack song details
+        most_popular_song = most_popular_song_id = None
+        if song_details and isinstance(song_details, tuple):
+            most_popular_song, most_popular_song_id = song_details[0], song_details[1]
+            logger.debug(f"Song details unpacked: {most_popular_song} (ID: {most_popular_song_id})")    
+        else:
+            logger.warning(f"Invalid song details for artist {artist['name']}: {song_details}")
+    
+    except ValueError as e:
+        logger.error(f"Error unpacking metadata for artist {artist['name']}: {e}")
+        return None
+    
+    birth_year = await process_artist_years(musicbrainz_data) 
+    logger.debug(f"birth_year: {birth_year}")
+
+    most_popular_track_uri = f"spotify:track:{most_popular_song_id}" if most_popular_song_id else None
+    
+    return {
+        **spotify_artist_fields(artist),
+        "debut_year": debut_year,
+        "birth_year": birth_year,
+        "num_albums": album_count,
+        "members": members_count,
+        "country": musicbrainz_data.get("country") if musicbrainz_data else None,
+        "gender": musicbrainz_data.get("gender") if musicbrainz_data else None,
+        "most_popular_song": most_popular_song,
+        "most_popular_song_id": most_popular_song_id,
+        "most_popular_track_uri": most_popular_track_uri,
+        "enriched_at": timezone.now(),
+    }
            
 @SpotifyBackoffHandler.get_backoff_decorator()
-async def process_top_artists(sp, user):
+async def process_top_artists(sp, user, planner: Optional[SpotifyCallPlanner] = None,
+                              progress: Optional[IngestionProgress] = None) -> UpsertResult:
+    """Refresh the shared artist catalog and the user's ranking of it.
+    
+    Work is ordered so the cheapest playable data lands first:
+    
+    1. Spotify's own fields and the user's ranking, with no extra requests.
+    2. Attributes for Artist Guess (MusicBrainz, Discogs, Spotify), only for
+       artists the catalog has never enriched or enriched longer ago than
+       ``settings.ARTIST_CATALOG_MAX_AGE``.
+    3. Wikipedia biographies for Trivia, the slowest lookups, for those
+       artists and any catalog artist still missing one.
+    
+    Steps 2 and 3 are written in batches of ``INGESTION_WRITE_BATCH_SIZE``.
+    """
     try:
         top_artists = await safe_spotify_request(
             sp.current_user_top_artists,
@@ -461,130 +658,113 @@ async def process_top_artists(sp, user):
         
         if not top_artists or "items" not in top_artists:
             logger.error("No top artists data received")
-            return
+            return UpsertResult()
+        
+        # Top artists come back as full objects, so share them with the
+        # track pipeline instead of looking them up again.
+        if planner:
+            planner.prime('artists', top_artists["items"])
         
+        artist_ids = [artist["id"] for artist in top_artists["items"]]
+        stale_ids = await get_stale_artist_ids(artist_ids)
+        logger.info(
+            f"{len(stale_ids)} of {len(top_artists['items'])} top artists need enrichment "
+            f"for user {user.id}"
+        )
+        
+        await bulk_upsert_artists([spotify_artist_fields(artist) for artist in top_artists["items"]])
+        result = await rank_user_artists(user, artist_ids)
+        if progress:
+            await progress.set_total('artists', len(top_artists["items"]))
+            await progress.advance('artists', len(top_artists["items"]) - len(stale_ids))
+            await progress.refresh_readiness(user)
+        
+        batch_size = getattr(settings, 'INGESTION_WRITE_BATCH_SIZE', 10)
+        enriched_rows = []
         for artist in top_artists["items"]:
+            if artist["id"] not in stale_ids:
+                continue
             try:
-                artist_id = artist["id"]
-                logger.debug(f"Processing artist: {artist_id}")
-                
-                metadata = await fetch_artist_metadata(sp, artist["name"], artist_id)
-
-                if not metadata or not isinstance(metadata, tuple) or len(metadata) < 4:
-                        logger.error(f"Invalid metadata for artist {artist['name']}: {metadata}")
-                        continue
-                logger.debug(f"fetch_artist_metadata returned: {metadata}")
-
-                
-                try:
-                    musicbrainz_data, discogs_data, song_details, album_count = metadata
-                    
-                    # if not isinstance(discogs_data, (tuple, list)) or len(discogs_data) != 2:
-                    #     raise ValueError(f"Invalid discogs_data: {discogs_data}")
-                    # logger.debug(f"fetch returned:{musicbrainz_data}|| {discogs_data}|| {most_popular_song}|| {album_count}")
-                    
-                    members_count, debut_year = discogs_data
-                    
-                     # Initialize song variables with defaults
-                    most_popular_song = None
-                    most_popular_song_id = None
-
-                     # Unpack song details
-                    if song_details and isinstance(song_details, tuple):
-                        most_popular_song = song_details[0]
-                        most_popular_song_id = song_details[1]
-                        
-                        logger.debug(f"Song details unpacked: {most_popular_song} (ID: {most_popular_song_id})")    
-                    else:
-                        logger.warning(f"Invalid song details for artist {artist['name']: {song_details}}")
-                        most_popular_song = most_popular_song_id = None
-                    
-                    logger.debug(f"fetch returned: musicbrainz={musicbrainz_data}, discogs={discogs_data}, song={most_popular_song}, albums={album_count}")                   
-                
-                except ValueError as e:
-                    logger.error(f"Error unpacking metadata for artist {artist['name']}: {e}")
-                    continue
-                
-                birth_year = await process_artist_years(musicbrainz_data) 
-                logger.debug(f"birth_year: {birth_year}")
-                
-                try:
-                    biography = await get_artist_bio(artist["name"])
-                    logger.debug(f"biography type:{type(biography)}")
-                    logger.debug(f"Biography fetched: {biography}")
-                except Exception as e:
-                    logger.error(f"Error getting biography for {artist['name']}: {e}")
-                    biography = None
-
-                most_popular_track_uri = f"spotify:track:{most_popular_song_id}" if most_popular_song_id else None
-                
-                artist_data = {
-                    'spotify_id': artist_id,
-                    'user': user,
-                    'defaults': {
-                        "name": artist["name"],
-                        "popularity": artist["popularity"],
-                        "genres": ", ".join(artist["genres"]),
-                        "followers": artist["followers"]["total"],
-                        "debut_year": debut_year,
-                        "birth_year": birth_year,
-                        "num_albums": album_count,
-                        "members": members_count,
-                        "country": musicbrainz_data.get("country") if musicbrainz_data else None,
-                        "gender": musicbrainz_data.get("gender") if musicbrainz_data else None,
-                        "most_popular_song": most_popular_song,
-                        "most_popular_song_id": most_popular_song_id,
-                        "most_popular_track_uri": most_popular_track_uri,
-                        "biography":biography,
-                        "image_url": (
-                        artist.get("images", [{}])[1].get("url") 
-                        if artist.get("images") 
-                        else None
-                    )   
-                    }
-                }
-                try:
-                    logger.debug(f"Before create_or_update_artist call for {artist_id}")
-                    logger.debug(f"Type of create_or_update_artist: {type(create_or_update_artist)}")
-                    
-                    
-                    await create_or_update_artist(artist_data)
-                    
-                except Exception as e:
-                    logger.error(
-                        f"Database error for artist {artist_id}: {str(e)}",
-                        exc_info=True,
-                        stack_info=True
-                    )
-                    continue
-                
+                row = await build_artist_row(sp, artist)
             except Exception as e:
                 logger.error(f"Error updating artist {artist.get('id', 'unknown')}: {e}")
+                row = None
+            if row:
+                # Unenriched artists keep their Spotify fields and are retried next run
+                enriched_rows.append(row)
+            if progress:
+                await progress.advance('artists')
+            if len(enriched_rows) >= batch_size:
+                await bulk_upsert_artists(enriched_rows)
+                enriched_rows = []
+                if progress:
+                    await progress.refresh_readiness(user)
+        if enriched_rows:
+            await bulk_upsert_artists(enriched_rows)
+            if progress:
+                await progress.refresh_readiness(user)
+        
+        biography_ids = stale_ids | await get_artists_missing_biography(artist_ids)
+        biography_rows = []
+        for artist in top_artists["items"]:
+            if artist["id"] not in biography_ids:
+                continue
+            try:
+                biography = await get_artist_bio(artist["name"])
+            except Exception as e:
+                logger.error(f"Error getting biography for {artist['name']}: {e}")
                 continue
+            if biography:
+                biography_rows.append({
+                    "spotify_id": artist["id"], "biography": biography,
+                    "has_biography": has_biography(biography),
+                })
+            if len(biography_rows) >= batch_size:
+                await update_artists(biography_rows)
+                biography_rows = []
+                if progress:
+                    await progress.refresh_readiness(user)
+        if biography_rows:
+            await update_artists(biography_rows)
+            if progress:
+                await progress.refresh_readiness(user)
+        
+        return result
                 
     except Exception as e:
         logger.error(f"Error processing top artists: {e}", exc_info=True)
         raise
     
 async def fetch_discogs_data(url: str, headers: Dict, params: Optional[Dict] = None) -> Optional[Dict]:
-    """Async helper function to fetch data from Discogs API with SSL verification."""
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-    conn = aiohttp.TCPConnector(ssl=ssl_context)
-    
-    async with aiohttp.ClientSession(connector=conn) as session:
-        try:
-            async with session.get(url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    return await response.json()
-                logger.error(f"Error fetching data from {url}: {response.status}")
-                return None
-        except Exception as e:
-            logger.error(f"Request error for {url}: {e}")
-            return None
+    """Async helper function to fetch data from Discogs API over the pooled session."""
+    try:
+        response = await provider_clients.get('discogs', url, headers=headers, params=params)
+        if response.status == 200:
+            return response.json()
+        logger.error(f"Error fetching data from {url}: {response.status}")
+        return None
+    except Exception as e:
+        logger.error(f"Request error for {url}: {e}")
+        return None
+
+async def fetch_discogs_debut_year(releases_url: str, headers: Dict) -> Optional[int]:
+    """Year of the artist's earliest release on Discogs."""
+    releases_data = await fetch_discogs_data(
+        releases_url,
+        headers,
+        params={"sort": "year", "sort_order": "asc"}
+    )
+    if releases_data and releases_data.get("releases"):
+        return releases_data["releases"][0].get("year")
+    return None
 
 @backoff.on_exception(backoff.expo, Exception, max_tries=3)
 async def get_artist_info(artist_name: str) -> Tuple[Optional[int], Optional[str]]:
-    """Async function to fetch artist members count and debut year."""
+    """Async function to fetch artist members count and debut year.
+    
+    Artists in the local index skip the search and artist lookups; only a
+    missing debut year is still fetched from the artist's releases.
+    """
     BASE_URL = "https://api.discogs.com/"
     headers = {
         "Authorization": f"Discogs token={settings.DISCOGS_TOKEN}",
@@ -592,6 +772,14 @@ async def get_artist_info(artist_name: str) -> Tuple[Optional[int], Optional[str
     }
     
     try:
+        local = await find_local_artist(artist_name, LocalArtistMetadata.DISCOGS)
+        if local and local.debut_year:
+            logger.debug(f"Discogs data for {artist_name} found in the local index")
+            return local.members_count or 0, local.debut_year
+        if local:
+            debut_year = await fetch_discogs_debut_year(f"{BASE_URL}artists/{local.source_id}/releases", headers)
+            return local.members_count or 0, debut_year
+        
         search_data = await fetch_discogs_data(
             f"{BASE_URL}database/search",
             headers=headers,
@@ -619,16 +807,7 @@ async def get_artist_info(artist_name: str) -> Tuple[Optional[int], Optional[str
             return 0, None
             
         member_count = len(artist_data.get("members", []))
-        
-        releases_data = await fetch_discogs_data(
-            artist_data.get("releases_url"),
-            headers,
-            params={"sort": "year", "sort_order": "asc"}
-        )
-        
-        debut_year = None
-        if releases_data and releases_data.get("releases"):
-            debut_year = releases_data["releases"][0].get("year")
+        debut_year = await fetch_discogs_debut_year(artist_data.get("releases_url"), headers)
             
         return member_count, debut_year
         
@@ -641,38 +820,6 @@ def convert_ms_to_seconds(ms: int) -> float:
         raise ValueError("Duration must be a number")
     return round(float(ms)/1000, 2)
 
-def rate_limit_handler() -> Callable:
-    """Decorator to handle rate limiting for Discogs API."""
-    def decorator(func: Callable) -> Callable:
-        last_request_time = 0
-        min_request_interval = 1.0  # 1 second between requests
-        
-        @wraps(func)
-        async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            nonlocal last_request_time
-            
-            # Check if we need to wait
-            now = time.time()
-            time_since_last = now - last_request_time
-            if time_since_last < min_request_interval:
-                await asyncio.sleep(min_request_interval - time_since_last)
-            
-            try:
-                response = await func(*args, **kwargs)
-                last_request_time = time.time()
-                return response
-                
-            except Exception as e:
-                if '429' in str(e):
-                    retry_after = int(e.response.headers.get('Retry-After', 10))
-                    logger.warning(f"Rate limited. Waiting {retry_after} seconds")
-                    await asyncio.sleep(retry_after)
-                    return await wrapper(*args, **kwargs)
-                raise
-                
-        return wrapper
-    return decorator
-
 async def get_artist_bio(artist_name: str) -> str:
     service = ArtistDetailsService()
     biography = await service.get_artist_details(artist_name)
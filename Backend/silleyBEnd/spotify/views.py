@@ -3,7 +3,8 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 import asyncio
 import logging
 from datetime import datetime, timedelta
@@ -14,8 +15,9 @@ import requests
 from aiohttp import ClientTimeout, TCPConnector, ClientSession
 from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core import signing
 from django.core.cache import cache
-from django.http import JsonResponse,HttpResponse, HttpResponseRedirect
+from django.http import JsonResponse,HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from rest_framework_simplejwt.settings import api_settings as SIMPLE_JWT
 from django.urls import NoReverseMatch, reverse
 from django.shortcuts import redirect, render
@@ -26,10 +28,11 @@ from spotipy import Spotify, SpotifyException, SpotifyOAuth
 
 from .constants import SCOPE
 from .models import (MostListenedAlbum, MostListenedArtist, MostListenedSongs,
-                     User, SpotifyToken, SpotifyPlaybackToken)
-from .utils import (authenticate_user, create_or_update_user, error_response,
-                    process_top_artists, process_top_tracks)
+                     User)
+from .utils import authenticate_user, create_or_update_user, error_response
 from .exceptions import SpotifyException
+from .ingestion import enqueue_ingestion, job_status, latest_job_status
+from .token_service import PLAYBACK, TokenRefreshError, token_service
 import json
 from django.views.generic import View
 
@@ -85,14 +88,6 @@ class SpotifyCallbackView(View):
         return create_user_with_retry()
     
     async def handle_authentication(self, request, code: str) -> Optional[Dict]:
-        timeout = ClientTimeout(total=60, connect=20, sock_read=20)
-        connector = TCPConnector(
-            limit=10,
-            force_close=True,
-            enable_cleanup_closed=True,
-            ssl=False
-        )
-        
         @backoff.on_exception(
             backoff.expo,
             (SpotifyException, aiohttp.ClientError),
@@ -102,17 +97,13 @@ class SpotifyCallbackView(View):
 
         async def authenticate(code: str) -> Optional[Dict]:
             try:
-                async with aiohttp.ClientSession(
-                    timeout=timeout,
-                    connector=connector
-                ) as session:
-                    token_info = await self.get_token_info(request, code)
-                    if not token_info:
-                        raise SpotifyException(
-                            msg="Failed to get token info",
-                            code = 401
-                        )
-                    return token_info
+                token_info = await self.get_token_info(request, code)
+                if not token_info:
+                    raise SpotifyException(
+                        msg="Failed to get token info",
+                        code = 401
+                    )
+                return token_info
             except Exception as e:
                 logger.error(f"Authentication error: {e}")
                 raise SpotifyException(
@@ -126,74 +117,6 @@ class SpotifyCallbackView(View):
             logger.error(f"Authentication failed: {e}")
             return None
         
-    async def process_user_data(self, token_info: Dict, user: User) -> None:
-        timeout = ClientTimeout(total=60, connect=20, sock_read=20)
-        connector = aiohttp.TCPConnector(limit=10, force_close=True)
-        
-        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-            sp = Spotify(auth=token_info["access_token"], requests_timeout=60)
-            
-            tasks = [
-                process_top_tracks(sp, user),
-                process_top_artists(sp, user)
-            ]
-            
-            await asyncio.gather(*tasks)
-    
-    async def process_user_data_and_redirect(self, token_info, user):
-        logger.info(f"Starting process_user_data_and_redirect for user {user.id}")
-        cache_key = f"spotify_processing_{user.id}"
-        
-        try:
-            last_updated = await sync_to_async(lambda: user.last_updated)()
-            logger.info(f"User {user.id} last updated: {last_updated}")
-            if last_updated and not timezone.is_aware(last_updated):
-                last_updated = timezone.make_aware(last_updated)
-            
-            one_week_ago = timezone.now() - timedelta(weeks=1)
-            
-            # Check if data is fresh
-            if last_updated and last_updated > one_week_ago:
-                logger.info(f"User {user.id} data is fresh, skipping processing.")
-                
-                # =======================================================
-                # THE FIX IS HERE: Only save if the flag needs changing
-                # =======================================================
-                if not user.is_data_processed:
-                    user.is_data_processed = True
-                    await sync_to_async(user.save)()
-                
-                # Set cache to complete immediately
-                cache.set(cache_key, {
-                    'status': 'complete',
-                    'redirect_url': 'http://localhost:5173/games/dashboard',
-                }, timeout=3600)
-                logger.info(f"Cache set to complete for user {user.id} (skipped processing).")
-                return
-
-            # If data is old or doesn't exist, process it
-            logger.info(f"User {user.id} data is old or missing, starting processing...")
-            cache.set(cache_key, {'status': 'processing'}, timeout=3600)
-            
-            # Process the data
-            await self.process_user_data(token_info, user)
-            
-            # Update user status after successful processing
-            user.is_data_processed = True
-            user.last_updated = timezone.now() # This explicitly sets the new timestamp
-            await sync_to_async(user.save)()
-            
-            # Update cache with completion status
-            cache.set(cache_key, {
-                'status': 'complete',
-                'redirect_url': 'http://localhost:5173/games/dashboard',
-            }, timeout=3600)
-            logger.info(f"Data processing completed for user {user.id}")
-            
-        except Exception as e:
-            logger.error(f"Error processing user data: {e}", exc_info=True)
-            cache.set(cache_key, {'status': 'error', 'error': str(e)}, timeout=3600)
-            raise
     async def get(self, request):
         try:
             # Extract code from query parameters
@@ -222,14 +145,7 @@ class SpotifyCallbackView(View):
                 )
             
             # Store token for games app
-            await sync_to_async(SpotifyToken.objects.update_or_create)(
-                user=user,
-                defaults={
-                    'access_token': token_info['access_token'],
-                    'refresh_token': token_info.get('refresh_token'),
-                    'expires_at': timezone.now() + timedelta(seconds=token_info['expires_in'])
-                }
-            )
+            await sync_to_async(token_service.store)(user.id, token_info)
             
             # Generate JWT token for API authentication
             refresh = await sync_to_async(RefreshToken.for_user)(user)
@@ -247,9 +163,9 @@ class SpotifyCallbackView(View):
             logger.debug(f"Redirecting to frontend: {frontend_url}")
             logger.debug(f"Settings tokens: {tokens}")
             
-            # Start data processing task
-            task = asyncio.create_task(self.process_user_data_and_redirect(token_info, user))
-            logger.debug(f"Data processing task created for user {user.id}")
+            # Queue data processing for the ingestion worker
+            job = await sync_to_async(enqueue_ingestion)(user)
+            logger.debug(f"Ingestion job {job.id} queued for user {user.id}")
             
             return HttpResponseRedirect(frontend_url)
         
@@ -268,35 +184,114 @@ class TokenVerifyView(APIView):
             logger.debug(f"Verify request received. User: {request.user.id if request.user else 'None'}")
             logger.debug(f"Authorization header: {request.headers.get('Authorization', 'None')}")
             # This checks Spotify token validity
-            spotify_token = SpotifyToken.objects.get(user=request.user)
-            if spotify_token.is_expired():
-                logger.debug("Spotify token is expired")
-                return Response(
-                    {"error": "Token expired"},
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
+            spotify_token = token_service.get(request.user.id)
+            if spotify_token is None:
+                logger.debug("No Spotify token found for user")
+                return Response({
+                    "valid": True,
+                    "spotify_valid": False,
+                    "message": "No spotify token found"
+                },
+                status = status.HTTP_206_PARTIAL_CONTENT)
             response_data = {
                 "valid": True,
                 "spotify_valid": True,
                 "jwt_exp": request.auth.payload['exp'],
-                "spotify_exp": spotify_token.expires_at.timestamp()
+                "spotify_exp": spotify_token.expires_at
             }
             logger.debug(f"Verify successful: {response_data}")
             return Response(response_data)
             
-        except SpotifyToken.DoesNotExist:
-            logger.debug("No Spotify token found for user")
-            return Response({
-                "valid": True,
-                "spotify_valid": False,
-                "message": "No spotify token found"
-            },
-            status = status.HTTP_206_PARTIAL_CONTENT)
+        except TokenRefreshError:
+            logger.debug("Spotify token is expired")
+            return Response(
+                {"error": "Token expired"},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
         except Exception as e:
             logger.error(f"Verify error: {str(e)}")
             return Response({
                 "error": str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+STREAM_TICKET_SALT = 'spotify.processing-stream'
+
+
+class ProcessingStreamTicketView(APIView):
+    """Issue a short-lived ticket that only opens the progress stream.
+    
+    EventSource cannot set headers, so the ticket goes in the stream URL
+    instead of the access token, which would end up in access logs and
+    browser history.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        return Response({'ticket': signing.dumps(request.user.id, salt=STREAM_TICKET_SALT)})
+
+
+class ProcessingStreamView(View):
+    """Server-sent events with ingestion progress for the loading screen.
+    
+    Authenticated by a ``?ticket=`` from ``ProcessingStreamTicketView``
+    or a bearer access token header. The latest job is checked server-side
+    every ``PROGRESS_STREAM_INTERVAL`` seconds and an event is only sent
+    when its status or progress changed. The stream ends on complete or error.
+    """
+    HEARTBEAT_SECONDS = 15
+    MAX_STREAM_SECONDS = 600  # EventSource reconnects on its own after this
+    
+    def authenticate(self, request) -> Optional[int]:
+        ticket = request.GET.get('ticket')
+        if ticket:
+            try:
+                return signing.loads(
+                    ticket, salt=STREAM_TICKET_SALT,
+                    max_age=getattr(settings, 'PROGRESS_STREAM_TICKET_AGE', 60),
+                )
+            except signing.BadSignature as e:
+                logger.debug(f"Rejected progress stream ticket: {e}")
+                return None
+        
+        raw_token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not raw_token:
+            return None
+        try:
+            return AccessToken(raw_token)[SIMPLE_JWT.USER_ID_CLAIM]
+        except TokenError as e:
+            logger.debug(f"Rejected progress stream token: {e}")
+            return None
+    
+    async def get(self, request):
+        user_id = self.authenticate(request)
+        if user_id is None:
+            return JsonResponse(
+                {"error": "Authentication failed"},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        response = StreamingHttpResponse(self.events(user_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+        return response
+    
+    async def events(self, user_id: int):
+        interval = getattr(settings, 'PROGRESS_STREAM_INTERVAL', 1)
+        loop = asyncio.get_running_loop()
+        started = last_sent = loop.time()
+        last_payload = None
+        
+        while loop.time() - started < self.MAX_STREAM_SECONDS:
+            payload = await sync_to_async(latest_job_status)(user_id)
+            if payload != last_payload:
+                yield f"data: {json.dumps(payload)}\n\n"
+                last_payload, last_sent = payload, loop.time()
+                if payload['status'] in ('complete', 'error'):
+                    return
+            elif loop.time() - last_sent >= self.HEARTBEAT_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = loop.time()
+            await asyncio.sleep(interval)
+    
 class ProcessingStatusView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -304,26 +299,9 @@ class ProcessingStatusView(APIView):
         try:
             logger.debug(f"Processing status check for user {request.user.id}")
             logger.debug(f"Authorization header: {request.headers.get('Authorization')}")
-            user = request.user
-            cache_key = f"spotify_processing_{user.id}"
-            status_data = cache.get(cache_key)
+            status_data = job_status(request.user)
             
-            if not status_data:
-                return Response({
-                    'status': 'processing'
-                })
-
-            logger.debug(f"Cache data found: {status_data}")
-            
-            # If we have a redirect URL, ensure it's absolute
-            if status_data.get('redirect_url'):
-                try:
-                    status_data['redirect_url'] = 'http://localhost:5173/games/dashboard'
-                except NoReverseMatch:
-                    # Fallback to hardcoded URL if reverse fails
-                    status_data['redirect_url'] = 'http://localhost:5173/games/dashboard'
-            
-            logger.debug(f"Returning status data: {status_data}")
+            logger.debug("Returning status data: %s", status_data)
             return Response(status_data)
             
         except Exception as e:
@@ -339,55 +317,22 @@ class ProcessingStatusView(APIView):
 class PlaybackTokenView(APIView):
     """
     APIView to retrieve a fresh Spotify access token for playback.
+    Served from the token service's caches and refreshed single-flight.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         try:
-            logger.debug(f"SPOTIFY_AUTH_HEADER: Basic {settings.SPOTIFY_AUTH_HEADER}")
-            # Add temporary debug logging
-            logger.debug(f"Client ID length: {len(settings.EGWU_CLIENT_ID)}")
-            logger.debug(f"Client Secret length: {len(settings.EGWU_CLIENT_SECRET)}")
-            # Check for existing valid playback token
-            playback_token = SpotifyPlaybackToken.objects.filter(
-                user=request.user,
-                expires_at__gt=timezone.now()
-            ).first()
-            
-            if playback_token:
-                return Response({'access_token': playback_token.access_token})
-            
-            auth_response = requests.post(
-                'https://accounts.spotify.com/api/token',
-                data={
-                    'grant_type': 'refresh_token',
-                    'refresh_token': request.user.spotify_token.refresh_token,
-                    'scope': 'streaming user-read-playback-state user-modify-playback-state'
-                },
-                headers={
-                    'Authorization': f'Basic {settings.SPOTIFY_AUTH_HEADER}'
-                }
-            )
-            
-            if auth_response.status_code != 200:
-                logger.error(f"Spotify token refresh failed: {auth_response.text}")
-                return Response(
-                    {'error': 'Failed to obtain playback token'},
-                    status=400
-                )
-                
-            token_data = auth_response.json()
-            
-            SpotifyPlaybackToken.objects.filter(user=request.user).delete()
-            
-            SpotifyPlaybackToken.objects.create(
-                user=request.user,
-                access_token=token_data['access_token'],
-                expires_at=timezone.now() + timedelta(seconds=token_data['expires_in'])
+            playback_token = token_service.get(request.user.id, PLAYBACK)
+            return Response({'access_token': playback_token.access_token})
+
+        except TokenRefreshError as e:
+            logger.error(f"Spotify playback token refresh failed: {e}")
+            return Response(
+                {'error': 'Failed to obtain playback token'},
+                status=400
             )
-            
-            return Response({'access_token': token_data['access_token']})
-        
+
         except requests.RequestException as e:
             logger.error(f"Network error during token refresh: {str(e)}")
             return Response(
@@ -7,6 +7,11 @@ class SpotifyGamesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'spotify_games'
 
+    def ready(self):
+        from spotify.ingestion import ingestion_completed
+        from .services.pregeneration import on_ingestion_completed
+        ingestion_completed.connect(on_ingestion_completed, dispatch_uid='spotify_games.pregeneration')
+
     # def ready(self):
     #     """Verify template directory structure on app startup"""
     #     required_dirs = [
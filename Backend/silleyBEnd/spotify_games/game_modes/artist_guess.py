@@ -1,5 +1,5 @@
 from .base import BaseGame
-from spotify.models import MostListenedSongs, MostListenedArtist
+from spotify.models import Artist, MostListenedSongs
 from difflib import SequenceMatcher
 from datetime import datetime
 from django.db.models import Q
@@ -48,9 +48,10 @@ class ArtistGuessGame(BaseGame):
         if cached_game:
             return cached_game
         
-        artist = self.get_random_artists(1)[0] # Uses base class method
-        if not artist:
+        artists = self.get_candidates(1, 'guess_artist')
+        if not artists:
             raise GameInitializationError("No valid artists found")
+        artist = artists[0]
         
         processed_artist = self._process_artist_data(artist)
         
@@ -83,8 +84,8 @@ class ArtistGuessGame(BaseGame):
             
         """
         logger.debug(f"Attempting to validate guess: {guess_artist_name}")
-        available_artists = MostListenedArtist.objects.filter(
-            user=self.session.user
+        available_artists = Artist.objects.filter(
+            listeners__user=self.session.user
         ).values_list('name', flat=True)
         logger.debug(f"Available artists: {list(available_artists)}")
         
@@ -97,12 +98,12 @@ class ArtistGuessGame(BaseGame):
         
         cached_target = self.cache_service.get_artist_data(target_artist_id)
         if not cached_target:
-            target_artist = MostListenedArtist.objects.get(spotify_id=target_artist_id)
+            target_artist = Artist.objects.get(spotify_id=target_artist_id)
             cached_target = self._process_artist_data(target_artist)
             self.cache_service.cache_artist_data(target_artist_id, cached_target)
             
-        guess_artist = MostListenedArtist.objects.filter(
-            user=self.session.user,
+        guess_artist = Artist.objects.filter(
+            listeners__user=self.session.user,
             name__iexact= guess_artist_name
         ).first()
         
@@ -202,8 +203,8 @@ class ArtistGuessGame(BaseGame):
         Args:
             query(str): Search query string
         """
-        return MostListenedArtist.objects.filter(
-            user=self.session.user,
+        return Artist.objects.filter(
+            listeners__user=self.session.user,
             name__icontains=query,
         ).values('name', 'image_url')[:10] # Limit to 10 results
     def _compare_years(self, guess, actual):
@@ -251,7 +252,7 @@ class ArtistGuessGame(BaseGame):
         artist_id = self.state.current_state.get('game_data', {}).get('artist_id') or self.state.current_state.get('artist_id')
         if not artist_id:
             raise GameError("Artist ID not found in game state")
-        artist = MostListenedArtist.objects.filter(spotify_id=artist_id).first()
+        artist = Artist.objects.filter(spotify_id=artist_id).first()
         if not artist:
             raise GameError("Artist not found in database")
         return self._process_artist_data(artist)
@@ -2,16 +2,28 @@
 
 from abc import ABC, abstractmethod
 from ..models import GameSession, GamePlayback, GameState, GameStatistics, GameLeaderboard
-from spotify.models import MostListenedSongs, MostListenedArtist
+from spotify.candidate_pools import sample_candidates
 import random   
 from ..exceptions import *
 import logging
 from ..services.cache_service import GameCacheService
+from ..services import pregeneration
 from django.utils import timezone
 from ..monitoring import *
 
 logger = logging.getLogger('spotify_games')
 
+def song_fields(song) -> dict:
+    """The parts of a song stored with pre-generated content."""
+    return {
+        'spotify_id': song.spotify_id,
+        'name': song.name,
+        'artist': song.artist,
+        'image_url': song.image_url,
+        'track_uri': song.track_uri,
+    }
+
+
 class BaseGame(ABC):
     def __init__(self, session: GameSession):
         self.session = session
@@ -90,17 +102,13 @@ class BaseGame(ABC):
             spotify_uri = spotify_uri 
         )
         
-    def get_random_songs(self, count=1):
-        songs = MostListenedSongs.objects.filter(
-            user = self.session.user
-        ).order_by('?')[:count]
-        return list(songs)
-    
-    def get_random_artists(self, count=1):
-        artists = MostListenedArtist.objects.filter(
-            user=self.session.user
-        ).order_by('?')[:count]
-        return list(artists)
+    def get_candidates(self, count=1, game_mode=None):
+        """Random songs or artists from the user's precomputed pool for ``game_mode``.
+
+        Defaults to the session's game type; recently served items are skipped
+        while the pool allows it.
+        """
+        return sample_candidates(self.session.user, game_mode or self.session.game_type, count)
     
     def restart_game(self):
         """
@@ -185,4 +193,22 @@ class BaseGame(ABC):
             logger.info(f"Statistics updated for user {self.session.user.id}")
 
         except Exception as e:
-            logger.error(f"Failed to update statistics for user {self.session.user.id}: {str(e)}", exc_info=True)
\ No newline at end of file
+            logger.error(f"Failed to update statistics for user {self.session.user.id}: {str(e)}", exc_info=True)
+
+
+class GeneratedContentGame(BaseGame):
+    """A game whose AI-generated content is kept ready per user by ``pregeneration``."""
+    # Kind of content served from the pre-generation buffer
+    PREGENERATED_KIND: str
+    
+    @classmethod
+    @abstractmethod
+    def generate_content(cls, user) -> dict:
+        """Build the slow, AI-generated part of a game for ``user`` as JSON-serializable data."""
+    
+    def get_game_content(self) -> dict:
+        """Content from the user's pre-generated buffer, or generated now if it is empty."""
+        content = pregeneration.take(self.session.user, self.PREGENERATED_KIND)
+        if content is None:
+            content = self.generate_content(self.session.user)
+        return content
@@ -1,18 +1,31 @@
-from .base import BaseGame
+from .base import GeneratedContentGame, song_fields
 from ..services.ai_service import AIService
 from ..services.cache_service import GameCacheService
-from spotify.models import MostListenedSongs
+from spotify.candidate_pools import sample_candidates
 import random
 from ..exceptions import *
 import logging
 
 logger = logging.getLogger("spotify_games")
-class CrosswordGame(BaseGame):
+class CrosswordGame(GeneratedContentGame):
+    PREGENERATED_KIND = 'crossword'
+    
     def __init__(self, session):
         super().__init__(session)
-        self.ai_service = AIService()
         self.cache_service = GameCacheService()
         
+    @classmethod
+    def generate_content(cls, user):
+        """Pick a song with lyrics and generate its crossword puzzle using AI."""
+        songs = sample_candidates(user, 'crossword', 1)
+        if not songs:
+            raise GameInitializationError("No song with lyrics available")
+        song = songs[0]
+        puzzle_data = AIService().generate_crossword(song.lyrics, user_id=user.id)
+        if puzzle_data.get('error'):
+            raise GameInitializationError(f"Failed to generate crossword: {puzzle_data['error']}")
+        return {'song': song_fields(song), 'puzzle_data': puzzle_data}
+        
     def _initialize_game_impl(self):
         
         #check cache first
@@ -20,55 +33,36 @@ class CrosswordGame(BaseGame):
         if cached_game:
             return cached_game
         
-        song = self._get_valid_song(1)
-        if not song:
-                raise GameInitializationError("No song with lyrics available")           
-            
-        song = song[0]
+        content = self.get_game_content()
+        song = content['song']
         
         # Setup playback for the song
         self.setup_playback(
-            song.spotify_id,
-            song.name,
-            song.artist,
-            song.image_url,
-            song.track_uri
+            song['spotify_id'],
+            song['name'],
+            song['artist'],
+            song['image_url'],
+            song['track_uri']
         )
         
-        # Generate crossword puzzle using AI
-        puzzle_data = self.ai_service.generate_crossword(song.lyrics)
-        
-       
-        
         game_state = {
             'song_data': {
-                'name': song.name,
-                'artist': song.artist,
-                'album_image': song.image_url,
-                'spotify_id': song.spotify_id,
-                'preview_url': song.track_uri
+                'name': song['name'],
+                'artist': song['artist'],
+                'album_image': song['image_url'],
+                'spotify_id': song['spotify_id'],
+                'preview_url': song['track_uri']
             },
-            'puzzle_data': puzzle_data,
+            'puzzle_data': content['puzzle_data'],
             'solved_words': []
         }
         
-        logger.debug(f"Initial State: {game_state}")
+        logger.debug("Initial State: %s", game_state)
         
         # Cache the game
         self.cache_game('crossword', game_state)
             
         return game_state
-    
-    def _get_valid_song(self, count):
-        """Get a song with non-null, valid lyrics."""
-        songs = self.get_random_songs(count * 4)
-        # Use list comprehension with the correct if statement
-        valid_songs = [
-            song for song in songs
-            if song.lyrics is not None and song.lyrics not in ['', 'No lyrics available']
-        ]
-
-        return valid_songs[:count]
 
     def _validate_answer_impl(self, answer_data):
         """
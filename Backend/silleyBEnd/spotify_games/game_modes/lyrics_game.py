@@ -1,7 +1,8 @@
-from .base import BaseGame
+from .base import GeneratedContentGame, song_fields
 from ..services.ai_service import AIService
 from ..services.cache_service import GameCacheService
 from ..services.normalization_service import SemanticNormalizer
+from spotify.candidate_pools import sample_candidates
 import random
 from difflib import SequenceMatcher
 from datetime import timezone
@@ -11,6 +12,7 @@ import speech_recognition as sr
 from pydub import AudioSegment
 import io
 from ..exceptions import *
+from django.conf import settings
 import logging
 
 logger = logging.getLogger("spotify_games")
@@ -21,83 +23,84 @@ class SongData:
     track_uri: str
     image_url: str
     lyrics: str
-class LyricsGame(BaseGame):
+class LyricsGame(GeneratedContentGame):
     SIMILARITY_THRESHOLDS = {
         'text': 0.9,
         'voice': 0.75, # More lenient for voice input
     }
     
+    PREGENERATED_KIND = 'lyrics'
+    
     def __init__(self, session):
         super().__init__(session)
         self.input_type ='voice' if session.game_type == 'lyrics_voice' else 'text'
-        self.ai_service = AIService()
         self.cache_service = GameCacheService()
         self.normalizer = SemanticNormalizer()
         
-        
-    def _initialize_game_impl(self, input_type='text'):
-        """Initialize the game with multiple challenges from different songs."""
-        # Check cache first
-        cached_game = self.get_cached_game('lyrics_text')
-        if cached_game:
-            return cached_game
-        
-        # Get valid songs with non-null lyrics
-        songs = self._get_valid_songs(4) 
+    @classmethod
+    def generate_content(cls, user):
+        """Pick songs with enough lyrics and generate challenges from each of them."""
+        songs = sample_candidates(user, 'lyrics_text', 4)
         if not songs:
             raise GameInitializationError("Not enough songs with lyrics available")
         
-        # Randomly select initial song for playback
-        current_song = random.choice(songs)
-        
-        #Setup playback for current song
-        self.setup_playback(
-            current_song.spotify_id,
-            current_song.name,
-            current_song.artist,
-            current_song.image_url,
-            current_song.track_uri
-        )
-        
-        # Gnerate challenge from multiple songs
-        all_challenges = []
-        for song in songs:
-            try:
-                # Get 2-3 challenges per song
-                num_challenges = random.randint(2, 3)
-                
-                # Pass song data to the challenge generator
-                song_data_for_ai = {
+        # Generate 2-3 challenges per song, all songs at once
+        challenge_sets = AIService().generate_lyrics_challenge_sets(
+            [
+                (song.lyrics, random.randint(2, 3), {
                     "name": song.name,
                     "artist": song.artist,
                     "album_image": song.image_url,
                     "spotify_id": song.spotify_id,
                     "track_uri": song.track_uri,
-                }
-                
-                song_challenges = self.ai_service.generate_lyrics_challenges(
-                    song.lyrics,
-                    num_challenges,
-                    song_data_for_ai
-                )
-                
-                all_challenges.extend(song_challenges)
-                
-            except Exception as e:
-                logger.error(f"Error generating challenges for song {song.name}: {str(e)}")
-                continue
+                })
+                for song in songs
+            ],
+            deadline=settings.AI_GENERATION_DEADLINE,
+            user_id=user.id,
+        )
+        
+        # Songs whose generation failed or missed the deadline get basic challenges
+        all_challenges = []
+        for song, challenges in zip(songs, challenge_sets):
+            all_challenges.extend(challenges or cls._generate_fallback_challenges([song]))
             
         # Ensure we have enough challenges or fall back to basic generation
         if len(all_challenges) < 5:
             logger.warning("Not enough AI-generated challenges, falling back to basic generation")
-            all_challenges = self._generate_fallback_challenges(songs)
+            all_challenges = cls._generate_fallback_challenges(songs)
             
         # Shuffle challenges for variety
         random.shuffle(all_challenges)
-                
+        
+        return {
+            'songs': [song_fields(song) for song in songs],
+            'challenges': all_challenges,
+        }
+        
+    def _initialize_game_impl(self, input_type='text'):
+        """Initialize the game with multiple challenges from different songs."""
+        # Check cache first
+        cached_game = self.get_cached_game('lyrics_text')
+        if cached_game:
+            return cached_game
+        
+        content = self.get_game_content()
+        
+        # Randomly select initial song for playback
+        current_song = random.choice(content['songs'])
+        
+        #Setup playback for current song
+        self.setup_playback(
+            current_song['spotify_id'],
+            current_song['name'],
+            current_song['artist'],
+            current_song['image_url'],
+            current_song['track_uri']
+        )
         
         game_state = {
-            'challenge': all_challenges,
+            'challenge': content['challenges'],
             'current_challenge_index': 0,
             'input_type': input_type,
             'attempts': 0,
@@ -109,25 +112,8 @@ class LyricsGame(BaseGame):
         
         return game_state
     
-    def _get_valid_songs(self, count: int) -> List[SongData]:
-        """Get songs that have non-null lyrics."""
-        songs = self.get_random_songs(count * 2)
-        
-        def is_valid_lyrics(lyrics: str) -> bool:
-            return (lyrics and
-                    isinstance(lyrics, str) and
-                    lyrics.strip() not in ['', 'No lyrics available'] and
-                    len(lyrics.split()) >= 20
-                    ) # Ensure enough words for a challenge
-            
-        # Filter manually since it's a list, not a QuerySet
-        filtered_songs = [
-            song for song in songs 
-            if is_valid_lyrics(song.lyrics)
-        ]
-        
-        return filtered_songs[:count]
-    def _generate_lyrics_challenge(self, lyrics: str) -> Dict[str, str]:
+    @staticmethod
+    def _generate_lyrics_challenge(lyrics: str) -> Dict[str, str]:
         
         # First, normalize the lyrics to ensure consistent spacing
         normalized_lyrics = ' '.join(lyrics.split())
@@ -156,11 +142,12 @@ class LyricsGame(BaseGame):
             'word_count': chunk_size,
         }
         
-    def _generate_fallback_challenges(self, songs: List[SongData]) -> List[Dict[str, Any]]:
+    @classmethod
+    def _generate_fallback_challenges(cls, songs: List[SongData]) -> List[Dict[str, Any]]:
         """Generate basic challenges without AI in case of failure"""
         challenges = []
         for song in songs:
-            challenge = self._generate_lyrics_challenge(song.lyrics)
+            challenge = cls._generate_lyrics_challenge(song.lyrics)
             challenge["song_data"] = {
                 "name": song.name,
                 "artist": song.artist,
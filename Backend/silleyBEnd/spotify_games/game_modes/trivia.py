@@ -1,27 +1,46 @@
-from .base import BaseGame
+from .base import GeneratedContentGame
+from ..services import pregeneration
 from ..services.ai_service import AIService
 from ..services.cache_service import GameCacheService
-from ..models import GamePlayback
 import random
-from spotify.models import MostListenedSongs, MostListenedArtist
+import threading
+import time
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from spotify.candidate_pools import sample_candidates
 import logging
 from django.utils import timezone
-class GameInitializationError(Exception):
-    pass
-
-class GameError(Exception):
-    pass
+from ..exceptions import GameError, GameInitializationError
 
 logger = logging.getLogger("spotify_games")
-class TriviaGame(BaseGame):
+class TriviaGame(GeneratedContentGame):
+    PREGENERATED_KIND = 'trivia'
+    QUESTIONS_PER_GAME = 10
+    MIN_ARTISTS = 4
+    QIESTIONS_PER_ARTIST = 3
+    
     def __init__(self, session):
         super().__init__(session)
-        self.ai_service = AIService()
         self.cache_service = GameCacheService()
-        self.QUESTIONS_PER_GAME = 10
-        self.MIN_ARTISTS = 4
-        self.QIESTIONS_PER_ARTIST = 3
         
+    @classmethod
+    def generate_content(cls, user):
+        """Pick artists with a biography and generate a full set of questions about them."""
+        artists = sample_candidates(user, 'trivia', cls.MIN_ARTISTS)
+        if not artists:
+            raise GameInitializationError(
+                'Not enough artists with biography available. Try refreshing your music data.'
+            )
+            
+        questions = cls._generate_questions(artists, user.id)
+        if len(questions) < cls.QUESTIONS_PER_GAME:
+            raise GameInitializationError(
+                'Not enough valid questions generated. Please try again.'
+            )
+        return {
+            'artists': [{'name': artist.name, 'image_url': artist.image_url} for artist in artists],
+            'questions': questions,
+        }
         
     def _initialize_game_impl(self):
         """Initialize a new trivia game or retrieve cached game."""
@@ -31,62 +50,147 @@ class TriviaGame(BaseGame):
             return self._prepare_game_state(cached_game)
         
         try:
-            artists = self._get_valid_artists(self.MIN_ARTISTS)
-            if not artists:
-                raise GameInitializationError(
-                    'Not enough artists with biography available. Try refreshing your music data.'
-                )
-                
-            questions = self._generate_questions(artists)
-            if len(questions) < self.QUESTIONS_PER_GAME:
-                raise GameInitializationError(
-                    'Not enough valid questions generated. Please try again.'
-                )
+            content = self.get_game_content()
             
             original_state = {
-            'artists': [{'name': artist.name, 'image_url': artist.image_url} for artist in artists],
-            'questions': questions,
+            'artists': content['artists'],
+            'questions': content['questions'],
             'current_question': 0,
             'score': 0,
             'total_questions': self.QUESTIONS_PER_GAME,
-            'status': 'active'
+            'status': 'generating' if content.get('streaming') else 'active'
         }
             
             self.cache_service.cache_game_session(self.session.id,'trivia',{'full_state': original_state})
             
             frontend_state = self._prepare_game_state(original_state)
             
-            logger.debug(f"Game state returned: {frontend_state}")
+            logger.debug("Game state returned: %s", frontend_state)
             return frontend_state
         
         except Exception as e:
             logger.error(f"failed to Initialize trivia game: {str(e)}")
             raise GameInitializationError(str(e))
     
-    def _generate_questions(self, artists):
+    def get_game_content(self):
+        """Ready content if there is some, otherwise a game that starts while its questions stream in."""
+        content = pregeneration.take(self.session.user, self.PREGENERATED_KIND)
+        return content if content is not None else self._stream_content()
+    
+    def _stream_content(self):
+        """Start generating questions in the background and return once the first one is ready.
+        
+        Generation runs on the bounded pre-generation pool; later questions
+        are written to the ``trivia_stream`` cache entry as they arrive and
+        merged into the game by ``_with_streamed_questions``. Without pool
+        workers, or when the pool is too busy to produce a first question
+        within ``AI_GENERATION_DEADLINE``, the full set is generated inline.
+        """
+        artists = sample_candidates(self.session.user, 'trivia', self.MIN_ARTISTS)
+        if not artists:
+            raise GameInitializationError(
+                'Not enough artists with biography available. Try refreshing your music data.'
+            )
+        artists_data = self._artists_data(artists)
+        questions = []
+        first_ready = threading.Event()
+        
+        def publish(done):
+            self.cache_service.cache_game_session(
+                self.session.id, 'trivia_stream',
+                {'questions': questions[:self.QUESTIONS_PER_GAME], 'done': done, 'updated_at': time.time()}
+            )
+        
+        async def consume():
+            try:
+                async for question in AIService().astream_trivia_questions(
+                    artists_data, self.QUESTIONS_PER_GAME, self.session.user.id
+                ):
+                    questions.append(question)
+                    publish(False)
+                    first_ready.set()
+            except Exception as e:
+                logger.error(f"Streaming trivia questions failed: {str(e)}", exc_info=True)
+            finally:
+                publish(True)
+                first_ready.set()
+        
+        self._stream_future = pregeneration.pregenerator.submit(async_to_sync(consume))
+        if self._stream_future is None:
+            return self.generate_content(self.session.user)
+        if not first_ready.wait(settings.AI_GENERATION_DEADLINE):
+            # Still queued behind other generation work; don't start it late
+            self._stream_future.cancel()
+            if not questions:
+                logger.warning(f"Trivia stream for session {self.session.id} not started in time, generating inline")
+                return self.generate_content(self.session.user)
+        if not questions:
+            raise GameInitializationError('Not enough valid questions generated. Please try again.')
+        
+        return {
+            'artists': [{'name': artist.name, 'image_url': artist.image_url} for artist in artists],
+            'questions': questions[:1],
+            'streaming': True,
+        }
+    
+    def _with_streamed_questions(self, full_state):
+        """Add the questions generated since a streaming game started.
+        
+        A stream that is gone or has not produced anything for
+        ``AI_GENERATION_DEADLINE`` seconds (its worker was recycled, say)
+        counts as finished, so the game continues with what it has.
+        """
+        if full_state.get('status') != 'generating':
+            return full_state
+        streamed = self.cache_service.get_game_session(self.session.id, 'trivia_stream')
+        if streamed:
+            full_state = {**full_state, 'questions': streamed['questions']}
+        stale = not streamed or time.time() - streamed['updated_at'] > settings.AI_GENERATION_DEADLINE
+        if stale or streamed['done']:
+            full_state = {**full_state, 'status': 'active', 'total_questions': len(full_state['questions'])}
+        return full_state
+    
+    def _complete(self, score):
+        self.session.completed = True
+        self.session.end_time = timezone.now()
+        self.session.score = score
+        self.session.save()
+    
+    @staticmethod
+    def _question_count(full_state):
+        """Questions in the game, including those still being generated."""
+        if full_state.get('status') == 'generating':
+            return full_state['total_questions']
+        return len(full_state['questions'])
+    
+    @classmethod
+    def _artists_data(cls, artists):
+        return [
+            {
+                'name': artist.name,
+                'biography': artist.biography,
+                'genres': artist.genres or ['Unknown'],
+                'career_highlights': cls._get_career_highlights(artist)
+            }
+            for artist in artists
+        ]
+    
+    @classmethod
+    def _generate_questions(cls, artists, user_id=None):
         """Generate and validate questions for multiple artists using a single API call."""
         if not artists:
             return []
 
         try:
-            # Prepare data for all artists
-            all_artists_data = []
-            for artist in artists:
-                artist_data = {
-                    'name': artist.name,
-                    'biography': artist.biography,
-                    'genres': artist.genres or ['Unknown'],
-                    'career_highlights': self._get_career_highlights(artist)
-                }
-                all_artists_data.append(artist_data)
+            all_artists_data = cls._artists_data(artists)
             
             # Make a single API call for all questions
-            logger.info(f"Generating {self.QUESTIONS_PER_GAME} questions from {len(artists)} artists in a single batch.")
-            questions = self.ai_service.generate_trivia_questions(all_artists_data, self.QUESTIONS_PER_GAME)
+            logger.info(f"Generating {cls.QUESTIONS_PER_GAME} questions from {len(artists)} artists in a single batch.")
+            questions = AIService().generate_trivia_questions(all_artists_data, cls.QUESTIONS_PER_GAME, user_id=user_id)
             
-            if questions and len(questions) >= self.QUESTIONS_PER_GAME:
+            if questions and len(questions) >= cls.QUESTIONS_PER_GAME:
                 random.shuffle(questions)
-                return questions[:self.QUESTIONS_PER_GAME]
+                return questions[:cls.QUESTIONS_PER_GAME]
             
             return []
             
@@ -94,19 +198,8 @@ class TriviaGame(BaseGame):
             logger.warning(f"Failed to generate batch of questions: {str(e)}")
             return []
         
-    def _get_valid_artists(self, count):
-        """Get an artist with non-null, valid biography."""
-        artists = self.get_random_artists(count * 2) # This is a list
-        
-        # Filter out invalid biographies using list comprehension
-        valid_artists = [
-            artist for artist in artists
-            if artist.biography and artist.biography not in ['','No biography available','NULL']
-        ]
-        
-        return valid_artists[:count]
-        
-    def _get_career_highlights(self, artist):
+    @staticmethod
+    def _get_career_highlights(artist):
         return {
             'debut_year': artist.debut_year if artist.debut_year else 'Unknown',
             'most_popular_song': artist.most_popular_song if artist.most_popular_song else 'Unknown',
@@ -121,17 +214,18 @@ class TriviaGame(BaseGame):
         if not game_data.get('questions'):
             return None
        
-        current_q_index = state['current_question']
-        if current_q_index >= len(state['questions']):
+        game_data = self._with_streamed_questions(game_data)
+        current_q_index = game_data['current_question']
+        if current_q_index >= len(game_data['questions']):
             return None
 
-        current_q = state['questions'][current_q_index]
+        current_q = game_data['questions'][current_q_index]
         return {
             'question': current_q['question'],
             'options': current_q['options'],
-            'current_question': state['current_question'],
-            'total_questions': len(state['questions']),
-            'score': state['score'],
+            'current_question': game_data['current_question'],
+            'total_questions': self._question_count(game_data),
+            'score': game_data['score'],
             'completed': self.session.completed
         }
         
@@ -143,7 +237,7 @@ class TriviaGame(BaseGame):
             'trivia'
         )
         
-        logger.info(f"cached_state: {cached_data}")
+        logger.debug("cached_state: %s", cached_data)
         
         
         # if not cached_state or 'current_state' not in cached_state:
@@ -153,15 +247,18 @@ class TriviaGame(BaseGame):
         # current_state = cached_state.get('current_state', {})
         # logger.info(f"current_state cached: {current_state}")
         full_state = cached_data.get('full_state')
-        logger.info(f"full_state: {full_state}")
+        logger.debug("full_state: %s", full_state)
         
         if not full_state or 'questions' not in full_state:
             logger.error("Missing questions in game state")
             raise GameError("Invalid game state structure")
 
+        full_state = self._with_streamed_questions(full_state)
         current_index = full_state.get('current_question', 0)
-        if current_index >= len(full_state['questions']):
+        if current_index >= self._question_count(full_state):
             raise GameError("All questions already answered")
+        if current_index >= len(full_state['questions']):
+            raise GameError("The next question is still being generated")
 
         current_q = full_state['questions'][current_index]
         submitted_answer = answer_data.get('answer', '').strip()
@@ -180,11 +277,8 @@ class TriviaGame(BaseGame):
         }
 
         # Check if game is completed
-        if new_state['current_question'] >= len(full_state['questions']):
-            self.session.completed = True
-            self.session.end_time = timezone.now()
-            self.session.score = new_state['score']
-            self.session.save()
+        if new_state['current_question'] >= self._question_count(full_state):
+            self._complete(new_state['score'])
 
         # Cache the updated state
         self.cache_service.cache_game_session(
@@ -198,18 +292,21 @@ class TriviaGame(BaseGame):
         
         # Prepare the data for the next question, if it exists
         next_question_data = {}
-        if not self.session.completed:
+        if not self.session.completed and next_question_index < len(full_state['questions']):
             next_q = full_state['questions'][next_question_index]
             next_question_data = {
                 'question': next_q.get('question'),
                 'options': next_q.get('options', []),
             }
+        elif not self.session.completed:
+            # Still streaming; the client fetches the question once it exists
+            next_question_data = {'pending': True}
 
         # Return the response for the frontend, combining the result with the next question
         return {
             **next_question_data, # This adds the new question and options
             'current_question': new_state['current_question'],
-            'total_questions': len(full_state['questions']),
+            'total_questions': self._question_count(full_state),
             'score': new_state['score'],
             'is_correct': is_correct,
             'feedback': 'Correct!' if is_correct else 'Incorrect!',
@@ -221,7 +318,7 @@ class TriviaGame(BaseGame):
     def get_current_state(self):
         """Get the current game state."""
         cached_data = self.cache_service.get_game_session(
-            self.session.user.id,
+            self.session.id,
             'trivia'
         )
         
@@ -232,8 +329,12 @@ class TriviaGame(BaseGame):
         if 'questions' not in full_state:
             return None
             
+        full_state = self._with_streamed_questions(full_state)
         current_index = full_state.get('current_question', 0)
         if current_index >= len(full_state['questions']):
+            # The stream ended with fewer questions than the player was waiting for
+            if current_index >= self._question_count(full_state) and not self.session.completed:
+                self._complete(full_state.get('score', 0))
             return None
             
         current_q = full_state['questions'][current_index]
@@ -242,7 +343,7 @@ class TriviaGame(BaseGame):
             'question': current_q.get('question'),
             'options': current_q.get('options', []),
             'current_question': current_index,
-            'total_questions': len(full_state['questions']),
+            'total_questions': self._question_count(full_state),
             'score': full_state.get('score', 0),
             'completed': self.session.completed
         }
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spotify_games', '0004_alter_gamestate_session'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamesession',
+            name='game_type',
+            field=models.CharField(choices=[('lyrics_text', 'Lyrics Text Mode'), ('lyrics_voice', 'Lyrics Voice Mode'), ('guess_artist', 'Artist Guess'), ('crossword', 'Crossword'), ('trivia', 'Trivia')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='PregeneratedGame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('content', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pregenerated_games', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'kind', 'created_at'], name='spotify_gam_user_id_8010bc_idx')],
+            },
+        ),
+    ]
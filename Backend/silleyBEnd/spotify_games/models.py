@@ -80,4 +80,16 @@ class GameLeaderboard(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['-score','game_type']),
-        ]
\ No newline at end of file
+        ]
+
+class PregeneratedGame(models.Model):
+    """AI-generated game content waiting to be served, see ``services.pregeneration``."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pregenerated_games')
+    kind = models.CharField(max_length=20)
+    content = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'kind', 'created_at']),
+        ]
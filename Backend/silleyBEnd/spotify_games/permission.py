@@ -1,19 +1,14 @@
 from rest_framework import permissions
-from spotify.models import SpotifyToken
+import requests
+from spotify.token_service import TokenRefreshError, token_service
 from rest_framework.permissions import BasePermission
 
 class ValidSpotifyTokenRequired(BasePermission):
     """Permission class instead of auth class"""
     def has_permission(self, request, view):
         try:
-            token = SpotifyToken.objects.get(user=request.user)
-            if token.is_expired():
-                if token.refresh_token:
-                    token.refresh()
-                    return True
-                return False
-            return True
-        except SpotifyToken.DoesNotExist:
+            return token_service.get(request.user.id) is not None
+        except (TokenRefreshError, requests.RequestException):
             return False
         
 class IsGameSessionOwner(permissions.BasePermission):
@@ -1,4 +1,5 @@
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 import copy
 import random
 from django.conf import settings
@@ -9,14 +10,26 @@ import logging
 import json
 import requests
 import re
-import time
+from asgiref.sync import async_to_sync
 from google.ai import generativelanguage as glm
 from google.generativeai.generative_models import GenerativeModel
 from google.generativeai.client import configure
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from spotify.rate_limit import rate_limiter
+from .content_cache import content_cache
+from .json_stream import JsonArrayParser, parse_json_array
 
 logger = logging.getLogger("spotify_games")
 
+MODEL_NAME = 'gemini-1.5-pro-latest'
+
+# Part of every content cache key; bump a version when its prompt changes
+PROMPT_VERSIONS = {
+    'trivia': 1,
+    'crossword': 1,
+    'lyrics_challenges': 1,
+}
+
 
 class Difficulty(Enum):
     EASY = "easy"
@@ -72,43 +85,108 @@ class AIService:
         }
         
         model = GenerativeModel(
-            'gemini-1.5-pro-latest',
+            MODEL_NAME,
             safety_settings=safety_settings
         )
         return model
 
-    def _make_api_request(self, prompt: str) -> str:
-        """Make API request with retries and key rotation."""
+    async def _stream_api_request(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the response text as it is generated.
+        
+        Failed requests are retried with backoff, but only until the first
+        chunk has been yielded.
+        """
         for attempt in range(self.max_retries):
+            streamed = False
             try:
                 model = self._get_model()
-                response = model.generate_content(
+                await rate_limiter.acquire('gemini')
+                response = await model.generate_content_async(
                     prompt,
                     generation_config={
                         'temperature': 0.7,
                         'max_output_tokens': 2048, # Increased token limit for larger responses
-                    }
+                    },
+                    stream=True,
                 )
+                async for chunk in response:
+                    if chunk.parts:
+                        streamed = True
+                        yield chunk.text
 
-                if not response.parts:
+                if not streamed:
                     raise AIServiceError("Empty response from API - likely blocked by safety filters or a model refusal.")
-                
-                return response.text # Use response.text for simplicity
+                return
             
             except Exception as e:
+                if streamed:
+                    logger.error(f"API stream failed part way: {str(e)}")
+                    raise AIServiceError(f"API stream failed: {str(e)}")
                 logger.warning(f"API request attempt {attempt + 1} failed: {str(e)}")
                 if attempt == self.max_retries - 1:
                     logger.error(f"API request failed after all retries: {str(e)}")
                     raise AIServiceError(f"API request failed: {str(e)}")
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(2 ** attempt)
                         
         raise AIServiceError("API request failed after all retries.")
+    
+    async def _make_api_request(self, prompt: str) -> str:
+        """Make API request with retries, backing off without blocking the event loop."""
+        return ''.join([text async for text in self._stream_api_request(prompt)])
         
-    def generate_trivia_questions(self, artists_data: List[Dict[str, Any]], num_questions: int) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _cache_inputs(kind: str, **inputs) -> Dict[str, Any]:
+        return {'prompt_version': PROMPT_VERSIONS[kind], 'model': MODEL_NAME, **inputs}
+    
+    def generate_trivia_questions(self, artists_data: List[Dict[str, Any]], num_questions: int,
+                                  user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Blocking variant of ``agenerate_trivia_questions``."""
+        return async_to_sync(self.agenerate_trivia_questions)(artists_data, num_questions, user_id)
+    
+    async def agenerate_trivia_questions(self, artists_data: List[Dict[str, Any]], num_questions: int,
+                                         user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Generate a batch of trivia questions for multiple artists in a single API call."""
+        return [
+            question async for question in self.astream_trivia_questions(artists_data, num_questions, user_id)
+        ]
+    
+    async def astream_trivia_questions(self, artists_data: List[Dict[str, Any]], num_questions: int,
+                                       user_id: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield each validated trivia question as soon as it has been generated.
+        
+        Question sets are reused from the content cache for the same artists;
+        a cached set is yielded at once.
+        """
         if not artists_data:
             raise ValueError("Artists data cannot be empty.")
-
+        
+        key = content_cache.key('trivia', self._cache_inputs(
+            'trivia', artists=sorted(artists_data, key=lambda a: str(a.get('name'))), num_questions=num_questions,
+        ))
+        cached = content_cache.get(key, user_id)
+        if cached is not None:
+            for question in cached:
+                yield question
+            return
+        
+        questions = []
+        parser = JsonArrayParser()
+        try:
+            async for text in self._stream_api_request(self._trivia_prompt(artists_data, num_questions)):
+                for question in parser.feed(text):
+                    if isinstance(question, dict) and self._validate_question(question):
+                        questions.append(question)
+                        yield question
+            if not parser.started:
+                raise AIServiceError("No JSON array found in the AI response.")
+        except AIServiceError as e:
+            logger.error(f"Error processing AI response for trivia questions: {str(e)}")
+        
+        if len(questions) >= num_questions:
+            content_cache.set(key, questions, user_id)
+    
+    @staticmethod
+    def _trivia_prompt(artists_data: List[Dict[str, Any]], num_questions: int) -> str:
         context_block = ""
         for i, artist in enumerate(artists_data, 1):
             context_block += f"\n---ARTIST {i}---\n"
@@ -120,7 +198,7 @@ class AIService:
         # =======================================================
         # FIX 2: Refined and more direct prompt
         # =======================================================
-        prompt = f"""
+        return f"""
         CONTEXT:
         {context_block}
 
@@ -143,26 +221,6 @@ class AIService:
           }}
         ]
         """
-        
-        try:
-            response_text = self._make_api_request(prompt)
-            
-            # Find the start and end of the JSON array
-            json_start = response_text.find('[')
-            json_end = response_text.rfind(']') + 1
-            
-            if json_start == -1 or json_end == 0:
-                raise AIServiceError("No JSON array found in the AI response.")
-            
-            json_str = response_text[json_start:json_end]
-            
-            questions = json.loads(json_str)
-            validated_questions = [q for q in questions if self._validate_question(q)]
-            return validated_questions
-
-        except Exception as e:
-            logger.error(f"Error processing AI response for trivia questions: {str(e)}")
-            return []
 
     def _validate_question(self, question: Dict) -> bool:
         """Validate a single question"""
@@ -173,11 +231,27 @@ class AIService:
         if question["difficulty"] not in ["easy", "medium", "hard"]: return False
         return True
     
-    def generate_crossword(self, lyrics: str) -> Dict[str, Any]:
-        """Generate a crossword puzzle from lyrics."""
+    def generate_crossword(self, lyrics: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Blocking variant of ``agenerate_crossword``."""
+        return async_to_sync(self.agenerate_crossword)(lyrics, user_id)
+    
+    async def agenerate_crossword(self, lyrics: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Generate a crossword puzzle from lyrics.
+        
+        The word list and its layout are reused from the content cache for the same lyrics.
+        """
         if not lyrics.strip():
             raise ValueError("Lyrics cannot be empty")
         
+        return await content_cache.aget_or_generate(
+            'crossword',
+            self._cache_inputs('crossword', lyrics=lyrics),
+            lambda: self._generate_crossword(lyrics),
+            user_id=user_id,
+            cacheable=lambda puzzle: not puzzle.get('error'),
+        )
+    
+    async def _generate_crossword(self, lyrics: str) -> Dict[str, Any]:
         # =======================================================
         # FIX 1: Improved AI Prompt
         # =======================================================
@@ -205,31 +279,83 @@ class AIService:
         ]
         """
         try:
-            response_text = self._make_api_request(prompt).strip()
+            response_text = (await self._make_api_request(prompt)).strip()
             
-            json_start = response_text.find('[')
-            json_end = response_text.rfind(']') + 1
-            if json_start == -1 or json_end == 0:
+            word_list = parse_json_array(response_text)
+            if word_list is None:
                 raise AIServiceError("No JSON array found in AI response for crossword.")
-            
-            json_str = response_text[json_start:json_end]
-            word_list = json.loads(json_str)
 
             if len(word_list) < 10:
                 raise AIServiceError(f"AI generated only {len(word_list)} words, not enough for a puzzle.")
             
-            puzzle = generate_crossword_puzzle(word_list, width=15, height=15)
+            # The layout search is CPU bound; keep it off the event loop
+            puzzle = await asyncio.to_thread(generate_crossword_puzzle, word_list, width=15, height=15)
             return puzzle
 
         except Exception as e:
             logger.error(f"Error generating crossword: {str(e)}")
             return {'error': f"Generation failed: {str(e)}"}
         
-    def generate_lyrics_challenges(self, lyrics: str, num_challenges: int, song_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Generate multiple optimized lyrics challenges using AI"""
+    def generate_lyrics_challenge_sets(self, songs: List[Tuple[str, int, Dict[str, Any]]], deadline: float,
+                                       user_id: Optional[int] = None) -> List[Optional[List[Dict[str, Any]]]]:
+        """Blocking variant of ``agenerate_lyrics_challenge_sets``."""
+        return async_to_sync(self.agenerate_lyrics_challenge_sets)(songs, deadline, user_id)
+    
+    async def agenerate_lyrics_challenge_sets(self, songs: List[Tuple[str, int, Dict[str, Any]]], deadline: float,
+                                              user_id: Optional[int] = None) -> List[Optional[List[Dict[str, Any]]]]:
+        """Generate challenges for several ``(lyrics, num_challenges, song_data)`` songs concurrently.
+        
+        Returns one entry per song, in order: its challenges, or None if
+        generation failed or had not finished after ``deadline`` seconds.
+        """
+        tasks = [
+            asyncio.ensure_future(self.agenerate_lyrics_challenges(lyrics, num_challenges, song_data, user_id))
+            for lyrics, num_challenges, song_data in songs
+        ]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"{len(pending)} of {len(tasks)} lyrics challenge sets missed the {deadline}s deadline")
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = []
+        for task in tasks:
+            challenges = task.result() if task in done and task.exception() is None else None
+            results.append(challenges if challenges and not any("error" in c for c in challenges) else None)
+        return results
+    
+    def generate_lyrics_challenges(self, lyrics: str, num_challenges: int, song_data: Dict[str, Any],
+                                   user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Blocking variant of ``agenerate_lyrics_challenges``."""
+        return async_to_sync(self.agenerate_lyrics_challenges)(lyrics, num_challenges, song_data, user_id)
+    
+    async def agenerate_lyrics_challenges(self, lyrics: str, num_challenges: int, song_data: Dict[str, Any],
+                                          user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Generate multiple optimized lyrics challenges using AI
+        
+        Challenges are reused from the content cache for the same lyrics.
+        """
         if not lyrics.strip():
             raise ValueError("Lyrics cannot be empty")
         
+        challenges = await content_cache.aget_or_generate(
+            'lyrics_challenges',
+            self._cache_inputs('lyrics_challenges', lyrics=lyrics, num_challenges=num_challenges),
+            lambda: self._generate_lyrics_challenges(lyrics, num_challenges),
+            user_id=user_id,
+            cacheable=lambda challenges: not any('error' in challenge for challenge in challenges),
+        )
+        
+        # Attach the song_data to each challenge
+        return [
+            {**challenge, "song_data": song_data} if "error" not in challenge else challenge
+            for challenge in challenges
+        ]
+    
+    async def _generate_lyrics_challenges(self, lyrics: str, num_challenges: int) -> List[Dict[str, Any]]:
         # The prompt itself does not need to change
         prompt = f"""
         CONTEXT:
@@ -251,22 +377,12 @@ class AIService:
         """
         
         try:
-            response_text = self._make_api_request(prompt)
+            response_text = await self._make_api_request(prompt)
             
-            json_start = response_text.find('[')
-            json_end = response_text.rfind(']') + 1
-            if json_start == -1 or json_end == 0:
+            challenges_data = parse_json_array(response_text)
+            if challenges_data is None:
                 raise AIServiceError("No Valid JSON array found in response for lyrics challenge")
-            
-            json_str = response_text[json_start:json_end]
-            challenges_data = json.loads(json_str)
-            
-            # =======================================================
-            # THE FIX IS HERE: Attach the song_data to each challenge
-            # =======================================================
-            for challenge in challenges_data:
-                if isinstance(challenge, dict):
-                    challenge["song_data"] = song_data
+            challenges_data = [challenge for challenge in challenges_data if isinstance(challenge, dict)]
             
             if not challenges_data:
                 raise AIServiceError("No valid challenges generated")
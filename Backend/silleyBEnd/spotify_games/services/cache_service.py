@@ -22,8 +22,9 @@ class GameCacheService:
     def cache_game_session(self, session_id, game_type, game_data, timeout=None):
         """Cache game session data."""
         key = self._make_key(session_id, game_type)
-        logger.debug(f"Caching game state for user {session_id} with key: {key}")
-        logger.debug(f"Game state to cache: {game_data}")
+        # Lazy %s arguments: the state is only rendered (and size-capped) if the record is written
+        logger.debug("Caching game state for user %s with key: %s", session_id, key)
+        logger.debug("Game state to cache: %s", game_data)
         timeout = timeout or self.cache_timeout
         cache.set(key, json.dumps(game_data), self.cache_timeout)
         
@@ -31,9 +32,9 @@ class GameCacheService:
         """Retrieve cached game session with error handling."""
         try:
             key = self._make_key(session_id, game_type)
-            logger.debug(f"Retrieving game state for user {session_id} with key: {key}")
+            logger.debug("Retrieving game state for user %s with key: %s", session_id, key)
             data = cache.get(key)
-            logger.debug(f"Game state: {data}")
+            logger.debug("Game state: %s", data)
             return json.loads(data) if data else None
         except json.JSONDecoderError:
             logger.error("Invalid JSON in cache")
@@ -44,7 +45,7 @@ class GameCacheService:
     def clear_game_session(self, session_id, game_type):
         """Clear the cached game session data."""
         key = self._make_key(session_id, game_type)
-        logger.debug(f"Clearing game state for user {session_id} with key: {key}")
+        logger.debug("Clearing game state for user %s with key: %s", session_id, key)
         cache.delete(key)
 
     
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import redis
+import statsd
+from django.conf import settings
+from spotify.http_cache import LocalResponseStore, RedisResponseStore
+
+logger = logging.getLogger("spotify_games")
+
+DEFAULT_OPTIONS = {
+    'ttl': 30 * 24 * 3600,
+    'max_uses_per_user': 1,
+    'max_tracked_users': 1000,
+}
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+
+def content_cache_options() -> Dict:
+    return {**DEFAULT_OPTIONS, **getattr(settings, 'CONTENT_CACHE', {})}
+
+
+# Count one more use of an entry by user ARGV[1] unless they already had
+# ARGV[2] uses; returns 1 if the use was counted. Only the ARGV[4] users
+# served most recently (ARGV[3]) are tracked, and both keys expire after
+# ARGV[5] seconds. KEYS: use counts hash, last served sorted set.
+USE_SCRIPT = """
+local uses = redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+if uses > tonumber(ARGV[2]) then
+    redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+    return 0
+end
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+local extra = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if extra > 0 then
+    local dropped = redis.call('ZRANGE', KEYS[2], 0, extra - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, extra - 1)
+    redis.call('HDEL', KEYS[1], unpack(dropped))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return 1
+"""
+
+
+class LocalContentStore(LocalResponseStore):
+    """In-process content entries with per-user use counts."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes)
+        self._uses: Dict[str, "OrderedDict[str, int]"] = {}
+
+    def set(self, key: str, meta: str, body: bytes) -> None:
+        super().set(key, meta, body)
+        with self._lock:
+            if len(self._uses) > len(self._entries):
+                for evicted in self._uses.keys() - self._entries.keys():
+                    del self._uses[evicted]
+
+    def use(self, key: str, user_id: int, max_uses: int, max_users: int, ttl: float) -> bool:
+        """Count a use of ``key`` by ``user_id``; False if they already had ``max_uses``."""
+        with self._lock:
+            served = self._uses.setdefault(key, OrderedDict())
+            uses = served.pop(str(user_id), 0)
+            if uses >= max_uses:
+                served[str(user_id)] = uses
+                return False
+            served[str(user_id)] = uses + 1
+            while len(served) > max_users:
+                served.popitem(last=False)
+            return True
+
+    def reset_uses(self, key: str) -> None:
+        with self._lock:
+            self._uses.pop(key, None)
+
+    def clear(self) -> None:
+        super().clear()
+        with self._lock:
+            self._uses.clear()
+
+
+class RedisContentStore(RedisResponseStore):
+    """Content entries in Redis, with use counts updated atomically by ``USE_SCRIPT``."""
+
+    KEY_PREFIX = 'contentcache'
+    NAME = 'content cache'
+
+    def __init__(self, url: str, max_bytes: int):
+        super().__init__(url, max_bytes)
+        self.fallback = LocalContentStore(max_bytes)
+        self._use = self.client.register_script(USE_SCRIPT)
+
+    def use(self, key: str, user_id: int, max_uses: int, max_users: int, ttl: float) -> bool:
+        """Count a use of ``key`` by ``user_id``; False if they already had ``max_uses``."""
+        try:
+            return bool(self._use(
+                keys=[f"{self._key(key)}:uses", f"{self._key(key)}:served"],
+                args=[user_id, max_uses, time.time(), max_users, max(int(ttl), 1)],
+            ))
+        except redis.RedisError as e:
+            self._warn(e)
+            return self.fallback.use(key, user_id, max_uses, max_users, ttl)
+
+    def reset_uses(self, key: str) -> None:
+        self.fallback.reset_uses(key)
+        try:
+            self.client.delete(f"{self._key(key)}:uses", f"{self._key(key)}:served")
+        except redis.RedisError as e:
+            self._warn(e)
+
+
+class ContentCache:
+    """Generated game content keyed by a hash of everything that produced it.
+
+    Keys cover the content kind and its inputs (lyrics, artist data), which
+    include the prompt version and model, so identical requests from any
+    user reuse one LLM call and one crossword layout. Entries expire after
+    ``ttl`` seconds and are evicted least recently used past
+    ``settings.CONTENT_CACHE_MAX_BYTES``. A user is served the same entry at
+    most ``max_uses_per_user`` times; after that it is generated afresh.
+    Uses are counted by the store in one atomic step, so concurrent games
+    can't both take a user's last use of an entry.
+    """
+
+    def __init__(self):
+        self._store = None
+        self._store_lock = threading.Lock()
+        self.stats: Counter = Counter()
+        self.statsd = statsd.StatsClient('localhost', 8125, prefix='content_cache')
+
+    @property
+    def store(self):
+        with self._store_lock:
+            if self._store is None:
+                url = getattr(settings, 'CONTENT_CACHE_REDIS_URL', None)
+                max_bytes = getattr(settings, 'CONTENT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+                self._store = RedisContentStore(url, max_bytes) if url else LocalContentStore(max_bytes)
+            return self._store
+
+    @staticmethod
+    def key(kind: str, inputs: Dict) -> str:
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return f"{kind}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def get(self, key: str, user_id: Optional[int] = None) -> Optional[Any]:
+        """Cached value for ``key``, or None if missing, expired or used up by ``user_id``."""
+        kind = key.split(':', 1)[0]
+        options = content_cache_options()
+        entry = self.store.get(key)
+        if entry is None or time.time() - json.loads(entry[0])['stored_at'] > options['ttl']:
+            self.record(kind, 'miss')
+            return None
+
+        if user_id is not None and not self.store.use(
+            key, user_id, options['max_uses_per_user'], options['max_tracked_users'], options['ttl'],
+        ):
+            self.record(kind, 'capped')
+            return None
+        self.record(kind, 'hit')
+        return json.loads(entry[1])['value']
+
+    def set(self, key: str, value: Any, user_id: Optional[int] = None) -> None:
+        """Store ``value`` for ``key``; ``user_id`` has used it once, nobody else has."""
+        options = content_cache_options()
+        self.store.set(key, json.dumps({'stored_at': time.time()}), json.dumps({'value': value}).encode())
+        self.store.reset_uses(key)
+        if user_id is not None:
+            self.store.use(key, user_id, options['max_uses_per_user'], options['max_tracked_users'], options['ttl'])
+
+    def get_or_generate(self, kind: str, inputs: Dict, generate: Callable[[], Any],
+                        user_id: Optional[int] = None,
+                        cacheable: Callable[[Any], bool] = bool) -> Any:
+        """Cached value for ``inputs``, calling ``generate`` on a miss.
+
+        Only values that pass ``cacheable`` are stored, so failed generations
+        are retried next time.
+        """
+        key = self.key(kind, inputs)
+        value = self.get(key, user_id)
+        if value is None:
+            value = generate()
+            if cacheable(value):
+                self.set(key, value, user_id)
+        return value
+
+    async def aget_or_generate(self, kind: str, inputs: Dict, generate: Callable[[], Awaitable[Any]],
+                               user_id: Optional[int] = None,
+                               cacheable: Callable[[Any], bool] = bool) -> Any:
+        """``get_or_generate`` for coroutine generators.
+
+        The store is read and written on a worker thread to keep the event
+        loop free.
+        """
+        key = self.key(kind, inputs)
+        value = await asyncio.to_thread(self.get, key, user_id)
+        if value is None:
+            value = await generate()
+            if cacheable(value):
+                await asyncio.to_thread(self.set, key, value, user_id)
+        return value
+
+    def record(self, kind: str, outcome: str) -> None:
+        """Count a ``hit``, ``miss`` or ``capped`` lookup."""
+        self.stats[f"{kind}.{outcome}"] += 1
+        self.statsd.incr(f"{kind}.{outcome}")
+
+    def clear(self) -> None:
+        self.store.clear()
+        self.stats.clear()
+
+
+content_cache = ContentCache()
@@ -0,0 +1,85 @@
+import json
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger("spotify_games")
+
+
+class JsonArrayParser:
+    """Incremental parser for a JSON array that arrives in chunks.
+
+    ``feed`` returns the elements completed by the new text, so the first
+    items of an LLM response can be used while the rest is generated.
+    Anything before the opening ``[``, such as a markdown fence, is skipped,
+    and elements that are not valid JSON are dropped.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._start: Optional[int] = None
+        self._in_string = False
+        self._escaped = False
+
+    def _emit(self, end: int, items: List[Any]) -> None:
+        text = self._buffer[self._start:end].strip()
+        self._start = None
+        try:
+            items.append(json.loads(text))
+        except ValueError:
+            logger.warning("Skipping malformed array element: %s", text)
+
+    def feed(self, text: str) -> List[Any]:
+        self._buffer += text
+        items: List[Any] = []
+        while self._pos < len(self._buffer) and not self.done:
+            char = self._buffer[self._pos]
+            if not self.started:
+                if char == '[':
+                    self.started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == ',' and self._depth == 1:
+                if self._start is not None:
+                    self._emit(self._pos, items)
+            elif char in ']}':
+                self._depth -= 1
+                if self._depth == 0:
+                    # A scalar element is only complete at the next , or ]
+                    if self._start is not None:
+                        self._emit(self._pos, items)
+                    self.done = True
+                elif self._depth == 1:
+                    self._emit(self._pos + 1, items)
+            elif not char.isspace():
+                if self._depth == 1 and self._start is None:
+                    self._start = self._pos
+                if char == '"':
+                    self._in_string = True
+                elif char in '[{':
+                    self._depth += 1
+            self._pos += 1
+
+        # Drop text that belongs to elements already returned
+        keep = self._start if self._start is not None else self._pos
+        self._buffer = self._buffer[keep:]
+        self._pos -= keep
+        if self._start is not None:
+            self._start = 0
+        return items
+
+
+def parse_json_array(text: str) -> Optional[List[Any]]:
+    """Elements of the first JSON array in ``text``, or None if it has none."""
+    parser = JsonArrayParser()
+    items = parser.feed(text)
+    return items if parser.started else None
@@ -0,0 +1,128 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from spotify.models import User
+from ..exceptions import GameInitializationError
+from ..models import PregeneratedGame
+
+logger = logging.getLogger("spotify_games")
+
+# Kinds of content kept ready; both lyrics modes share the lyrics buffer
+KINDS = ('crossword', 'lyrics', 'trivia')
+
+DEFAULT_OPTIONS = {
+    'buffer_size': 2,
+    'workers': 2,
+    'max_age': 7 * 24 * 3600,
+}
+
+
+def pregeneration_options() -> Dict:
+    return {**DEFAULT_OPTIONS, **getattr(settings, 'PREGENERATION', {})}
+
+
+def generators() -> Dict[str, Callable[[User], Dict]]:
+    # Imported here because the game modes import this module
+    from ..game_modes.crossword import CrosswordGame
+    from ..game_modes.lyrics_game import LyricsGame
+    from ..game_modes.trivia import TriviaGame
+    return {game.PREGENERATED_KIND: game.generate_content for game in (CrosswordGame, LyricsGame, TriviaGame)}
+
+
+def _fresh(user: User, kind: str):
+    cutoff = timezone.now() - timedelta(seconds=pregeneration_options()['max_age'])
+    buffer = PregeneratedGame.objects.filter(user=user, kind=kind)
+    buffer.filter(created_at__lt=cutoff).delete()
+    return buffer.filter(created_at__gte=cutoff)
+
+
+def take(user: User, kind: str) -> Optional[Dict]:
+    """Remove and return the oldest ready content of ``kind``, scheduling a top-up.
+
+    Returns None when the buffer is empty; the caller then generates inline.
+    """
+    with transaction.atomic():
+        entry = _fresh(user, kind).select_for_update(skip_locked=True).order_by('created_at').first()
+        if entry is not None:
+            entry.delete()
+    logger.info("Pre-generated %s %s for user %s", kind, 'hit' if entry else 'miss', user.id)
+    pregenerator.schedule(user.id, [kind])
+    return entry.content if entry else None
+
+
+def fill(user: User, kind: str) -> int:
+    """Generate content until the user's ``kind`` buffer is full; returns how many were added."""
+    generate = generators()[kind]
+    added = 0
+    while _fresh(user, kind).count() < pregeneration_options()['buffer_size']:
+        PregeneratedGame.objects.create(user=user, kind=kind, content=generate(user))
+        added += 1
+    return added
+
+
+class Pregenerator:
+    """Background threads that keep every user's buffers topped up.
+
+    Sized by ``settings.PREGENERATION['workers']``; with 0 workers nothing
+    is generated ahead and games generate their content inline. A user's
+    buffer of one kind is filled by at most one task at a time.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[Tuple[int, str]] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Optional[ThreadPoolExecutor]:
+        workers = pregeneration_options()['workers']
+        if not workers:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pregeneration')
+                atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+            return self._executor
+
+    def schedule(self, user_id: int, kinds: Iterable[str] = KINDS) -> None:
+        executor = self.executor
+        if executor is None:
+            return
+        for kind in kinds:
+            with self._lock:
+                if (user_id, kind) in self._pending:
+                    continue
+                self._pending.add((user_id, kind))
+            executor.submit(self._run, user_id, kind)
+
+    def submit(self, fn: Callable, *args) -> Optional[Future]:
+        """Run ``fn`` on the pool; None when there are no workers."""
+        executor = self.executor
+        return executor.submit(fn, *args) if executor else None
+
+    def _run(self, user_id: int, kind: str) -> None:
+        try:
+            added = fill(User.objects.get(pk=user_id), kind)
+            if added:
+                logger.info("Pre-generated %s %s game(s) for user %s", added, kind, user_id)
+        except GameInitializationError as e:
+            logger.info("Cannot pre-generate %s for user %s: %s", kind, user_id, e)
+        except Exception as e:
+            logger.error(f"Pre-generating {kind} for user {user_id} failed: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.discard((user_id, kind))
+            close_old_connections()
+
+
+pregenerator = Pregenerator()
+
+
+def on_ingestion_completed(sender, user: User, **kwargs) -> None:
+    pregenerator.schedule(user.id)
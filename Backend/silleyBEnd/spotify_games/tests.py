@@ -1,3 +1,333 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from spotify.models import Artist, MostListenedArtist, User
+from .exceptions import GameInitializationError
+from .game_modes.crossword import CrosswordGame
+from .game_modes.trivia import TriviaGame
+from .models import GamePlayback, GameSession, PregeneratedGame
+from .services import pregeneration
+from .services.ai_service import AIService
+from .services.content_cache import content_cache
+from .services.json_stream import JsonArrayParser, parse_json_array
 
-# Create your tests here.
+SONG = {
+    'spotify_id': 't1',
+    'name': 'Song',
+    'artist': 'Artist',
+    'image_url': 'https://example.com/t1.jpg',
+    'track_uri': 'spotify:track:t1',
+}
+
+
+class PregenerationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pregen',
+            email='pregen@example.com',
+            password='testpass123',
+        )
+
+    def test_take_pops_oldest_content(self):
+        """Ready content is served oldest first and each entry only once"""
+        PregeneratedGame.objects.create(user=self.user, kind='trivia', content={'n': 1})
+        PregeneratedGame.objects.create(user=self.user, kind='trivia', content={'n': 2})
+
+        self.assertEqual(pregeneration.take(self.user, 'trivia'), {'n': 1})
+        self.assertEqual(pregeneration.take(self.user, 'trivia'), {'n': 2})
+        self.assertIsNone(pregeneration.take(self.user, 'trivia'))
+
+    def test_expired_content_is_discarded(self):
+        """Content older than max_age is never served"""
+        entry = PregeneratedGame.objects.create(user=self.user, kind='trivia', content={'n': 1})
+        PregeneratedGame.objects.filter(pk=entry.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        self.assertIsNone(pregeneration.take(self.user, 'trivia'))
+        self.assertFalse(PregeneratedGame.objects.exists())
+
+    def test_fill_tops_buffer_up_to_size(self):
+        """Filling only generates what is missing from the buffer"""
+        PregeneratedGame.objects.create(user=self.user, kind='crossword', content={'n': 0})
+        generate = mock.Mock(return_value={'n': 1})
+
+        with self.settings(PREGENERATION={'buffer_size': 3}), \
+                mock.patch.object(pregeneration, 'generators', return_value={'crossword': generate}):
+            added = pregeneration.fill(self.user, 'crossword')
+
+        self.assertEqual(added, 2)
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual(PregeneratedGame.objects.filter(user=self.user, kind='crossword').count(), 3)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_game_starts_from_pregenerated_content(self):
+        """Starting a game uses ready content instead of calling the AI"""
+        puzzle = {'words': [{'word': 'SONG', 'clue': 'A tune'}]}
+        PregeneratedGame.objects.create(
+            user=self.user, kind='crossword', content={'song': SONG, 'puzzle_data': puzzle}
+        )
+        session = GameSession.objects.create(user=self.user, game_type='crossword')
+
+        with mock.patch.object(CrosswordGame, 'generate_content', side_effect=AssertionError):
+            state = CrosswordGame(session).initialize_game()
+
+        self.assertEqual(state['puzzle_data'], puzzle)
+        self.assertEqual(GamePlayback.objects.get(session=session).spotify_uri, SONG['track_uri'])
+        self.assertFalse(PregeneratedGame.objects.exists())
+
+    def test_failed_crossword_is_not_buffered(self):
+        """A puzzle the AI failed to build raises instead of filling the buffer"""
+        song = SimpleNamespace(lyrics='some lyrics', **SONG)
+
+        with mock.patch('spotify_games.game_modes.crossword.sample_candidates', return_value=[song]), \
+                mock.patch.object(AIService, 'generate_crossword', return_value={'error': 'failed'}):
+            with self.assertRaises(GameInitializationError):
+                pregeneration.fill(self.user, 'crossword')
+
+        self.assertFalse(PregeneratedGame.objects.exists())
+
+
+class ContentCacheTests(TestCase):
+    def setUp(self):
+        content_cache.clear()
+        self.addCleanup(content_cache.clear)
+
+    def test_identical_inputs_are_generated_once(self):
+        """Another user asking for the same content gets the stored value"""
+        generate = mock.Mock(return_value=['question'])
+
+        first = content_cache.get_or_generate('trivia', {'artists': ['A']}, generate, user_id=1)
+        second = content_cache.get_or_generate('trivia', {'artists': ['A']}, generate, user_id=2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(content_cache.stats['trivia.hit'], 1)
+
+    def test_reuse_is_capped_per_user(self):
+        """A user already served an entry gets freshly generated content"""
+        generate = mock.Mock(side_effect=[['first'], ['second']])
+
+        with self.settings(CONTENT_CACHE={'max_uses_per_user': 1}):
+            content_cache.get_or_generate('trivia', {'artists': ['A']}, generate, user_id=1)
+            again = content_cache.get_or_generate('trivia', {'artists': ['A']}, generate, user_id=1)
+
+        self.assertEqual(again, ['second'])
+        self.assertEqual(content_cache.stats['trivia.capped'], 1)
+
+    def test_concurrent_reuse_respects_the_cap(self):
+        """Games racing for the same entry can't serve a user more than max_uses_per_user times"""
+        key = content_cache.key('trivia', {'artists': ['A']})
+        content_cache.set(key, ['question'])
+        store, read = content_cache.store, content_cache.store.get
+        barrier = threading.Barrier(8)
+        results = []
+
+        def slow_read(*args):
+            entry = read(*args)
+            time.sleep(0.05)
+            return entry
+
+        def serve():
+            barrier.wait()
+            results.append(content_cache.get(key, user_id=1))
+
+        with self.settings(CONTENT_CACHE={'max_uses_per_user': 2}), \
+                mock.patch.object(store, 'get', slow_read):
+            threads = [threading.Thread(target=serve) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results.count(['question']), 2)
+        self.assertEqual(content_cache.stats['trivia.capped'], 6)
+
+    def test_async_lookups_run_off_the_event_loop(self):
+        """Async callers read and write the store, which may be Redis, on a worker thread"""
+        store = content_cache.store
+        loop_threads, store_threads = [], []
+
+        async def generate():
+            loop_threads.append(threading.current_thread())
+            return ['question']
+
+        def tracked(method):
+            def call(*args):
+                store_threads.append(threading.current_thread())
+                return method(*args)
+            return call
+
+        with mock.patch.object(store, 'get', tracked(store.get)), \
+                mock.patch.object(store, 'set', tracked(store.set)):
+            async_to_sync(content_cache.aget_or_generate)('trivia', {'artists': ['A']}, generate, user_id=1)
+
+        self.assertEqual(len(store_threads), 2)
+        self.assertNotIn(loop_threads[0], store_threads)
+
+    def test_expired_and_failed_content_is_regenerated(self):
+        """Entries past their ttl and values that fail validation are not served"""
+        generate = mock.Mock(return_value=[])
+        content_cache.get_or_generate('trivia', {'artists': ['A']}, generate)
+        content_cache.get_or_generate('trivia', {'artists': ['A']}, generate)
+        self.assertEqual(generate.call_count, 2)
+
+        generate = mock.Mock(return_value=['question'])
+        with self.settings(CONTENT_CACHE={'ttl': -1}):
+            content_cache.get_or_generate('trivia', {'artists': ['B']}, generate)
+            content_cache.get_or_generate('trivia', {'artists': ['B']}, generate)
+        self.assertEqual(generate.call_count, 2)
+
+    def test_crossword_for_same_lyrics_reuses_layout(self):
+        """The same lyrics cost one LLM call and one layout across users"""
+        puzzle = {'grid': [['A']], 'words': [{'word': 'SONG'}]}
+
+        with mock.patch.object(AIService, '_generate_crossword', return_value=puzzle) as generate:
+            AIService().generate_crossword('some lyrics', user_id=1)
+            cached = AIService().generate_crossword('some lyrics', user_id=2)
+            AIService().generate_crossword('other lyrics', user_id=2)
+
+        self.assertEqual(cached, puzzle)
+        self.assertEqual(generate.call_count, 2)
+
+
+class AIServiceDeadlineTests(TestCase):
+    def test_challenge_sets_stop_at_deadline(self):
+        """Songs still generating at the deadline come back as None without waiting for them"""
+        async def generate(lyrics, num_challenges, song_data, user_id=None):
+            if lyrics == 'slow':
+                await asyncio.sleep(5)
+            if lyrics == 'broken':
+                return [{'error': 'failed'}]
+            return [{'missing_portion': lyrics, 'song_data': song_data}]
+
+        songs = [(lyrics, 2, {'name': lyrics}) for lyrics in ('fast', 'slow', 'broken')]
+        started = time.monotonic()
+        with mock.patch.object(AIService, 'agenerate_lyrics_challenges', side_effect=generate):
+            results = AIService().generate_lyrics_challenge_sets(songs, deadline=0.2)
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(results, [[{'missing_portion': 'fast', 'song_data': {'name': 'fast'}}], None, None])
+
+
+def trivia_question(index):
+    return {
+        'question': f'Question {index}?',
+        'options': ['A', 'B', 'C', 'D'],
+        'correct_answer': 'A',
+        'explanation': '',
+        'difficulty': 'easy',
+    }
+
+
+class JsonStreamTests(TestCase):
+    def test_elements_are_returned_as_they_complete(self):
+        """Each array element is parsed once its closing brace arrives"""
+        elements = [{'q': 'a, [b]'}, {'q': 'c \\"}'}, 3]
+        text = '```json\n' + json.dumps(elements) + '\n```'
+        parser = JsonArrayParser()
+
+        items = [parser.feed(text[i:i + 4]) for i in range(0, len(text), 4)]
+
+        self.assertEqual([item for chunk in items for item in chunk], elements)
+        self.assertLess(items.index([{'q': 'a, [b]'}]), len(items) // 2)
+        self.assertTrue(parser.done)
+
+    def test_malformed_elements_are_skipped(self):
+        """A broken element does not lose the rest of the array"""
+        self.assertEqual(parse_json_array('[{"a": 1}, {"a": }, {"a": 2}]'), [{'a': 1}, {'a': 2}])
+        self.assertIsNone(parse_json_array('no array here'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TriviaStreamingTests(TestCase):
+    def setUp(self):
+        content_cache.clear()
+        self.addCleanup(content_cache.clear)
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username='stream',
+            email='stream@example.com',
+            password='testpass123',
+        )
+        artist = Artist.objects.create(
+            spotify_id='a1', name='Artist', genres='pop', biography='Born somewhere', has_biography=True,
+        )
+        MostListenedArtist.objects.create(user=self.user, artist=artist, rank=1)
+
+    def test_game_starts_on_first_streamed_question(self):
+        """The first question is served while the rest are still being generated"""
+        release = threading.Event()
+        questions = [trivia_question(index) for index in range(TriviaGame.QUESTIONS_PER_GAME)]
+
+        async def stream(service, prompt):
+            yield '[' + json.dumps(questions[0]) + ','
+            await asyncio.to_thread(release.wait, 5)
+            yield ','.join(json.dumps(question) for question in questions[1:]) + ']'
+
+        session = GameSession.objects.create(user=self.user, game_type='trivia')
+        game = TriviaGame(session)
+        with self.settings(PREGENERATION={'workers': 1}), \
+                mock.patch.object(pregeneration.pregenerator, 'schedule'), \
+                mock.patch.object(AIService, '_stream_api_request', stream):
+            state = game.initialize_game()
+            self.assertEqual(state['question'], 'Question 0?')
+            self.assertEqual(game.get_current_state()['total_questions'], TriviaGame.QUESTIONS_PER_GAME)
+
+            first = game.validate_answer({'answer': 'A'})
+            self.assertTrue(first['pending'])
+            release.set()
+            game._stream_future.result(5)
+
+        second = game.validate_answer({'answer': 'A'})
+        self.assertEqual(second['question'], 'Question 2?')
+        self.assertEqual(second['score'], 2)
+        self.assertEqual(second['total_questions'], TriviaGame.QUESTIONS_PER_GAME)
+
+    def test_busy_pool_falls_back_to_inline_generation(self):
+        """A stream stuck behind other generation work doesn't fail the game"""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        content = {'artists': [], 'questions': [trivia_question(index) for index in range(10)]}
+        stream = mock.Mock()
+
+        session = GameSession.objects.create(user=self.user, game_type='trivia')
+        game = TriviaGame(session)
+        with self.settings(PREGENERATION={'workers': 1}, AI_GENERATION_DEADLINE=0.1), \
+                mock.patch.object(pregeneration.pregenerator, 'schedule'), \
+                mock.patch.object(AIService, '_stream_api_request', stream), \
+                mock.patch.object(TriviaGame, 'generate_content', return_value=content) as generate:
+            busy = pregeneration.pregenerator.submit(release.wait, 5)
+            state = game.initialize_game()
+            release.set()
+            busy.result(5)
+
+        self.assertEqual(state['question'], 'Question 0?')
+        self.assertEqual(game.cache_service.get_game_session(session.id, 'trivia')['full_state']['status'], 'active')
+        generate.assert_called_once_with(self.user)
+        self.assertTrue(game._stream_future.cancelled())
+        stream.assert_not_called()
+
+    def test_stale_stream_is_treated_as_finished(self):
+        """A stream whose worker stopped publishing ends the game with the questions it has"""
+        session = GameSession.objects.create(user=self.user, game_type='trivia')
+        game = TriviaGame(session)
+        game.cache_service.cache_game_session(session.id, 'trivia', {'full_state': {
+            'artists': [], 'questions': [trivia_question(0)], 'current_question': 0, 'score': 0,
+            'total_questions': TriviaGame.QUESTIONS_PER_GAME, 'status': 'generating',
+        }})
+        game.cache_service.cache_game_session(session.id, 'trivia_stream', {
+            'questions': [trivia_question(0), trivia_question(1)], 'done': False, 'updated_at': time.time() - 3600,
+        })
+
+        self.assertEqual(game.get_current_state()['total_questions'], 2)
+        game.validate_answer({'answer': 'A'})
+        result = game.validate_answer({'answer': 'A'})
+
+        self.assertTrue(result['completed'])
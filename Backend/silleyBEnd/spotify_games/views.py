@@ -28,7 +28,7 @@ from .services.analytics_service import AnalyticsService
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from rest_framework.views import APIView
-from spotify.models import SpotifyToken
+from spotify.token_service import TokenRefreshError, token_service
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 
@@ -77,8 +77,11 @@ class GameSessionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        spotify_token = SpotifyToken.objects.filter(user=request.user).first()
-        if not spotify_token or not spotify_token.is_valid():
+        try:
+            spotify_token = token_service.get(request.user.id)
+        except TokenRefreshError:
+            spotify_token = None
+        if not spotify_token:
             logger.error("No valid Spotify token found")
             return Response(
                 {'error': 'Valid Spotify token required'},
@@ -96,14 +99,14 @@ class GameSessionViewSet(viewsets.ModelViewSet):
             game = self._get_game_instance(session)
             initial_state = game.initialize_game()
             
-            logger.debug(f"Initial State: {initial_state}")
+            logger.debug("Initial State: %s", initial_state)
         
             # Prepare response data
             response_data = {
                 'session': GameSessionSerializer(session).data,
             }
             
-            logger.debug(f"serializer response data: {response_data}")
+            logger.debug("serializer response data: %s", response_data)
         
             # Track game start - Create a GameEvent instance instead of a dict
             game_event = GameEvent(
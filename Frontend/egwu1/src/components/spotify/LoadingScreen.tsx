@@ -3,7 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { Music2, Loader2, Volume2, AlertCircle } from 'lucide-react';
 import { Progress } from '@/components/ui/progress';
 import { Alert, AlertDescription } from '@/components/ui/alert';
-import { checkAuth, checkProcessingStatus } from '@/services/api';
+import { checkAuth, checkProcessingStatus, openProcessingStream } from '@/services/api';
 
 
 const LoadingScreen: FC = () => {
@@ -11,6 +11,7 @@ const LoadingScreen: FC = () => {
   const [messageIndex, setMessageIndex] = useState<number>(0);
   const [error, setError] = useState<string | null>(null);
   const [isRedirecting, setIsRedirecting] = useState<boolean>(false);
+  const [readyModes, setReadyModes] = useState<string[]>([]);
   const navigate = useNavigate();
 
   const loadingMessages: string[] = [
@@ -24,6 +25,14 @@ const LoadingScreen: FC = () => {
     "Loading your musical memories...",
   ];
 
+  const modeNames: Record<string, string> = {
+    guess_artist: 'Guess the Artist',
+    crossword: 'Crossword',
+    lyrics_text: 'Lyrics',
+    lyrics_voice: 'Lyrics (voice)',
+    trivia: 'Trivia',
+  };
+
   useEffect(() => { // Extract and store tokens from URL parameters
     const params = new URLSearchParams(window.location.search);
     const accessToken = params.get('access_token');
@@ -40,7 +49,9 @@ const LoadingScreen: FC = () => {
 
   useEffect(() => {
     let isMounted = true;
-    let pollInterval: NodeJS.Timeout;
+    let pollInterval: NodeJS.Timeout | undefined;
+    let stream: EventSource | null = null;
+    let hasRealProgress = false;
 
     const checkAuthentication = async () => {
       try {
@@ -70,6 +81,41 @@ const LoadingScreen: FC = () => {
       }
     };
 
+    const handleStatus = (response: any) => {
+      if (!isMounted) return;
+
+      if (Array.isArray(response.modes)) {
+        setReadyModes(response.modes);
+      }
+
+      const counts = response.progress;
+      if (counts?.tracks && counts?.artists) {
+        const total = counts.tracks.total + counts.artists.total;
+        if (total > 0) {
+          hasRealProgress = true;
+          const done = counts.tracks.done + counts.artists.done;
+          setProgress(Math.min(95, (done / total) * 95));
+        }
+      }
+
+      if (response.status === 'complete' && response.redirect_url) {
+        setProgress(100);
+        if (!isRedirecting) {
+          setIsRedirecting(true);
+          // Small delay to show completion state
+          setTimeout(() => {
+            if (response.redirect_url?.startsWith('http')) {
+              window.location.href = response.redirect_url;
+            } else {
+              navigate(response.redirect_url);
+            }
+          }, 1500);
+        }
+      } else if (response.status === 'error') {
+        setError(response.error || 'An error occurred while processing your data');
+      }
+    };
+
     const pollProcessingStatus = async () => {
       if (!isMounted) return;
 
@@ -77,26 +123,7 @@ const LoadingScreen: FC = () => {
         const isAuthed = await checkAuthentication();
         if (!isAuthed) return;
 
-        const response = await checkProcessingStatus();
-        
-        if (!isMounted) return;
-
-        if (response.status === 'complete' && response.redirect_url) {
-          setProgress(100);
-          if (!isRedirecting) {
-            setIsRedirecting(true);
-            // Small delay to show completion state
-            setTimeout(() => {
-              if (response.redirect_url?.startsWith('http')) {
-                window.location.href = response.redirect_url;
-              } else {
-                navigate(response.redirect_url);
-              }
-            }, 1500);
-          }
-        } else if (response.status === 'error') {
-          setError(response.error || 'An error occurred while processing your data');
-        }
+        handleStatus(await checkProcessingStatus());
       } catch (err:any) {
         if (!isMounted) return;
         console.error('Processing status error:', err);
@@ -104,15 +131,47 @@ const LoadingScreen: FC = () => {
       }
     };
 
-    // Initial check
-    pollProcessingStatus();
+    const startPolling = () => {
+      if (pollInterval) return;
+      pollProcessingStatus();
+      pollInterval = setInterval(pollProcessingStatus, 5000);
+    };
 
-    // Poll every 5 seconds instead of 10 for better responsiveness
-    pollInterval = setInterval(pollProcessingStatus, 5000);
+    // Prefer the progress stream; fall back to polling if it can't be used
+    const startStream = async () => {
+      const isAuthed = await checkAuthentication();
+      if (!isAuthed || !isMounted) return;
 
-    // Simulate progress for user feedback
+      try {
+        stream = await openProcessingStream();
+      } catch (err) {
+        console.error('Could not open progress stream:', err);
+        stream = null;
+      }
+      if (!isMounted) {
+        stream?.close();
+        return;
+      }
+      if (!stream) {
+        startPolling();
+        return;
+      }
+      stream.onmessage = (event) => {
+        const response = JSON.parse(event.data);
+        if (response.status !== 'processing') stream?.close();
+        handleStatus(response);
+      };
+      stream.onerror = () => {
+        stream?.close();
+        startPolling();
+      };
+    };
+
+    startStream();
+
+    // Simulate progress until the stream reports real counts
     const progressInterval = setInterval(() => {
-      if (isMounted && !isRedirecting) {
+      if (isMounted && !isRedirecting && !hasRealProgress) {
         setProgress((prev) => {
           if (prev >= 95) return 95; // Cap at 95% until actually complete
           return prev + 0.5;
@@ -130,6 +189,7 @@ const LoadingScreen: FC = () => {
     // Cleanup
     return () => {
       isMounted = false;
+      stream?.close();
       clearInterval(pollInterval);
       clearInterval(progressInterval);
       clearInterval(messageInterval);
@@ -209,6 +269,21 @@ const LoadingScreen: FC = () => {
           </div>
         </div>
 
+        {/* Games that can already be played while the rest loads */}
+        {progress < 100 && readyModes.length > 0 && (
+          <div className="mt-6 text-center">
+            <p className="text-gray-300 text-sm mb-3">
+              Ready to play: {readyModes.map((mode) => modeNames[mode] ?? mode).join(', ')}
+            </p>
+            <button
+              onClick={() => navigate('/games/dashboard')}
+              className="bg-green-500 hover:bg-green-600 text-white font-medium py-2 px-6 rounded-full transition-colors"
+            >
+              Start Playing
+            </button>
+          </div>
+        )}
+
         {/* Fun Facts */}
         <div className="mt-8 bg-white/5 rounded-lg p-4">
           <h3 className="text-green-500 font-medium mb-2">Did you know?</h3>
@@ -104,4 +104,15 @@ export const checkProcessingStatus = async () => {
   return checkStatus();
 };
 
+// Server-sent progress stream for onboarding. EventSource can't send headers,
+// so a short-lived stream ticket goes in the query string instead of the
+// access token.
+export const openProcessingStream = async (): Promise<EventSource | null> => {
+  if (typeof EventSource === 'undefined') return null;
+  const response = await api.post('/processing-stream/ticket/');
+  return new EventSource(
+    `${API_BASE_URL}/processing-stream/?ticket=${encodeURIComponent(response.data.ticket)}`
+  );
+};
+
 export default api;